@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from scripts.services.image_service import image_router as image_router
@@ -6,13 +7,68 @@ from scripts.services.vol_service import volume_router as vol_router
 from scripts.services.admin_service import admin_router as admin_router
 from scripts.services.rate_limit_service import rate_limit_router as rate_router
 from scripts.services.jwt_service import auth_router as auth_router
+from scripts.services.stats_service import stats_router as stats_router
+from scripts.services.metrics_service import metrics_router as metrics_router
+from scripts.services.health_service import health_router as health_router
+from scripts.utils.docker_utils import close_docker_client
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.health_utils import app_health
+from scripts.utils.fleet_utils import fleet
+from scripts.utils.warm_pool_utils import warm_pool
+from scripts.utils.gc_utils import docker_gc
+from scripts.utils.disk_usage_utils import disk_usage
+from scripts.utils.build_job_utils import build_jobs
+from scripts.utils.pull_utils import image_pulls
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.stats_utils import stats_collector
+from scripts.utils.password_utils import password_hasher
+from scripts.utils.metrics_utils import MetricsMiddleware, worker_metrics
+from scripts.utils.request_id_utils import RequestIdMiddleware
+from scripts.utils.shared_store_utils import shared_store
+from scripts.constants.app_configuration import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with app_health.step("background_tasks"):
+        app_health.start()
+        shared_store.start()
+        await fleet.start()
+        worker_metrics.start()
+        inventory.start()
+        disk_usage.start()
+        stats_collector.start()
+        warm_pool.start()
+        docker_gc.start()
+    app_health.mark_started()
+    yield
+    await app_health.stop()
+    await warm_pool.stop()
+    await docker_gc.stop()
+    await worker_metrics.stop()
+    await stats_collector.stop()
+    await inventory.stop()
+    await disk_usage.stop()
+    await build_jobs.shutdown()
+    await image_pulls.shutdown()
+    await password_hasher.shutdown()
+    await fleet.stop()
+    await close_docker_client()
+    await mongo.close()
+    await shared_store.stop()
 
 
 def create_app() -> FastAPI:
+    with app_health.step("create_app"):
+        return _build_app()
+
+
+def _build_app() -> FastAPI:
     app = FastAPI(
         title="Docker Management API",
         description="APIs to manage Docker Images, Containers, and Volumes",
         version="1.0.0",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -22,6 +78,9 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RequestIdMiddleware)
 
     app.include_router(auth_router, prefix="/auth", tags=["Authentication Operations"])
     app.include_router(admin_router, prefix="/admin", tags=["Admin Operations"])
@@ -29,6 +88,10 @@ def create_app() -> FastAPI:
     app.include_router(image_router, prefix="/images", tags=["Image Operations"])
     app.include_router(cont_router, prefix="/container", tags=["Container Operations"])
     app.include_router(vol_router, prefix="/volume", tags=["Volume Operations"])
+    app.include_router(stats_router, prefix="/stats", tags=["Stats Operations"])
+    app.include_router(health_router, tags=["Health"])
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router, tags=["Metrics"])
 
     return app
 
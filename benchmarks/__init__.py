@@ -0,0 +1,10 @@
+"""Benchmarks run against fake backends; see each module's docstring.
+
+The logger opens ``LOG_FILE`` when ``scripts`` is first imported, so it is pointed
+at a temporary directory here, before any benchmark imports the app, to keep
+benchmark runs out of ``logs/``.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.mkdtemp(prefix="bench-logs-"), "bench.log"))
@@ -0,0 +1,128 @@
+"""Dashboards polling volume, image and disk-usage listings, served by ``app.create_app()``.
+
+Docker is the fake Engine API from ``benchmarks.fake_docker`` with ``--df-latency``
+on ``/system/df``; Mongo is the in-memory stand-in from ``benchmarks.memory_mongo``.
+``--dashboards`` clients each poll ``/volume/docker/volumes``, ``/images/docker/images``
+and ``/volume/docker/disk-usage`` every ``--poll-interval`` seconds for ``--duration``
+seconds, while a writer creates and removes a burst of ``--burst`` volumes every
+``--burst-interval`` seconds.
+
+    python -m benchmarks.disk_usage_bench --dashboards 20 --duration 10 --df-latency 0.5
+
+Without the snapshot every poll would cost a df call; the result reports the df
+calls the daemon actually served against the polls, the polls' latency, and
+how long a created volume took to show a size.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from benchmarks import memory_mongo
+from benchmarks.e2e_bench import DaemonThread, percentile, resolve_routes
+from scripts.constants.app_configuration import settings
+from scripts.utils import docker_utils
+from scripts.utils.jwt_utils import create_user_token
+
+
+ROUTES = ("VOLUME_LIST", "IMAGE_LIST", "DISK_USAGE")
+
+
+async def main(args):
+    settings.STATS_ENABLED = False
+    settings.GC_ENABLED = False
+    settings.DISK_USAGE_REFRESH_SECONDS = args.refresh
+    settings.DISK_USAGE_DEBOUNCE_SECONDS = args.debounce
+
+    daemon = DaemonThread(args.docker_latency, route_latency={"system_df": args.df_latency})
+    for i in range(args.images):
+        daemon.run(daemon.daemon.add_image, f"bench-du-{i}:latest")
+    docker_utils.set_docker_client(docker_utils.DockerEngineClient(docker_host=f"unix://{daemon.socket_path}"))
+    memory_mongo.install()
+    admin = {"Authorization": f"Bearer {create_user_token('bench-admin', 'Admin')}"}
+
+    from app import create_app
+    from scripts.utils.disk_usage_utils import disk_usage
+
+    app = create_app()
+    routes = resolve_routes(app)
+    latencies = {route: [] for route in ROUTES}
+    statuses = {}
+    visible_after = []
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+            await client.get(routes["DISK_USAGE"]["path"], headers=admin)
+            df_before = daemon.run(lambda: daemon.daemon.route_counts.get("system_df", 0))
+            deadline = time.monotonic() + args.duration
+
+            async def dashboard():
+                while time.monotonic() < deadline:
+                    for route in ROUTES:
+                        started = time.perf_counter()
+                        response = await client.get(routes[route]["path"], headers=admin)
+                        latencies[route].append(time.perf_counter() - started)
+                        key = f"{route}:{response.status_code}"
+                        statuses[key] = statuses.get(key, 0) + 1
+                    await asyncio.sleep(args.poll_interval)
+
+            async def writer():
+                round_ = 0
+                while time.monotonic() < deadline - args.burst_interval:
+                    await asyncio.sleep(args.burst_interval)
+                    names = [f"bench-du-{round_}-{i}" for i in range(args.burst)]
+                    created = time.monotonic()
+                    for name in names:
+                        await client.post(routes["VOLUME_CREATE"]["path"], json={"name": name}, headers=admin)
+                    while time.monotonic() < deadline:
+                        listed = (await client.get(routes["VOLUME_LIST"]["path"], params={"name": names[-1]}, headers=admin)).json()
+                        if any(v["name"] == names[-1] and v["size"] is not None for v in listed["volumes"]):
+                            visible_after.append(time.monotonic() - created)
+                            break
+                        await asyncio.sleep(0.05)
+                    for name in names:
+                        await client.request(routes["VOLUME_DELETE"]["method"], routes["VOLUME_DELETE"]["path"].format(volume_name=name), json={}, headers=admin)
+                    round_ += 1
+
+            await asyncio.gather(writer(), *(dashboard() for _ in range(args.dashboards)))
+            df_calls = daemon.run(lambda: daemon.daemon.route_counts.get("system_df", 0)) - df_before
+            stats = dict(disk_usage.stats)
+
+    daemon.stop()
+    polls = sum(len(samples) for samples in latencies.values())
+    print(json.dumps({
+        "config": vars(args),
+        "polls": polls,
+        "df_calls": df_calls,
+        "statuses": statuses,
+        "latency": {
+            route: {
+                "p50_ms": round(statistics.median(samples) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            }
+            for route, samples in latencies.items() if samples
+        },
+        "size_visible_after_create_s": {
+            "bursts": len(visible_after),
+            "p50": round(statistics.median(visible_after), 3) if visible_after else None,
+            "max": round(max(visible_after), 3) if visible_after else None,
+        },
+        "snapshot": stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dashboards", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of polling")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between one dashboard's polls")
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=5, help="volumes created and removed per burst")
+    parser.add_argument("--burst-interval", type=float, default=2.0)
+    parser.add_argument("--refresh", type=float, default=30.0, help="DISK_USAGE_REFRESH_SECONDS")
+    parser.add_argument("--debounce", type=float, default=0.5, help="DISK_USAGE_DEBOUNCE_SECONDS")
+    parser.add_argument("--df-latency", type=float, default=0.5, help="seconds the daemon takes for /system/df")
+    parser.add_argument("--docker-latency", type=float, default=0.001, help="seconds added to every other Docker call")
+    asyncio.run(main(parser.parse_args()))
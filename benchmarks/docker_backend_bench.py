@@ -0,0 +1,115 @@
+"""Concurrent throughput of the Docker backend, before and after the async Engine client.
+
+"before" drives docker-py through AnyIO's worker threads exactly like the old sync
+handlers did; "after" drives ``DockerEngineClient`` on the event loop. Both talk to
+the same fake daemon on a local unix socket, so the numbers isolate the client side.
+
+    python -m benchmarks.docker_backend_bench --requests 400 --concurrency 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import anyio
+import docker
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from scripts.utils.docker_utils import DockerEngineClient
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_concurrently(operation, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def sync_list(client: docker.DockerClient):
+    return [{"name": c.name, "image": c.image.tags, "status": c.status} for c in client.containers.list()]
+
+
+async def bench_list(socket_path: str, args) -> dict:
+    sync_client = docker.DockerClient(base_url=f"unix://{socket_path}", version="1.43", max_pool_size=args.concurrency)
+    async_client = DockerEngineClient(docker_host=f"unix://{socket_path}", timeout=60, api_version="v1.43")
+    try:
+        before = await run_concurrently(lambda: anyio.to_thread.run_sync(sync_list, sync_client), args.requests, args.concurrency)
+        after = await run_concurrently(async_client.list_containers, args.requests, args.concurrency)
+    finally:
+        sync_client.close()
+        await async_client.close()
+    return {"before": before, "after": after}
+
+
+async def bench_starvation(socket_path: str, args) -> dict:
+    """Latency of a cheap call while slow pulls are in flight."""
+    sync_client = docker.DockerClient(base_url=f"unix://{socket_path}", version="1.43", max_pool_size=args.concurrency)
+    async_client = DockerEngineClient(docker_host=f"unix://{socket_path}", timeout=60, api_version="v1.43")
+
+    async def measure(slow, fast):
+        pulls = [asyncio.create_task(slow()) for _ in range(args.slow_pulls)]
+        await asyncio.sleep(0.05)
+        result = await run_concurrently(fast, args.pings, args.pings)
+        await asyncio.gather(*pulls)
+        return result
+
+    try:
+        before = await measure(
+            lambda: anyio.to_thread.run_sync(sync_client.images.pull, "busybox", "latest"),
+            lambda: anyio.to_thread.run_sync(sync_client.ping),
+        )
+        after = await measure(lambda: async_client.pull_image("busybox:latest"), async_client.ping)
+    finally:
+        sync_client.close()
+        await async_client.close()
+    return {"before": before, "after": after}
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory(prefix="bench-docker-") as directory:
+        socket_path = os.path.join(directory, "docker.sock")
+        daemon = FakeDockerDaemon(socket_path, latency=args.latency, route_latency={"pull_image": args.pull_latency})
+        for i in range(args.containers):
+            daemon.add_container(f"bench_{i}", image=f"bench/image{i % 5}:latest")
+        async with daemon:
+            results = {
+                "config": vars(args),
+                "list_containers": await bench_list(socket_path, args),
+                "ping_during_slow_pulls": await bench_starvation(socket_path, args),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--containers", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="per-request daemon latency in seconds")
+    parser.add_argument("--pull-latency", type=float, default=2.0)
+    parser.add_argument("--slow-pulls", type=int, default=60)
+    parser.add_argument("--pings", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,446 @@
+"""End-to-end latency of every API route, served by ``app.create_app()``.
+
+The app runs in-process behind ``httpx.ASGITransport`` with its real lifespan. Docker
+is the fake Engine API from ``benchmarks.fake_docker`` on a local unix socket, with
+its own event loop thread. Mongo is the in-memory stand-in from
+``benchmarks.memory_mongo``. Every ``Endpoints`` entry gets a scenario. Entries
+that cannot be driven over plain HTTP are listed under ``skipped`` with the reason.
+
+    python -m benchmarks.e2e_bench --mix all --requests 200 --concurrency 32
+    python -m benchmarks.e2e_bench --mix hot --requests 5000 --concurrency 64 --output hot.json
+    python -m benchmarks.e2e_bench --weights CONTAINER_CREATE=3,CONTAINER_LIST=1 --isolated
+
+``--isolated`` measures each route on its own, one after another. Otherwise all
+selected routes are interleaved at random in proportion to their weights, which is
+closer to production traffic. The result is one JSON document with per-route
+throughput and p50/p95/p99 latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from passlib.context import CryptContext
+
+from benchmarks import memory_mongo
+from benchmarks.fake_docker import FakeDockerDaemon
+from scripts.constants.api_endpoints import Endpoints
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import CONTAINER_OWNER_LABEL
+from scripts.utils import docker_utils
+from scripts.utils.docker_utils import DEFAULT_REGISTRY
+from scripts.utils.jwt_utils import create_user_token
+
+
+PASSWORD = "bench-password"
+
+# Routes whose cost is mostly token decode, rate-limit checks and container create/list.
+MIXES = {
+    "hot": {
+        "CONTAINER_CREATE": 2,
+        "CONTAINER_LIST": 4,
+        "IMAGE_LIST": 2,
+        "VOLUME_LIST": 1,
+        "HOST_STATS": 1,
+        "ADMIN_TOKEN_CACHE_STATS": 1,
+        "RATE_LIMIT_GET": 1,
+    },
+}
+
+SKIPPED = {
+    "CONTAINER_LOGS_WS": "WebSocket route; httpx cannot drive it",
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def endpoint_names() -> List[str]:
+    return [name for name in vars(Endpoints) if name.isupper()]
+
+
+def resolve_routes(app) -> Dict[str, Dict[str, str]]:
+    """Map each ``Endpoints`` name to its mounted path and HTTP method."""
+    resolved = {}
+    for name in endpoint_names():
+        value = getattr(Endpoints, name)
+        for route in app.routes:
+            path = getattr(route, "path", "")
+            if path.endswith(value) and re.fullmatch(r"(/[\w-]+)?", path[: len(path) - len(value)]):
+                methods = sorted(getattr(route, "methods", None) or {"WEBSOCKET"})
+                resolved[name] = {"path": path, "method": methods[0]}
+                break
+    return resolved
+
+
+class DaemonThread:
+    """The fake daemon on its own loop, so its work does not share the app's loop."""
+
+    def __init__(self, latency: float, **options):
+        self.directory = tempfile.mkdtemp(prefix="bench-docker-")
+        self.socket_path = os.path.join(self.directory, "docker.sock")
+        self.loop = asyncio.new_event_loop()
+        self.daemon = FakeDockerDaemon(self.socket_path, latency=latency, **options)
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.call(self.daemon.start())
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def run(self, func: Callable, *args):
+        async def wrapper():
+            return func(*args)
+        return self.call(wrapper())
+
+    def stop(self):
+        async def shutdown():
+            await self.daemon.stop()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.call(shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class BenchContext:
+    """Fixtures shared by the scenarios, plus per-route counters for unique names."""
+
+    def __init__(self, args, daemon: DaemonThread, database: memory_mongo.MemoryDatabase, counts: Dict[str, int]):
+        self.args = args
+        self.daemon = daemon
+        self.database = database
+        self.counts = counts
+        self.run_id = f"{int(time.time())}"
+        self.users = [f"bench-user-{i}" for i in range(args.users)]
+        self.tokens = {user: create_user_token(user, "User") for user in self.users}
+        self.admin_token = create_user_token("bench-admin", "Admin")
+        self.build_dir = tempfile.mkdtemp(prefix="bench-build-")
+        self.temp_dirs = [self.build_dir]
+        self.repo_url = ""
+        self.job_id = ""
+        self._sequence: Dict[str, int] = {}
+
+    def next(self, route: str) -> int:
+        self._sequence[route] = self._sequence.get(route, -1) + 1
+        return self._sequence[route]
+
+    def user(self, i: int) -> str:
+        return self.users[i % len(self.users)]
+
+    def admin(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.admin_token}"}
+
+    def as_user(self, i: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[self.user(i)]}"}
+
+    def cleanup(self):
+        for directory in self.temp_dirs:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def container(self, i: int) -> str:
+        return f"bench-c-{i % self.args.containers}"
+
+    def setup_fixtures(self):
+        count = self.counts.get
+        hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=settings.BCRYPT_ROUNDS).hash(PASSWORD)
+        users = self.database.collection("users")
+        limits = self.database.collection("rate_limits")
+        for user in self.users + ["bench-admin"]:
+            users.insert_one({"username": user, "password": hashed, "role": "Admin" if user == "bench-admin" else "User"})
+            limits.insert_one({"user_id": user, "limit": 10 ** 9, "time_window": 3600})
+        for i in range(count("ADMIN_USER_DELETE", 0)):
+            users.insert_one({"username": f"bench-delete-{i}", "password": hashed, "role": "User"})
+        for i in range(count("RATE_LIMIT_UPDATE", 0)):
+            limits.insert_one({"user_id": f"bench-update-{i}", "limit": 10, "time_window": 3600})
+        for i in range(count("DOCKER_REGISTRY_LOGOUT", 0)):
+            users.insert_one({"username": f"bench-logout-{i}", "password": hashed, "role": "User"})
+            limits.insert_one({"user_id": f"bench-logout-{i}", "limit": 10 ** 9, "time_window": 3600})
+            self.database.collection("registry_credentials").insert_one({
+                "user_id": f"bench-logout-{i}", "registry": DEFAULT_REGISTRY, "username": "bench", "secret": "",
+                "expires_at": datetime.utcnow() + timedelta(hours=1),
+            })
+
+        def seed():
+            fake = self.daemon.daemon
+            fake.add_image("busybox:latest")
+            for i in range(self.args.containers):
+                container = fake.add_container(f"bench-c-{i}")
+                container["Config"]["Labels"] = {CONTAINER_OWNER_LABEL: self.user(i)}
+            for i in range(count("CONTAINER_DELETE", 0)):
+                fake.add_container(f"bench-rm-{i}", running=False)
+            for i in range(count("IMAGE_DELETE", 0)):
+                fake.add_image(f"bench-delete-{i}:latest")
+            for i in range(count("VOLUME_DELETE", 0)):
+                fake.volumes[f"bench-vol-{i}"] = {"Name": f"bench-vol-{i}", "Driver": "local", "Labels": {}, "Mountpoint": "", "Scope": "local"}
+
+        self.daemon.run(seed)
+        for i in range(self.args.containers):
+            self.database.collection("user_containers").insert_one({
+                "user_id": self.user(i), "container_name": f"bench-c-{i}", "created_time": datetime.utcnow()
+            })
+
+        with open(os.path.join(self.build_dir, "Dockerfile"), "w") as f:
+            f.write("FROM busybox:latest\nCMD [\"true\"]\n")
+        if count("IMAGE_BUILD_FROM_GITHUB"):
+            repo = tempfile.mkdtemp(prefix="bench-repo-")
+            self.temp_dirs.append(repo)
+            for command in (["init", "-q"], ["add", "."], ["-c", "user.email=b@b", "-c", "user.name=b", "commit", "-qm", "init"]):
+                if command[0] == "add":
+                    with open(os.path.join(repo, "Dockerfile"), "w") as f:
+                        f.write("FROM busybox:latest\n")
+                subprocess.run(["git", "-C", repo, *command], check=True)
+            self.repo_url = f"file://{repo}"
+
+
+def scenarios(ctx: BenchContext) -> Dict[str, Callable[[int], Dict[str, Any]]]:
+    """Request arguments for the ``i``-th call of each route."""
+    return {
+        "AUTH_SIGNUP": lambda i: {"json": {"username": f"bench-signup-{ctx.run_id}-{i}", "password": PASSWORD, "role": "User"}},
+        "AUTH_LOGIN": lambda i: {"data": {"username": ctx.user(i), "password": PASSWORD}},
+        "RATE_LIMIT_GET": lambda i: {"path": {"username": ctx.user(i)}, "params": {"user_id": ctx.user(i)}, "headers": ctx.admin()},
+        "RATE_LIMIT_SET": lambda i: {"path": {"username": f"bench-set-{i}"}, "params": {"user_id": f"bench-set-{ctx.run_id}-{i}", "limit": 5, "time_window": 60}, "headers": ctx.admin()},
+        "RATE_LIMIT_UPDATE": lambda i: {"path": {"username": f"bench-update-{i}"}, "params": {"user_id": f"bench-update-{i}", "limit": 20, "time_window": 60}, "headers": ctx.admin()},
+        "IMAGE_BUILD_ADVANCED": lambda i: {"json": {"path": ctx.build_dir, "tag": f"bench-build:{i}"}, "headers": ctx.as_user(i)},
+        "IMAGE_BUILD_FROM_GITHUB": lambda i: {"json": {"github_url": ctx.repo_url, "tag": f"bench-github:{i}"}, "headers": ctx.as_user(i)},
+        "IMAGE_BUILD_JOBS": lambda i: {"headers": ctx.admin()},
+        "IMAGE_BUILD_JOB_STATUS": lambda i: {"path": {"job_id": ctx.job_id}, "headers": ctx.admin()},
+        "IMAGE_BUILD_JOB_PROGRESS": lambda i: {"path": {"job_id": ctx.job_id}, "headers": ctx.admin()},
+        "IMAGE_BUILD_JOB_RESULT": lambda i: {"path": {"job_id": ctx.job_id}, "headers": ctx.admin()},
+        "DOCKER_REGISTRY_LOGIN": lambda i: {"params": {"username": "bench", "password": "bench"}, "headers": ctx.admin()},
+        "DOCKER_REGISTRY_LOGOUT": lambda i: {"headers": {"Authorization": f"Bearer {create_user_token(f'bench-logout-{i}', 'User')}"}},
+        "DOCKER_REGISTRY_LOGINS": lambda i: {"headers": ctx.admin()},
+        "IMAGE_PUSH": lambda i: {"params": {"local_tag": "busybox:latest", "remote_repo": f"registry.local/bench{i % 10}"}, "headers": ctx.admin()},
+        "IMAGE_PUSH_STREAM": lambda i: {
+            "json": {"targets": [{"local_tag": "busybox:latest", "remote_repo": f"registry.local/bench{i % 10}:{tag}"} for tag in ("v1", "latest")]},
+            "headers": ctx.admin(),
+        },
+        "IMAGE_PULL": lambda i: {"params": {"repository": f"bench-pull-{i % 20}:latest"}, "headers": ctx.admin()},
+        "IMAGE_PULL_STREAM": lambda i: {"params": {"repository": f"bench-stream-{i % 20}:latest"}, "headers": ctx.admin()},
+        "IMAGE_LIST": lambda i: {"headers": ctx.admin()},
+        "IMAGE_DELETE": lambda i: {"path": {"image_name": f"bench-delete-{i}:latest"}, "json": {"force": True}, "headers": ctx.admin()},
+        "CONTAINER_CREATE": lambda i: {"json": {"image": "busybox:latest", "name": f"bench-new-{ctx.run_id}-{i}"}, "headers": ctx.as_user(i)},
+        "CONTAINER_CREATE_ADVANCED": lambda i: {"json": {"image": "busybox:latest", "name": f"bench-adv-{ctx.run_id}-{i}", "mem_limit": "64m"}, "headers": ctx.as_user(i)},
+        "CONTAINER_START": lambda i: {"path": {"container_name": ctx.container(i)}, "headers": ctx.admin()},
+        "CONTAINER_STOP": lambda i: {"path": {"container_name": ctx.container(i)}, "params": {"timeout": 0}, "headers": ctx.admin()},
+        "CONTAINER_LOGS": lambda i: {"path": {"container_name": ctx.container(i)}, "json": {"tail": 50}, "headers": ctx.admin()},
+        "CONTAINER_LOGS_STREAM": lambda i: {"path": {"container_name": ctx.container(i)}, "params": {"tail": "50"}, "headers": ctx.admin()},
+        "CONTAINER_LIST": lambda i: {"json": {"all": True}, "headers": ctx.admin()},
+        "CONTAINER_BULK": lambda i: {"json": {"action": "restart", "names": [ctx.container(i + k) for k in range(5)], "timeout": 0}, "headers": ctx.admin()},
+        "CONTAINER_STATS": lambda i: {"path": {"container_name": ctx.container(i)}, "params": {"limit": 10}, "headers": ctx.as_user(i)},
+        "CONTAINER_DELETE": lambda i: {"path": {"container_name": f"bench-rm-{i}"}, "json": {"force": True}, "headers": ctx.admin()},
+        "USER_STATS": lambda i: {"path": {"username": ctx.user(i)}, "headers": ctx.as_user(i)},
+        "HOST_STATS": lambda i: {"params": {"limit": 10}, "headers": ctx.admin()},
+        "VOLUME_LIST": lambda i: {"headers": ctx.admin()},
+        "DISK_USAGE": lambda i: {"headers": ctx.admin()},
+        "VOLUME_CREATE": lambda i: {"json": {"name": f"bench-newvol-{ctx.run_id}-{i}"}, "headers": ctx.admin()},
+        "VOLUME_DELETE": lambda i: {"path": {"volume_name": f"bench-vol-{i}"}, "json": {"force": True}, "headers": ctx.admin()},
+        "ADMIN_USERS_LIST": lambda i: {"params": {"limit": 50}, "headers": ctx.admin()},
+        "ADMIN_USER_DETAILS": lambda i: {"path": {"username": ctx.user(i)}, "headers": ctx.admin()},
+        "ADMIN_USER_DELETE": lambda i: {"path": {"username": f"bench-delete-{i}"}, "headers": ctx.admin()},
+        "ADMIN_CONTAINERS_LIST": lambda i: {"params": {"limit": 50}, "headers": ctx.admin()},
+        "ADMIN_TOKEN_CACHE_STATS": lambda i: {"headers": ctx.admin()},
+        "ADMIN_INDEX_REPORT": lambda i: {"headers": ctx.admin()},
+        "ADMIN_DOCKER_HOSTS": lambda i: {"headers": ctx.admin()},
+        "ADMIN_WARM_POOL": lambda i: {"headers": ctx.admin()},
+        "ADMIN_GC_REPORT": lambda i: {"headers": ctx.admin()},
+        "METRICS": lambda i: {},
+        "HEALTHZ": lambda i: {},
+        "READYZ": lambda i: {},
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.elapsed: Dict[str, float] = {}
+
+    def add(self, route: str, latency: float, status: str):
+        self.latencies.setdefault(route, []).append(latency)
+        counts = self.statuses.setdefault(route, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def report(self, routes: Dict[str, Dict[str, str]], wall: float) -> Dict[str, Any]:
+        result = {}
+        for name, samples in sorted(self.latencies.items()):
+            elapsed = self.elapsed.get(name, wall)
+            result[name] = {
+                **routes[name],
+                "requests": len(samples),
+                "errors": sum(n for s, n in self.statuses[name].items() if not s.startswith(("2", "3"))),
+                "statuses": self.statuses[name],
+                "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+                "p50_ms": round(statistics.median(samples) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2),
+            }
+        return result
+
+
+async def call(client: httpx.AsyncClient, route: Dict[str, str], request: Dict[str, Any]) -> str:
+    path = route["path"].format(**request.pop("path", {}))
+    try:
+        response = await client.request(route["method"], path, **request)
+        await response.aread()
+        return str(response.status_code)
+    except Exception as e:
+        return type(e).__name__
+
+
+async def drive(client, routes, plan: List[tuple], builders, recorder: Recorder, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(name: str, i: int):
+        async with semaphore:
+            request = builders[name](i)
+            started = time.perf_counter()
+            status = await call(client, routes[name], request)
+            recorder.add(name, time.perf_counter() - started, status)
+
+    await asyncio.gather(*(one(name, i) for name, i in plan))
+
+
+def parse_weights(text: Optional[str]) -> Dict[str, float]:
+    weights = {}
+    for item in filter(None, (text or "").split(",")):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+async def main(args):
+    settings.STATS_ENABLED = False
+    settings.BCRYPT_ROUNDS = args.bcrypt_rounds
+    settings.BUILD_MAX_QUEUED_PER_USER = max(settings.BUILD_MAX_QUEUED_PER_USER, args.requests)
+    settings.PASSWORD_HASH_MAX_PENDING = max(settings.PASSWORD_HASH_MAX_PENDING, args.concurrency)
+
+    from app import create_app
+    from scripts.utils.build_job_utils import build_jobs
+    from scripts.utils.inventory_utils import inventory
+    from scripts.utils.stats_utils import stats_collector
+
+    app = create_app()
+    routes = resolve_routes(app)
+    missing = {name: "not mounted on any router" for name in endpoint_names() if name not in routes}
+    skipped = {**{n: r for n, r in SKIPPED.items() if n in routes}, **missing}
+    available = [name for name in endpoint_names() if name not in skipped]
+
+    weights = parse_weights(args.weights) or (
+        {name: 1 for name in available} if args.mix == "all" else dict(MIXES[args.mix])
+    )
+    unknown = sorted(set(weights) - set(available))
+    if unknown:
+        raise SystemExit(f"Unknown or skipped routes: {', '.join(unknown)}")
+
+    total_weight = sum(weights.values())
+    counts = {name: max(1, round(args.requests * w / total_weight)) if not args.isolated else args.requests for name, w in weights.items()}
+
+    # Build-from-GitHub clones a local file:// repository into a throwaway mirror directory.
+    settings.GIT_MIRROR_DIR = tempfile.mkdtemp(prefix="bench-mirrors-")
+    settings.GIT_ALLOWED_SCHEMES = "https,file"
+    daemon = DaemonThread(args.docker_latency)
+    ctx = None
+    try:
+        database = memory_mongo.install()
+        docker_utils.set_docker_client(docker_utils.DockerEngineClient(docker_host=f"unix://{daemon.socket_path}"))
+        ctx = BenchContext(args, daemon, database, counts)
+        ctx.setup_fixtures()
+        builders = scenarios(ctx)
+
+        recorder = Recorder()
+        async with app.router.lifespan_context(app):
+            limits = httpx.Limits(max_connections=None)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120, limits=limits) as client:
+                while not inventory.ready:
+                    await asyncio.sleep(0.05)
+                await stats_collector.sample()
+                await stats_collector.sample()
+                job = await client.post(routes["IMAGE_BUILD_ADVANCED"]["path"], json={"path": ctx.build_dir, "tag": "bench-job:latest"}, headers=ctx.admin())
+                ctx.job_id = job.json()["job_id"]
+                await build_jobs.get(ctx.job_id).task
+                # Warm-up: one call per route (also starts the password hashing workers).
+                await client.post(routes["AUTH_LOGIN"]["path"], data={"username": ctx.user(0), "password": PASSWORD})
+                for name in weights:
+                    if name not in ("AUTH_SIGNUP",) and not any(k in name for k in ("DELETE", "CREATE", "SET", "LOGOUT")):
+                        await call(client, routes[name], builders[name](0))
+
+                started = time.perf_counter()
+                if args.isolated:
+                    for name in weights:
+                        route_started = time.perf_counter()
+                        await drive(client, routes, [(name, ctx.next(name)) for _ in range(counts[name])], builders, recorder, args.concurrency)
+                        recorder.elapsed[name] = time.perf_counter() - route_started
+                else:
+                    plan = [(name, None) for name, n in counts.items() for _ in range(n)]
+                    random.Random(args.seed).shuffle(plan)
+                    plan = [(name, ctx.next(name)) for name, _ in plan]
+                    await drive(client, routes, plan, builders, recorder, args.concurrency)
+                wall = time.perf_counter() - started
+                await build_jobs.shutdown()
+                if args.metrics:
+                    with open(args.metrics, "w") as f:
+                        f.write((await client.get(routes["METRICS"]["path"])).text)
+    finally:
+        daemon.stop()
+        if ctx is not None:
+            ctx.cleanup()
+        shutil.rmtree(settings.GIT_MIRROR_DIR, ignore_errors=True)
+
+    all_latencies = [s for samples in recorder.latencies.values() for s in samples]
+    result = {
+        "config": {
+            "mix": "custom" if args.weights else args.mix,
+            "isolated": args.isolated,
+            "requests": len(all_latencies),
+            "concurrency": args.concurrency,
+            "docker_latency_ms": args.docker_latency * 1000,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "total": {
+            "seconds": round(wall, 3),
+            "throughput_rps": round(len(all_latencies) / wall, 1),
+            "p50_ms": round(statistics.median(all_latencies) * 1000, 2),
+            "p99_ms": round(percentile(all_latencies, 99) * 1000, 2),
+        },
+        "routes": recorder.report(routes, wall),
+        "skipped": skipped,
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", choices=["all", *MIXES], default="all")
+    parser.add_argument("--weights", help="custom mix, e.g. CONTAINER_CREATE=3,CONTAINER_LIST=1")
+    parser.add_argument("--isolated", action="store_true", help="measure each route on its own")
+    parser.add_argument("--requests", type=int, default=400, help="total requests (per route with --isolated)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--containers", type=int, default=200)
+    parser.add_argument("--docker-latency", type=float, default=0.0, help="seconds added to every fake daemon request")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="bcrypt cost for seeded users and logins")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--metrics", help="write the app's /metrics scrape after the run to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,672 @@
+import asyncio
+import base64
+import calendar
+import hashlib
+import json
+import os
+import re
+import struct
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class FakeRequest:
+    def __init__(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body or b"{}")
+
+    def flag(self, name: str, default: bool = False) -> bool:
+        value = self.query.get(name)
+        if value is None:
+            return default
+        return value.lower() not in ("", "0", "false", "no", "none")
+
+
+def _digest(value: str) -> str:
+    return "sha256:" + hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def _label_filter(request) -> List[str]:
+    filters = json.loads(request.query.get("filters") or "{}")
+    labels = filters.get("label") or []
+    return list(labels) if isinstance(labels, (list, dict)) else [labels]
+
+
+def _has_labels(labels: Dict[str, str], wanted: List[str]) -> bool:
+    for item in wanted:
+        key, _, value = item.partition("=")
+        if key not in labels or (value and labels[key] != value):
+            return False
+    return True
+
+
+class FakeDockerDaemon:
+    """A small in-memory Docker Engine API served over a unix socket.
+
+    It speaks just enough HTTP/1.1 (keep-alive, chunked streaming responses) for
+    docker-py and ``DockerEngineClient`` to drive it. ``latency`` is added to every
+    request to model a busy daemon; ``route_latency`` overrides it per handler name
+    (e.g. ``{"pull_image": 2.0}``). ``ncpu`` and ``mem_total`` are the capacity
+    ``/info`` reports.
+
+    Pushes go to an in-memory registry that remembers which layers each
+    repository has: a layer it has is "Layer already exists", one another
+    repository on the same registry has is "Mounted from", and any other is
+    uploaded in ``push_chunks`` progress steps taking ``layer_push_seconds``.
+    Every image has a shared base layer and two of its own.
+
+    With ``registry_users`` (username to password), ``/auth`` rejects other
+    credentials and hands out an identity token, and the identity each pull and
+    push was made as (from ``X-Registry-Auth``) is kept, with its reference, in
+    ``registry_identities``.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        latency: float = 0.0,
+        route_latency: Optional[Dict[str, float]] = None,
+        ncpu: int = 4,
+        mem_total: int = 8 * 1024 ** 3,
+        layer_push_seconds: float = 0.0,
+        push_chunks: int = 1,
+        registry_users: Optional[Dict[str, str]] = None,
+    ):
+        self.socket_path = socket_path
+        self.registry_users = registry_users
+        self.registry_identities: List[Tuple[str, Optional[str]]] = []
+        self.layer_push_seconds = layer_push_seconds
+        self.push_chunks = push_chunks
+        self.registry: Dict[str, Dict[str, Set[str]]] = {}
+        self.ncpu = ncpu
+        self.mem_total = mem_total
+        self.latency = latency
+        self.route_latency = route_latency or {}
+        self.route_counts: Dict[str, int] = {}
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.images: Dict[str, Dict[str, Any]] = {}
+        self.volumes: Dict[str, Dict[str, Any]] = {}
+        self.request_count = 0
+        self._subscribers: List[asyncio.Queue] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self.routes = [
+            ("GET", r"/_ping", self.ping),
+            ("HEAD", r"/_ping", self.ping),
+            ("GET", r"/version", self.version),
+            ("GET", r"/info", self.info),
+            ("GET", r"/system/df", self.system_df),
+            ("GET", r"/events", self.events),
+            ("GET", r"/containers/json", self.list_containers),
+            ("POST", r"/containers/create", self.create_container),
+            ("GET", r"/containers/(?P<name>[^/]+)/json", self.inspect_container),
+            ("POST", r"/containers/(?P<name>[^/]+)/start", self.start_container),
+            ("POST", r"/containers/(?P<name>[^/]+)/stop", self.stop_container),
+            ("POST", r"/containers/(?P<name>[^/]+)/restart", self.restart_container),
+            ("POST", r"/containers/(?P<name>[^/]+)/rename", self.rename_container),
+            ("GET", r"/containers/(?P<name>[^/]+)/logs", self.container_logs),
+            ("GET", r"/containers/(?P<name>[^/]+)/stats", self.container_stats),
+            ("DELETE", r"/containers/(?P<name>[^/]+)", self.remove_container),
+            ("GET", r"/images/json", self.list_images),
+            ("POST", r"/images/create", self.pull_image),
+            ("POST", r"/build", self.build_image),
+            ("GET", r"/images/(?P<name>.+)/json", self.inspect_image),
+            ("POST", r"/images/(?P<name>.+)/tag", self.tag_image),
+            ("POST", r"/images/(?P<name>.+)/push", self.push_image),
+            ("DELETE", r"/images/(?P<name>.+)", self.remove_image),
+            ("POST", r"/auth", self.login),
+            ("GET", r"/volumes", self.list_volumes),
+            ("POST", r"/volumes/create", self.create_volume),
+            ("GET", r"/volumes/(?P<name>[^/]+)", self.inspect_volume),
+            ("DELETE", r"/volumes/(?P<name>[^/]+)", self.remove_volume),
+        ]
+        self._compiled = [(method, re.compile(f"^{pattern}$"), handler) for method, pattern, handler in self.routes]
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Open keep-alive connections too, so clients see the daemon go away.
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # Fixtures
+
+    def add_image(self, reference: str, size: int = 10 * 1024 * 1024) -> Dict[str, Any]:
+        if ":" not in reference.rsplit("/", 1)[-1]:
+            reference = f"{reference}:latest"
+        for image in self.images.values():
+            if reference in image["RepoTags"]:
+                image["Metadata"] = {"LastTagTime": _now()}
+                return image
+        image_id = _digest(reference)
+        image = {
+            "Id": image_id,
+            "RepoTags": [reference],
+            "Created": int(time.time()),
+            "Size": size,
+            "Labels": {},
+            "Metadata": {"LastTagTime": _now()},
+        }
+        self.images[image_id] = image
+        return image
+
+    def add_container(self, name: str, image: str = "busybox:latest", running: bool = True) -> Dict[str, Any]:
+        image_id = self.add_image(image)["Id"]
+        container_id = hashlib.sha256(name.encode("utf-8")).hexdigest()
+        container = {
+            "Id": container_id,
+            "Name": f"/{name}",
+            "Image": image_id,
+            "Created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "Config": {"Image": image, "Tty": False, "Labels": {}},
+            "State": {"Status": "running" if running else "created", "Running": running},
+        }
+        self.containers[container_id] = container
+        return container
+
+    def emit(self, type: str, action: str, actor_id: str, **attributes):
+        """Publish a /events message; call from handlers on the daemon's loop."""
+        now = time.time()
+        event = {
+            "Type": type,
+            "Action": action,
+            "Actor": {"ID": actor_id, "Attributes": attributes},
+            "scope": "local",
+            "time": int(now),
+            "timeNano": int(now * 1e9),
+        }
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def find_container(self, name: str) -> Optional[Dict[str, Any]]:
+        for container in self.containers.values():
+            if container["Id"].startswith(name) or container["Name"] == f"/{name}":
+                return container
+        return None
+
+    def find_image(self, name: str) -> Optional[Dict[str, Any]]:
+        if name in self.images:
+            return self.images[name]
+        reference = name if ":" in name.rsplit("/", 1)[-1] or name.startswith("sha256:") else f"{name}:latest"
+        for image in self.images.values():
+            if reference in image["RepoTags"] or image["Id"].startswith(name) or image["Id"][7:].startswith(name):
+                return image
+        return None
+
+    # HTTP plumbing
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await self._read_body(reader, headers)
+                await self._dispatch(writer, method, target, headers, body)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readline()).strip() or b"0", 16)
+                if size == 0:
+                    await reader.readline()
+                    return body
+                body += await reader.readexactly(size)
+                await reader.readline()
+        length = int(headers.get("content-length", 0))
+        return await reader.readexactly(length) if length else b""
+
+    async def _dispatch(self, writer, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.request_count += 1
+        url = urlsplit(target)
+        path = re.sub(r"^/v\d+\.\d+", "", unquote(url.path))
+        query = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        request = FakeRequest(method, path, query, headers, body)
+
+        for route_method, pattern, handler in self._compiled:
+            match = pattern.match(path)
+            if match and route_method == method:
+                self.route_counts[handler.__name__] = self.route_counts.get(handler.__name__, 0) + 1
+                delay = self.route_latency.get(handler.__name__, self.latency)
+                if delay:
+                    await asyncio.sleep(delay)
+                result = await handler(request, **match.groupdict())
+                break
+        else:
+            result = (404, {"message": f"page not found: {method} {path}"})
+
+        if isinstance(result, tuple):
+            status, payload = result[0], result[1]
+            content_type = result[2] if len(result) > 2 else "application/json"
+            await self._write_response(writer, status, payload, content_type)
+        else:
+            await self._write_stream(writer, result)
+
+    @staticmethod
+    async def _write_response(writer, status: int, payload: Any, content_type: str):
+        if isinstance(payload, bytes):
+            data = payload
+        elif isinstance(payload, str):
+            data = payload.encode("utf-8")
+        elif payload is None:
+            data = b""
+        else:
+            data = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} OK\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Api-Version: 1.43\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    @staticmethod
+    async def _write_stream(writer, chunks: AsyncIterator[bytes]):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Transfer-Encoding: chunked\r\nApi-Version: 1.43\r\n\r\n"
+        )
+        async for chunk in chunks:
+            if chunk:
+                writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _json_lines(events) -> AsyncIterator[bytes]:
+        for event in events:
+            yield json.dumps(event).encode("utf-8") + b"\r\n"
+            await asyncio.sleep(0)
+
+    @staticmethod
+    async def _json_lines_async(events) -> AsyncIterator[bytes]:
+        async for event in events:
+            yield json.dumps(event).encode("utf-8") + b"\r\n"
+
+    # Engine API
+
+    async def events(self, request: FakeRequest):
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+
+        async def stream():
+            try:
+                yield b""
+                while True:
+                    event = await queue.get()
+                    yield json.dumps(event).encode("utf-8") + b"\n"
+            finally:
+                self._subscribers.remove(queue)
+
+        return stream()
+
+    async def ping(self, request: FakeRequest):
+        return 200, "OK", "text/plain"
+
+    async def version(self, request: FakeRequest):
+        return 200, {"Version": "24.0.0-fake", "ApiVersion": "1.43", "MinAPIVersion": "1.12", "Os": "linux"}
+
+    async def info(self, request: FakeRequest):
+        running = sum(1 for c in self.containers.values() if c["State"]["Running"])
+        return 200, {
+            "Name": os.path.basename(os.path.dirname(self.socket_path)),
+            "NCPU": self.ncpu,
+            "MemTotal": self.mem_total,
+            "Containers": len(self.containers),
+            "ContainersRunning": running,
+            "Images": len(self.images),
+            "DockerRootDir": "/var/lib/docker",
+        }
+
+    def _container_summary(self, container: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "Id": container["Id"],
+            "Names": [container["Name"]],
+            "Created": calendar.timegm(time.strptime(container["Created"], "%Y-%m-%dT%H:%M:%SZ")),
+            "Image": container["Config"]["Image"],
+            "ImageID": container["Image"],
+            "Labels": container["Config"].get("Labels") or {},
+            "State": container["State"]["Status"],
+            "Status": container["State"]["Status"],
+        }
+
+    async def list_containers(self, request: FakeRequest):
+        show_all = request.flag("all")
+        labels = _label_filter(request)
+        filters = json.loads(request.query.get("filters") or "{}")
+        containers = [
+            c for c in self.containers.values()
+            if (show_all or c["State"]["Running"]) and _has_labels(c["Config"].get("Labels") or {}, labels)
+            and ("id" not in filters or any(c["Id"].startswith(i) for i in filters["id"]))
+            and ("name" not in filters or any(n in c["Name"] for n in filters["name"]))
+        ]
+        return 200, [self._container_summary(c) for c in containers]
+
+    async def create_container(self, request: FakeRequest):
+        body = request.json()
+        if self.find_image(body["Image"]) is None:
+            return 404, {"message": f"No such image: {body['Image']}"}
+        name = request.query.get("name") or f"fake_{len(self.containers)}_{int(time.time() * 1000)}"
+        if self.find_container(name) is not None:
+            return 409, {"message": f"Conflict. The container name \"/{name}\" is already in use"}
+        container = self.add_container(name, body["Image"], running=False)
+        container["Config"].update({"Tty": body.get("Tty", False), "Labels": body.get("Labels") or {}})
+        container["HostConfig"] = body.get("HostConfig", {})
+        self.emit("container", "create", container["Id"], name=name, image=body["Image"])
+        return 201, {"Id": container["Id"], "Warnings": []}
+
+    async def inspect_container(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        return 200, container
+
+    async def start_container(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        if container["State"]["Running"]:
+            return 304, None
+        container["State"] = {"Status": "running", "Running": True}
+        self.emit("container", "start", container["Id"], name=container["Name"][1:])
+        return 204, None
+
+    async def stop_container(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        if not container["State"]["Running"]:
+            return 304, None
+        container["State"] = {"Status": "exited", "Running": False}
+        self.emit("container", "die", container["Id"], name=container["Name"][1:], exitCode="0")
+        self.emit("container", "stop", container["Id"], name=container["Name"][1:])
+        return 204, None
+
+    async def rename_container(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        new_name = request.query.get("name", "")
+        if self.find_container(new_name) is not None:
+            return 409, {"message": f"Conflict. The container name \"/{new_name}\" is already in use"}
+        old_name, container["Name"] = container["Name"][1:], f"/{new_name}"
+        self.emit("container", "rename", container["Id"], name=new_name, oldName=f"/{old_name}")
+        return 204, None
+
+    async def restart_container(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        container["State"] = {"Status": "running", "Running": True}
+        self.emit("container", "restart", container["Id"], name=container["Name"][1:])
+        return 204, None
+
+    async def container_logs(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        lines = [f"log line {i} from {container['Name'][1:]}\n".encode("utf-8") for i in range(100)]
+        if request.flag("follow"):
+            return self._follow_logs(container["Name"][1:])
+        frames = b"".join(struct.pack(">BxxxL", 1, len(line)) + line for line in lines)
+        return 200, frames, "application/vnd.docker.multiplexed-stream"
+
+    async def container_stats(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        if not container["State"]["Running"]:
+            return 200, {"read": "0001-01-01T00:00:00Z", "cpu_stats": {}, "memory_stats": {}}
+        # Counters grow with wall time so consecutive samples give steady, non-zero rates.
+        ticks = time.time() - calendar.timegm(time.strptime(container["Created"], "%Y-%m-%dT%H:%M:%SZ"))
+        return 200, {
+            "read": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "cpu_stats": {
+                "cpu_usage": {"total_usage": int(ticks * 2.5e8)},
+                "system_cpu_usage": int(time.time() * 4e9),
+                "online_cpus": 4,
+            },
+            "memory_stats": {"usage": 64 * 1024 * 1024, "limit": 1024 * 1024 * 1024, "stats": {"inactive_file": 16 * 1024 * 1024}},
+            "networks": {"eth0": {"rx_bytes": int(ticks * 2048), "tx_bytes": int(ticks * 1024)}},
+            "blkio_stats": {"io_service_bytes_recursive": [{"op": "read", "value": int(ticks * 4096)}, {"op": "write", "value": int(ticks * 512)}]},
+            "pids_stats": {"current": 3},
+        }
+
+    @staticmethod
+    async def _follow_logs(name: str) -> AsyncIterator[bytes]:
+        i = 0
+        while True:
+            line = f"follow line {i} from {name}\n".encode("utf-8")
+            yield struct.pack(">BxxxL", 1 + i % 2, len(line)) + line
+            i += 1
+            await asyncio.sleep(0.01)
+
+    async def remove_container(self, request: FakeRequest, name: str):
+        container = self.find_container(name)
+        if container is None:
+            return 404, {"message": f"No such container: {name}"}
+        if container["State"]["Running"] and not request.flag("force"):
+            return 409, {"message": "You cannot remove a running container"}
+        del self.containers[container["Id"]]
+        self.emit("container", "destroy", container["Id"], name=container["Name"][1:])
+        return 204, None
+
+    async def list_images(self, request: FakeRequest):
+        labels = _label_filter(request)
+        return 200, [i for i in self.images.values() if _has_labels(i.get("Labels") or {}, labels)]
+
+    async def inspect_image(self, request: FakeRequest, name: str):
+        image = self.find_image(name)
+        if image is None:
+            return 404, {"message": f"No such image: {name}"}
+        return 200, image
+
+    def _identity(self, request: FakeRequest) -> Optional[str]:
+        header = request.headers.get("x-registry-auth")
+        auth = json.loads(base64.urlsafe_b64decode(header)) if header else {}
+        token = auth.get("identitytoken") or ""
+        return token[len("token-"):] if token.startswith("token-") else auth.get("username")
+
+    async def pull_image(self, request: FakeRequest):
+        reference = f"{request.query['fromImage']}:{request.query.get('tag') or 'latest'}"
+        if self.registry_users is not None:
+            self.registry_identities.append((reference, self._identity(request)))
+        image = self.add_image(reference)
+        self.emit("image", "pull", reference, name=reference)
+        layers = [hashlib.sha256(f"{reference}{i}".encode()).hexdigest()[:12] for i in range(3)]
+        events = [{"status": f"Pulling from {request.query['fromImage']}", "id": reference.rsplit(":", 1)[1]}]
+        for layer in layers:
+            events.append({"status": "Downloading", "id": layer, "progressDetail": {"current": 50, "total": 100}})
+            events.append({"status": "Pull complete", "id": layer})
+        events.append({"status": f"Status: Downloaded newer image for {reference}"})
+        return self._json_lines(events)
+
+    async def build_image(self, request: FakeRequest):
+        tag = request.query.get("t") or "fake-build:latest"
+        labels = request.query.get("labels") or "{}"
+        for other in self.images.values():
+            if tag in other["RepoTags"]:
+                other["RepoTags"].remove(tag)
+        image_id = _digest(tag + labels + str(len(self.images)))
+        image = {
+            "Id": image_id,
+            "RepoTags": [tag],
+            "Created": int(time.time()),
+            "Size": 10 * 1024 * 1024,
+            "Labels": json.loads(labels),
+            "Metadata": {"LastTagTime": _now()},
+        }
+        self.images[image_id] = image
+        self.emit("image", "tag", image_id, name=tag)
+        events = [{"stream": "Step 1/1 : FROM scratch\n"}, {"aux": {"ID": image["Id"]}}, {"stream": f"Successfully tagged {tag}\n"}]
+        return self._json_lines(events)
+
+    async def tag_image(self, request: FakeRequest, name: str):
+        image = self.find_image(name)
+        if image is None:
+            return 404, {"message": f"No such image: {name}"}
+        reference = f"{request.query['repo']}:{request.query.get('tag') or 'latest'}"
+        if reference not in image["RepoTags"]:
+            image["RepoTags"].append(reference)
+            image["Metadata"] = {"LastTagTime": _now()}
+            self.emit("image", "tag", image["Id"], name=reference)
+        return 201, None
+
+    async def push_image(self, request: FakeRequest, name: str):
+        tag = request.query.get("tag") or "latest"
+        image = self.find_image(f"{name}:{tag}")
+        if image is None:
+            return 404, {"message": f"No such image: {name}:{tag}"}
+        if self.registry_users is not None:
+            self.registry_identities.append((f"{name}:{tag}", self._identity(request)))
+        host = name.split("/", 1)[0]
+        repositories = self.registry.setdefault(host if "/" in name and ("." in host or ":" in host) else "docker.io", {})
+        layers = [_digest("base")[7:19]] + [_digest(f"{image['Id']}{i}")[7:19] for i in range(2)]
+        size = image["Size"] // len(layers)
+
+        async def events():
+            yield {"status": f"The push refers to repository [{name}]"}
+            for layer in layers:
+                yield {"status": "Preparing", "id": layer}
+            for layer in layers:
+                owners = [repo for repo, held in repositories.items() if layer in held]
+                if name in owners:
+                    yield {"status": "Layer already exists", "id": layer}
+                elif owners:
+                    yield {"status": f"Mounted from {owners[0]}", "id": layer}
+                else:
+                    for chunk in range(1, self.push_chunks + 1):
+                        await asyncio.sleep(self.layer_push_seconds / self.push_chunks)
+                        yield {"status": "Pushing", "id": layer, "progressDetail": {"current": size * chunk // self.push_chunks, "total": size}}
+                    yield {"status": "Pushed", "id": layer}
+                repositories.setdefault(name, set()).add(layer)
+            yield {"status": f"{tag}: digest: {_digest(name + image['Id'])} size: 1234"}
+            yield {"aux": {"Tag": tag, "Digest": _digest(name + image["Id"]), "Size": 1234}}
+
+        return self._json_lines_async(events())
+
+    async def remove_image(self, request: FakeRequest, name: str):
+        image = self.find_image(name)
+        if image is None:
+            return 404, {"message": f"No such image: {name}"}
+        reference = name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+        if reference in image["RepoTags"] and len(image["RepoTags"]) > 1:
+            # Removing one of several tags only untags it, like the real daemon.
+            image["RepoTags"].remove(reference)
+            self.emit("image", "untag", image["Id"], name=reference)
+            return 200, [{"Untagged": reference}]
+        users = [c for c in self.containers.values() if c["Image"] == image["Id"]]
+        if users and not request.flag("force"):
+            return 409, {"message": f"conflict: unable to delete {name} - image is being used by container {users[0]['Id'][:12]}"}
+        del self.images[image["Id"]]
+        self.emit("image", "delete", image["Id"], name=image["Id"])
+        return 200, [{"Untagged": tag} for tag in image["RepoTags"]] + [{"Deleted": image["Id"]}]
+
+    async def login(self, request: FakeRequest):
+        if self.registry_users is None:
+            return 200, {"Status": "Login Succeeded"}
+        auth = request.json()
+        if self.registry_users.get(auth.get("username")) != auth.get("password"):
+            return 401, {"message": "unauthorized: incorrect username or password"}
+        return 200, {"Status": "Login Succeeded", "IdentityToken": f"token-{auth['username']}"}
+
+    def _volume_refs(self, name: str) -> int:
+        binds = (bind.split(":", 1)[0] for c in self.containers.values() for bind in (c.get("HostConfig") or {}).get("Binds") or [])
+        return sum(1 for source in binds if source == name)
+
+    async def system_df(self, request: FakeRequest):
+        images = []
+        for image in self.images.values():
+            users = sum(1 for c in self.containers.values() if c["Image"] == image["Id"])
+            images.append({**{k: image[k] for k in ("Id", "RepoTags", "Created", "Size", "Labels")}, "SharedSize": 0, "Containers": users})
+        volumes = [
+            {**volume, "UsageData": {"Size": volume.get("UsageData", {}).get("Size", 0), "RefCount": self._volume_refs(volume["Name"])}}
+            for volume in self.volumes.values()
+        ]
+        return 200, {
+            "LayersSize": sum(image["Size"] for image in self.images.values()),
+            "Images": images,
+            "Containers": [self._container_summary(c) for c in self.containers.values()],
+            "Volumes": volumes,
+            "BuildCache": [],
+        }
+
+    async def list_volumes(self, request: FakeRequest):
+        return 200, {"Volumes": list(self.volumes.values()), "Warnings": []}
+
+    async def create_volume(self, request: FakeRequest):
+        body = request.json()
+        name = body.get("Name") or hashlib.sha256(str(time.time()).encode()).hexdigest()
+        volume = {
+            "Name": name,
+            "Driver": body.get("Driver") or "local",
+            "Labels": body.get("Labels") or {},
+            "Mountpoint": f"/var/lib/docker/volumes/{name}/_data",
+            "Scope": "local",
+            "CreatedAt": _now(),
+        }
+        self.volumes[name] = volume
+        self.emit("volume", "create", name, driver=volume["Driver"])
+        return 201, volume
+
+    async def inspect_volume(self, request: FakeRequest, name: str):
+        if name not in self.volumes:
+            return 404, {"message": f"get {name}: no such volume"}
+        return 200, self.volumes[name]
+
+    async def remove_volume(self, request: FakeRequest, name: str):
+        if name not in self.volumes:
+            return 404, {"message": f"get {name}: no such volume"}
+        if self._volume_refs(name) and not request.flag("force"):
+            return 409, {"message": f"remove {name}: volume is in use"}
+        del self.volumes[name]
+        self.emit("volume", "destroy", name, driver="local")
+        return 204, None
+
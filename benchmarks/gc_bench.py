@@ -0,0 +1,154 @@
+"""Image and volume garbage collection against a filling disk, served by ``app.create_app()``.
+
+Docker is the fake Engine API from ``benchmarks.fake_docker``; Mongo is the
+in-memory stand-in from ``benchmarks.memory_mongo``. The fake host gets
+``--images`` old images of ``--image-mb`` each, a ``user_containers`` history that
+used them at spread-out times, a few live containers and unattached volumes. The
+disk is ``GC_DISK_CAPACITY_BYTES``, sized so the images fill ``--fill`` of it.
+
+    python -m benchmarks.gc_bench --images 200 --fill 0.95 --remove-latency 0.02
+
+The dry-run report is fetched first, then one collection runs while a probe keeps
+calling ``/images/docker/images``. The result checks that images of live containers and
+recently used ones survive, that removal followed least-recent use, and reports
+the probe's latency during the collection.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks import memory_mongo
+from benchmarks.e2e_bench import DaemonThread, percentile, resolve_routes
+from scripts.constants.app_configuration import settings
+from scripts.utils import docker_utils
+from scripts.utils.jwt_utils import create_user_token
+
+
+def seed(daemon: DaemonThread, args):
+    """Old images, each last used ``i`` hours ago (image 0 most recently), plus live containers and volumes."""
+    fake = daemon.daemon
+    old = int(time.time()) - 30 * 86400
+    ids = []
+    for i in range(args.images):
+        image = fake.add_image(f"bench-gc-{i}:latest", size=args.image_mb * 2 ** 20)
+        image["Created"] = old
+        image["Metadata"] = {"LastTagTime": "2020-01-01T00:00:00Z"}
+        ids.append(image["Id"])
+    for i in range(args.live):
+        # Live containers pin the least recently used images.
+        fake.add_container(f"bench-gc-live-{i}", image=f"bench-gc-{args.images - 1 - i}:latest")
+    for i in range(args.volumes):
+        fake.volumes[f"bench-gc-vol-{i}"] = {
+            "Name": f"bench-gc-vol-{i}", "Driver": "local", "Labels": {}, "Mountpoint": "", "Scope": "local",
+            "CreatedAt": "2020-01-01T00:00:00Z", "UsageData": {"Size": args.image_mb * 2 ** 20},
+        }
+    return ids
+
+
+async def main(args):
+    settings.STATS_ENABLED = False
+    settings.GC_ENABLED = False
+    settings.GC_VOLUMES_ENABLED = args.volumes > 0
+    settings.GC_DISK_PATH = "/nonexistent"
+    used = (args.images * args.image_mb) * 2 ** 20
+    settings.GC_DISK_CAPACITY_BYTES = int(used / args.fill)
+
+    daemon = DaemonThread(args.docker_latency, route_latency={"remove_image": args.remove_latency, "system_df": args.df_latency})
+    ids = daemon.run(seed, daemon, args)
+    docker_utils.set_docker_client(docker_utils.DockerEngineClient(docker_host=f"unix://{daemon.socket_path}"))
+    database = memory_mongo.install()
+    now = datetime.utcnow()
+    history = database.collection("user_containers")
+    for i, image_id in enumerate(ids):
+        for j in range(args.uses):
+            history.insert_one({
+                "user_id": "bench-user", "container_name": f"bench-gc-{i}-{j}", "image_id": image_id,
+                "created_time": now - timedelta(hours=i + 2, minutes=j),
+            })
+    admin = {"Authorization": f"Bearer {create_user_token('bench-admin', 'Admin')}"}
+
+    from app import create_app
+    from scripts.utils.gc_utils import docker_gc
+
+    app = create_app()
+    routes = resolve_routes(app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+            started = time.perf_counter()
+            report = (await client.get(routes["ADMIN_GC_REPORT"]["path"], headers=admin)).json()
+            report_ms = (time.perf_counter() - started) * 1000
+            plan = report["hosts"][0]
+            planned = [c["tags"][0] if c.get("tags") else c["id"] for c in plan["evict"]]
+
+            probes, done = [], asyncio.Event()
+
+            async def probe():
+                while not done.is_set():
+                    probe_started = time.perf_counter()
+                    await client.get(routes["IMAGE_LIST"]["path"], headers=admin)
+                    probes.append(time.perf_counter() - probe_started)
+                    await asyncio.sleep(0.01)
+
+            baseline = []
+            for _ in range(20):
+                probe_started = time.perf_counter()
+                await client.get(routes["IMAGE_LIST"]["path"], headers=admin)
+                baseline.append(time.perf_counter() - probe_started)
+            probe_task = asyncio.create_task(probe())
+            started = time.perf_counter()
+            await docker_gc.collect()
+            collect_s = time.perf_counter() - started
+            done.set()
+            await probe_task
+            after = (await client.get(routes["ADMIN_GC_REPORT"]["path"], headers=admin)).json()["hosts"][0]
+
+    remaining = daemon.run(lambda: {tag for image in daemon.daemon.images.values() for tag in image["RepoTags"]})
+    removed = [i for i in range(args.images) if f"bench-gc-{i}:latest" not in remaining]
+    live = {args.images - 1 - i for i in range(args.live)}
+    daemon.stop()
+    print(json.dumps({
+        "config": vars(args),
+        "report": {
+            "ms": round(report_ms, 1),
+            "usage": plan["usage"],
+            "to_free": plan["to_free"],
+            "would_free": plan.get("would_free"),
+            "planned": len(planned),
+            "protected": plan["protected"],
+        },
+        "collection": {
+            "seconds": round(collect_s, 3),
+            "removed_images": len(removed),
+            "removed_volumes": docker_gc.stats["removed_volumes"],
+            "usage_after": after["usage"],
+            "live_images_removed": sorted(live & set(removed)),
+            # Image i was used i hours ago, so an LRU collection removes the highest indexes first.
+            "lru_order": removed == sorted(removed) and (not removed or min(removed) > max(set(range(args.images)) - set(removed) - live, default=-1)),
+            "stats": docker_gc.stats,
+        },
+        "image_list_latency": {
+            "idle_p50_ms": round(statistics.median(baseline) * 1000, 2),
+            "during_gc_p50_ms": round(statistics.median(probes) * 1000, 2) if probes else None,
+            "during_gc_p99_ms": round(percentile(probes, 99) * 1000, 2) if probes else None,
+            "during_gc_calls": len(probes),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--image-mb", type=int, default=100)
+    parser.add_argument("--uses", type=int, default=3, help="history records per image")
+    parser.add_argument("--live", type=int, default=5, help="live containers, on the least recently used images")
+    parser.add_argument("--volumes", type=int, default=0, help="unattached volumes; enables volume collection")
+    parser.add_argument("--fill", type=float, default=0.95, help="share of the disk the images use")
+    parser.add_argument("--remove-latency", type=float, default=0.02, help="seconds the daemon takes per image removal")
+    parser.add_argument("--df-latency", type=float, default=0.2, help="seconds the daemon takes for /system/df")
+    parser.add_argument("--docker-latency", type=float, default=0.001, help="seconds added to every other Docker call")
+    asyncio.run(main(parser.parse_args()))
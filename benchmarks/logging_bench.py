@@ -0,0 +1,150 @@
+"""Per-request cost of logging, with and without disk stalls.
+
+Each mode drives the same routes through ``httpx.ASGITransport``:
+
+- ``off``: the logger is disabled, the baseline.
+- ``sync``: the old setup, with the file and console handlers called inline
+  on the request path.
+- ``queue``: the current pipeline, where records are queued and a background
+  thread formats and writes them.
+
+``--stall-ms`` makes every ``--stall-every``-th write block, like a slow disk or a
+full pipe. The overhead reported for a mode is its mean latency minus the ``off``
+mean. Logs go to a temporary directory, and the console stream goes to
+``/dev/null``.
+
+    python -m benchmarks.logging_bench --requests 2000 --concurrency 16 --stall-ms 20 --stall-every 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+import httpx
+
+from benchmarks import memory_mongo
+from scripts.constants.app_configuration import settings
+from scripts.logging.logger import NonBlockingQueueHandler, RequestIdFilter, SamplingFilter, build_handlers, logger
+from scripts.utils.jwt_utils import create_user_token
+
+# One sync route (runs on the worker threads) and one async route; both log per request.
+ROUTES = ["/admin/admin/cache/tokens", "/stats/docker/host/stats?limit=1"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Stall:
+    def __init__(self, every: int, seconds: float):
+        self.every = every
+        self.seconds = seconds
+        self.writes = 0
+
+    def wrap(self, handler: logging.Handler) -> logging.Handler:
+        emit = handler.emit
+
+        def stalled_emit(record):
+            self.writes += 1
+            if self.seconds and self.writes % self.every == 0:
+                time.sleep(self.seconds)
+            emit(record)
+
+        handler.emit = stalled_emit
+        return handler
+
+
+def configure(mode: str, directory: str, stall: Stall, devnull):
+    """Point ``logger`` at a fresh set of handlers for ``mode``; returns a cleanup callable."""
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.disabled = mode == "off"
+    handlers = [stall.wrap(h) for h in build_handlers(os.path.join(directory, f"{mode}.log"), devnull)]
+
+    if mode == "sync":
+        for handler in handlers:
+            handler.addFilter(RequestIdFilter())
+            logger.addHandler(handler)
+        return lambda: [h.close() for h in handlers]
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+    logger.addHandler(queue_handler)
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    def cleanup():
+        listener.stop()
+        for h in handlers:
+            h.close()
+        return queue_handler.dropped
+
+    return cleanup
+
+
+async def drive(client: httpx.AsyncClient, args) -> list:
+    headers = {"Authorization": f"Bearer {create_user_token('bench-admin', 'Admin')}"}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(ROUTES[i % len(ROUTES)], headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return latencies
+
+
+async def main(args):
+    settings.LOG_SAMPLE_RATE = args.sample_rate
+    memory_mongo.install()
+    from app import create_app
+
+    app = create_app()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            # Warm-up with the default pipeline.
+            await drive(client, argparse.Namespace(requests=100, concurrency=args.concurrency))
+            for mode in args.modes:
+                stall = Stall(args.stall_every, args.stall_ms / 1000)
+                cleanup = configure(mode, directory, stall, devnull)
+                started = time.perf_counter()
+                latencies = await drive(client, args)
+                elapsed = time.perf_counter() - started
+                dropped = cleanup()
+                results[mode] = {
+                    "requests": len(latencies),
+                    "throughput_rps": round(len(latencies) / elapsed, 1),
+                    "mean_us": round(statistics.fmean(latencies) * 1e6, 1),
+                    "p50_us": round(statistics.median(latencies) * 1e6, 1),
+                    "p99_us": round(percentile(latencies, 99) * 1e6, 1),
+                    "records_written": stall.writes,
+                    "records_dropped": dropped if isinstance(dropped, int) else 0,
+                }
+    if "off" in results:
+        for mode, result in results.items():
+            result["overhead_per_request_us"] = round(result["mean_us"] - results["off"]["mean_us"], 1)
+    print(json.dumps({"config": vars(args), "modes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=["off", "sync", "queue"], default=["off", "sync", "queue"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stall-ms", type=float, default=0.0, help="how long a stalled write blocks")
+    parser.add_argument("--stall-every", type=int, default=50, help="stall one write in this many")
+    parser.add_argument("--sample-rate", type=float, default=1.0, help="LOG_SAMPLE_RATE for the queue mode")
+    asyncio.run(main(parser.parse_args()))
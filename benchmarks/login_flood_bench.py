@@ -0,0 +1,136 @@
+"""Login throughput and the latency of unrelated routes during a login flood.
+
+"before" is the old inline handler: a sync route that runs bcrypt on AnyIO's worker
+threads. "after" is the real ``/auth/login`` route, which awaits the password
+hashing process pool. While the flood runs, a probe keeps calling a sync route
+(``/admin/admin/cache/tokens``, which shares the worker threads) and an async one
+(``/stats/docker/host/stats``) and records their latency. Mongo is the in-memory
+stand-in from ``benchmarks.memory_mongo``.
+
+    python -m benchmarks.login_flood_bench --logins 200 --concurrency 32 --workers 2
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from passlib.context import CryptContext
+
+from benchmarks import memory_mongo
+from scripts.constants.app_configuration import settings
+from scripts.utils.jwt_utils import create_user_token
+from scripts.utils.password_utils import password_hasher
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(latencies, elapsed=None, statuses=None):
+    if not latencies:
+        return {"requests": 0}
+    result = {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+    }
+    if elapsed:
+        result["throughput_rps"] = round(len(latencies) / elapsed, 1)
+    if statuses:
+        result["statuses"] = statuses
+    return result
+
+
+def build_app(database):
+    from fastapi import Depends, HTTPException
+    from fastapi.security import OAuth2PasswordRequestForm
+    from app import create_app
+
+    app = create_app()
+    legacy_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+    @app.post("/bench/legacy-login")
+    def legacy_login(data: OAuth2PasswordRequestForm = Depends()):
+        record = database.collection("users").find_one({"username": data.username})
+        if not record or not legacy_context.verify(data.password, record["password"]):
+            raise HTTPException(status_code=401, detail="Invalid username or password")
+        return {"access_token": create_user_token(data.username, record["role"]), "token_type": "bearer"}
+
+    return app
+
+
+async def flood(client: httpx.AsyncClient, path: str, args) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, statuses = [], {}
+    probes = {"sync": [], "async": []}
+    headers = {"Authorization": f"Bearer {create_user_token('bench-admin', 'Admin')}"}
+    done = asyncio.Event()
+
+    async def login(i):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(path, data={"username": f"user{i % args.users}", "password": "secret"})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def probe(kind, url):
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get(url, headers=headers)
+            probes[kind].append(time.perf_counter() - started)
+            await asyncio.sleep(args.probe_interval)
+
+    probe_tasks = [
+        asyncio.create_task(probe("sync", "/admin/admin/cache/tokens")),
+        asyncio.create_task(probe("async", "/stats/docker/host/stats?limit=1")),
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*probe_tasks)
+    return {
+        "login": summarize(latencies, elapsed, statuses),
+        "sync_route_during_flood": summarize(probes["sync"]),
+        "async_route_during_flood": summarize(probes["async"]),
+    }
+
+
+async def main(args):
+    settings.BCRYPT_ROUNDS = args.rounds
+    settings.PASSWORD_HASH_WORKERS = args.workers
+    settings.PASSWORD_HASH_MAX_PENDING = args.max_pending
+    settings.STATS_ENABLED = False
+
+    database = memory_mongo.install()
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds).hash("secret")
+    for i in range(args.users):
+        database.collection("users").insert_one({"username": f"user{i}", "password": hashed, "role": "User"})
+
+    app = build_app(database)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+        # Start the worker processes before timing anything.
+        await client.post("/auth/login", data={"username": "user0", "password": "secret"})
+        results = {
+            "before": await flood(client, "/bench/legacy-login", args),
+            "after": await flood(client, "/auth/login", args),
+            "hasher": password_hasher.stats,
+        }
+    await password_hasher.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--workers", type=int, default=2, help="password hashing processes")
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
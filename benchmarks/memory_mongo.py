@@ -0,0 +1,348 @@
+"""An in-memory stand-in for the Mongo calls the app makes.
+
+``install()`` switches the ``mongo`` singleton over to it, so benchmarks can boot
+the real app (lifespan included) and drive real routes without a MongoDB server.
+It understands the query operators, update operators and cursor options the
+handlers use; anything else raises ``NotImplementedError`` rather than silently
+returning wrong results.
+"""
+import copy
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from scripts.utils.mongo_utils import MongoDBConnection, mongo
+
+
+class Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def _comparable(value: Any) -> Any:
+    # Mongo stores datetimes as UTC instants; compare aware and naive values alike.
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    value, operand = _comparable(value), _comparable(operand)
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in [_comparable(o) for o in operand]
+    if op == "$nin":
+        return value not in [_comparable(o) for o in operand]
+    if op == "$exists":
+        return (value is not None) == bool(operand)
+    if op == "$regex":
+        return isinstance(value, str) and re.search(operand, value) is not None
+    if value is None:
+        return False
+    try:
+        if op == "$lt":
+            return value < operand
+        if op == "$lte":
+            return value <= operand
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Query operator {op} is not supported")
+
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, c) for c in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, c) for c in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(document.get(key), op, operand) for op, operand in condition.items()):
+                return False
+        elif _comparable(document.get(key)) != _comparable(condition):
+            return False
+    return True
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(document)
+    included = {k for k, v in projection.items() if v and k != "_id"}
+    if included:
+        result = {k: v for k, v in document.items() if k in included}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+    else:
+        result = {k: v for k, v in document.items() if projection.get(k, 1)}
+    return copy.deepcopy(result)
+
+
+def _apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool):
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            document.update(copy.deepcopy(fields))
+        elif op == "$inc":
+            for key, amount in fields.items():
+                document[key] = document.get(key, 0) + amount
+        elif op == "$unset":
+            for key in fields:
+                document.pop(key, None)
+        elif op != "$setOnInsert":
+            raise NotImplementedError(f"Update operator {op} is not supported")
+
+
+def _group(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """``$group`` on one ``$field`` with ``$first``, ``$max`` and ``$sum`` accumulators."""
+    key_spec = spec["_id"]
+    if not (isinstance(key_spec, str) and key_spec.startswith("$")):
+        raise NotImplementedError("Only $group on a single field is supported")
+    accumulators = {field: next(iter(accumulator.items())) for field, accumulator in spec.items() if field != "_id"}
+    for op, _ in accumulators.values():
+        if op not in ("$first", "$max", "$sum"):
+            raise NotImplementedError(f"Accumulator {op} is not supported")
+
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for document in documents:
+        key = document.get(key_spec[1:])
+        group = groups.get(key)
+        for field, (op, operand) in accumulators.items():
+            value = document.get(operand[1:]) if isinstance(operand, str) and operand.startswith("$") else operand
+            if op == "$sum":
+                value = value or 0
+            if group is None:
+                groups.setdefault(key, {"_id": key})[field] = value
+            elif op == "$sum":
+                group[field] += value
+            elif op == "$max" and value is not None and (group[field] is None or _comparable(value) > _comparable(group[field])):
+                group[field] = value
+        groups.setdefault(key, {"_id": key})
+    return list(groups.values())
+
+
+class MemoryCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self._documents = documents
+        self._index = 0
+
+    def __iter__(self):
+        return iter(self._documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._index >= len(self._documents):
+            raise StopAsyncIteration
+        self._index += 1
+        return self._documents[self._index - 1]
+
+    async def to_list(self, length: Optional[int] = None):
+        return self._documents if length is None else self._documents[:length]
+
+    async def close(self):
+        self._index = len(self._documents)
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: List[Dict[str, Any]] = []
+        self.indexes: Dict[str, Dict[str, Any]] = {"_id_": {"key": [("_id", 1)]}}
+
+    def _find(self, query: Optional[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        return (d for d in self.documents if matches(d, query))
+
+    def find(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        limit: int = 0,
+        skip: int = 0,
+        batch_size: Optional[int] = None,
+    ) -> MemoryCursor:
+        documents = list(self._find(query))
+        for key, direction in reversed(sort or []):
+            documents.sort(key=lambda d: (d.get(key) is not None, _comparable(d.get(key))), reverse=direction < 0)
+        documents = documents[skip:]
+        if limit:
+            documents = documents[:limit]
+        return MemoryCursor([project(d, projection) for d in documents])
+
+    def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        for document in self._find(query):
+            return project(document, projection)
+        return None
+
+    def count_documents(self, query: Optional[Dict[str, Any]] = None) -> int:
+        return sum(1 for _ in self._find(query))
+
+    def distinct(self, key: str, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        return list(dict.fromkeys(d[key] for d in self._find(query) if key in d))
+
+    def insert_one(self, document: Dict[str, Any]):
+        document.setdefault("_id", ObjectId())
+        self.documents.append(copy.deepcopy(document))
+        return Result(inserted_id=document["_id"])
+
+    def _upsert(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        document = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        document["_id"] = ObjectId()
+        _apply_update(document, update, inserting=True)
+        self.documents.append(document)
+        return document
+
+    def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        for document in self._find(query):
+            _apply_update(document, update, inserting=False)
+            return Result(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            return Result(matched_count=0, modified_count=0, upserted_id=self._upsert(query, update)["_id"])
+        return Result(matched_count=0, modified_count=0, upserted_id=None)
+
+    def find_one_and_update(
+        self,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+    ):
+        for document in self._find(query):
+            before = project(document, projection)
+            _apply_update(document, update, inserting=False)
+            return project(document, projection) if return_document == ReturnDocument.AFTER else before
+        if upsert:
+            document = self._upsert(query, update)
+            return project(document, projection) if return_document == ReturnDocument.AFTER else None
+        return None
+
+    def delete_one(self, query: Dict[str, Any]):
+        for i, document in enumerate(self.documents):
+            if matches(document, query):
+                del self.documents[i]
+                return Result(deleted_count=1)
+        return Result(deleted_count=0)
+
+    def create_indexes(self, models) -> List[str]:
+        names = []
+        for model in models:
+            document = model.document
+            self.indexes[document["name"]] = {
+                "key": list(document["key"].items()),
+                **{k: document[k] for k in ("unique", "expireAfterSeconds") if k in document},
+            }
+            names.append(document["name"])
+        return names
+
+    def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return copy.deepcopy(self.indexes)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> MemoryCursor:
+        if pipeline == [{"$indexStats": {}}]:
+            return MemoryCursor([{"name": name, "accesses": {"ops": 0, "since": None}} for name in self.indexes])
+        documents = [copy.deepcopy(d) for d in self.documents]
+        for stage in pipeline:
+            (op, spec), = stage.items()
+            if op == "$match":
+                documents = [d for d in documents if matches(d, spec)]
+            elif op == "$sort":
+                for key, direction in reversed(list(spec.items())):
+                    documents.sort(key=lambda d: (d.get(key) is not None, _comparable(d.get(key))), reverse=direction < 0)
+            elif op == "$group":
+                documents = _group(documents, spec)
+            else:
+                raise NotImplementedError(f"Aggregation stage {op} is not supported")
+        return MemoryCursor(documents)
+
+
+class AsyncMemoryCollection:
+    """The same collection behind awaitable methods, like ``AsyncMongoClient`` collections."""
+
+    def __init__(self, collection: MemoryCollection):
+        self.sync = collection
+        self.name = collection.name
+
+    def find(self, *args, **kwargs) -> MemoryCursor:
+        return self.sync.find(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        method = getattr(self.sync, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def collection(self, name: str) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(name)
+        return self.collections[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.collection(name)
+
+
+class AsyncMemoryDatabase:
+    def __init__(self, database: MemoryDatabase):
+        self.sync = database
+
+    def __getitem__(self, name: str) -> AsyncMemoryCollection:
+        return AsyncMemoryCollection(self.sync.collection(name))
+
+    async def command(self, command, *args, **kwargs) -> Dict[str, Any]:
+        if command in ("ping", "collMod") or isinstance(command, dict):
+            return {"ok": 1.0}
+        if command == "explain":
+            return {"queryPlanner": {"winningPlan": {"stage": "MEMORY"}}, "executionStats": {}}
+        raise NotImplementedError(f"Command {command} is not supported")
+
+
+class MemoryMongoConnection(MongoDBConnection):
+    """``MongoDBConnection`` backed by a ``MemoryDatabase`` instead of a server."""
+
+    memory: MemoryDatabase
+
+    @property
+    def db(self):
+        return self.memory
+
+    @property
+    def async_db(self):
+        return AsyncMemoryDatabase(self.memory)
+
+    def get_collection(self, collection_name: str):
+        return self.memory.collection(collection_name)
+
+    def get_async_collection(self, collection_name: str):
+        return AsyncMemoryCollection(self.memory.collection(collection_name))
+
+    async def connect(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+
+def install(database: Optional[MemoryDatabase] = None) -> MemoryDatabase:
+    """Point the process-wide ``mongo`` instance at ``database`` (a new one by default)."""
+    database = database or MemoryDatabase()
+    mongo.__class__ = MemoryMongoConnection
+    mongo.memory = database
+    return database
@@ -0,0 +1,189 @@
+"""Container placement across several Docker hosts, served by ``app.create_app()``.
+
+Each host is a fake Engine API from ``benchmarks.fake_docker`` with its own
+capacity (host ``i`` has ``2 * (i + 1)`` CPUs and ``2 * (i + 1)`` GiB). The first
+is the primary; the others are registered as extra hosts. The image is seeded on
+every host but the last, so that one should never be chosen. Mongo is the
+in-memory stand-in from ``benchmarks.memory_mongo``.
+
+    python -m benchmarks.placement_bench --hosts 3 --containers 40 --strategy balanced
+
+Containers are created concurrently through ``/container/docker/containers/advanced``,
+then started, stopped and read back with the location cache cleared, so calls are
+routed from ``user_containers``. Each container must live on the host the create
+call reported and only there, and the container list and the stats collector must
+see it on that host. Finally one host is stopped and a second round must avoid it.
+The result reports containers per host, routing errors and latency.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks import memory_mongo
+from benchmarks.e2e_bench import DaemonThread, percentile, resolve_routes
+from scripts.constants.app_configuration import settings
+from scripts.utils import docker_utils
+from scripts.utils.fleet_utils import fleet
+from scripts.utils.jwt_utils import create_user_token
+
+
+IMAGE = "busybox:latest"
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def create_round(client, routes, args, tag: str, headers) -> Dict[str, object]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    placed: Dict[str, str] = {}
+    latencies, statuses = [], {}
+
+    async def create(i: int):
+        async with semaphore:
+            body = {"image": IMAGE, "name": f"bench-{tag}-{i}", "mem_limit": args.mem_limit, "nano_cpus": int(args.cpus * 1e9)}
+            started = time.perf_counter()
+            response = await client.post(routes["CONTAINER_CREATE_ADVANCED"]["path"], json=body, headers=headers(i))
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                placed[body["name"]] = response.json()["host"]
+
+    await asyncio.gather(*(create(i) for i in range(args.containers)))
+    distribution: Dict[str, int] = {}
+    for host in placed.values():
+        distribution[host] = distribution.get(host, 0) + 1
+    return {"placed": placed, "distribution": distribution, "statuses": statuses, "latency": summarize(latencies)}
+
+
+def misplaced(daemons: Dict[str, DaemonThread], placed: Dict[str, str]) -> List[str]:
+    """Containers missing from the reported host or present on another one."""
+    errors = []
+    for name, host in placed.items():
+        holders = [h for h, daemon in daemons.items() if daemon.run(daemon.daemon.find_container, name) is not None]
+        if holders != [host]:
+            errors.append(f"{name}: reported {host}, found on {holders}")
+    return errors
+
+
+async def route_round(client, routes, placed: Dict[str, str], admin) -> Dict[str, object]:
+    latencies, statuses = [], {}
+
+    async def call(name: str, route: str, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(routes[route]["method"], routes[route]["path"].format(container_name=name), headers=admin, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        key = f"{route}:{response.status_code}"
+        statuses[key] = statuses.get(key, 0) + 1
+
+    for route, kwargs in (("CONTAINER_STOP", {"params": {"timeout": 0}}), ("CONTAINER_START", {}), ("CONTAINER_LOGS", {"json": {"tail": 10}})):
+        await asyncio.gather(*(call(name, route, **kwargs) for name in placed))
+    return {"statuses": statuses, "latency": summarize(latencies)}
+
+
+async def visibility_round(client, routes, placed: Dict[str, str], admin) -> Dict[str, object]:
+    """Whether the inventory-backed list and the stats collector see every container on its own host."""
+    from scripts.utils.inventory_utils import inventory
+    from scripts.utils.stats_utils import stats_collector
+
+    while not all(name in inventory.live for name in fleet.hosts):
+        await asyncio.sleep(0.05)
+    listed = (await client.post(routes["CONTAINER_LIST"]["path"], json={"all": True}, headers=admin)).json()
+    hosts = {c["name"]: c["host"] for c in listed}
+    await stats_collector.sample()
+    sampled = {entry.name for entry in stats_collector.containers.values()}
+    return {
+        "listed": len(hosts),
+        "wrong_host_in_list": [name for name, host in placed.items() if hosts.get(name) != host],
+        "missing_from_stats": [name for name in placed if name not in sampled],
+    }
+
+
+async def main(args):
+    settings.STATS_ENABLED = False
+    settings.PLACEMENT_STRATEGY = args.strategy
+    settings.DOCKER_HEALTH_INTERVAL_SECONDS = 3600
+
+    daemons: Dict[str, DaemonThread] = {}
+    for i in range(args.hosts):
+        name = settings.DOCKER_HOST_NAME if i == 0 else f"host-{i}"
+        daemons[name] = DaemonThread(args.docker_latency, ncpu=2 * (i + 1), mem_total=2 * (i + 1) * 1024 ** 3)
+        if i < args.hosts - 1:
+            daemons[name].run(daemons[name].daemon.add_image, IMAGE)
+        client = docker_utils.DockerEngineClient(docker_host=f"unix://{daemons[name].socket_path}")
+        if i == 0:
+            docker_utils.set_docker_client(client)
+        else:
+            fleet.add_host(name, client)
+
+    database = memory_mongo.install()
+    users = [f"bench-user-{i}" for i in range(args.users)]
+    tokens = {user: create_user_token(user, "User") for user in users}
+    for user in users:
+        database.collection("users").insert_one({"username": user, "role": "User"})
+        database.collection("rate_limits").insert_one({"user_id": user, "limit": 10 ** 9, "time_window": 3600})
+    admin = {"Authorization": f"Bearer {create_user_token('bench-admin', 'Admin')}"}
+
+    def as_user(i: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {tokens[users[i % len(users)]]}"}
+
+    from app import create_app
+
+    app = create_app()
+    routes = resolve_routes(app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+            first = await create_round(client, routes, args, "a", as_user)
+            placed = first.pop("placed")
+            first["misplaced"] = misplaced(daemons, placed)
+            # Route from user_containers rather than the locations remembered at create time.
+            fleet._locations.clear()
+            routing = await route_round(client, routes, placed, admin)
+            routing["fleet"] = dict(fleet.stats)
+            visibility = await visibility_round(client, routes, placed, admin)
+
+            lost = list(daemons)[-2] if args.hosts > 2 else None
+            second = None
+            if lost is not None:
+                daemons[lost].call(daemons[lost].daemon.stop())
+                await fleet.check()
+                second = await create_round(client, routes, args, "b", as_user)
+                second["misplaced"] = misplaced({h: d for h, d in daemons.items() if h != lost}, second.pop("placed"))
+            hosts = (await client.get(routes["ADMIN_DOCKER_HOSTS"]["path"], headers=admin)).json()
+
+    for name, daemon in daemons.items():
+        if name != lost:
+            daemon.stop()
+    result = {
+        "config": {"hosts": args.hosts, "containers": args.containers, "strategy": args.strategy, "mem_limit": args.mem_limit, "cpus": args.cpus},
+        "first_round": first,
+        "routing": routing,
+        "visibility": visibility,
+        "after_losing_host": {"lost": lost, **(second or {})},
+        "hosts": hosts["hosts"],
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=3)
+    parser.add_argument("--containers", type=int, default=40, help="containers per round")
+    parser.add_argument("--strategy", choices=["balanced", "memory", "cpu", "containers"], default="balanced")
+    parser.add_argument("--mem-limit", default="128m")
+    parser.add_argument("--cpus", type=float, default=0.1)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--docker-latency", type=float, default=0.002, help="seconds added to every Docker call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""Streamed multi-target image push, served by ``app.create_app()``.
+
+Docker is the fake Engine API from ``benchmarks.fake_docker``; its in-memory
+registry uploads a layer in ``--layer-seconds`` unless the repository (or another
+one on the same registry) already has it. Mongo is the in-memory stand-in from
+``benchmarks.memory_mongo``.
+
+    python -m benchmarks.push_bench --images 4 --tags 3 --parallel 4 --layer-seconds 0.2
+
+One call to ``/images/docker/images/push/stream`` pushes ``--images`` local images,
+each to its own repository under ``--tags`` tags, first with ``parallel=1`` and then
+with ``--parallel``, each against an empty registry. The result reports wall time,
+layers uploaded against layers skipped, and the decoded events streamed per type
+(byte progress is coalesced to one event per layer per interval).
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks import memory_mongo
+from benchmarks.e2e_bench import DaemonThread, resolve_routes
+from scripts.constants.app_configuration import settings
+from scripts.utils import docker_utils
+from scripts.utils.jwt_utils import create_user_token
+
+
+async def run(args, parallel: int):
+    daemon = DaemonThread(args.docker_latency, layer_push_seconds=args.layer_seconds, push_chunks=args.chunks)
+    for i in range(args.images):
+        daemon.run(daemon.daemon.add_image, f"bench-push-{i}:latest")
+    docker_utils.set_docker_client(docker_utils.DockerEngineClient(docker_host=f"unix://{daemon.socket_path}"))
+    admin = {"Authorization": f"Bearer {create_user_token('bench-admin', 'Admin')}"}
+    targets = [
+        {"local_tag": f"bench-push-{i}:latest", "remote_repo": f"registry.local/bench/app{i}:v{t}"}
+        for i in range(args.images) for t in range(args.tags)
+    ]
+
+    from app import create_app
+
+    app = create_app()
+    routes = resolve_routes(app)
+    counts, summary = {}, None
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+            started = time.perf_counter()
+            async with client.stream(
+                "POST", routes["IMAGE_PUSH_STREAM"]["path"], json={"targets": targets, "parallel": parallel, "force": True}, headers=admin
+            ) as response:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    key = event["type"] if event["type"] != "layer" else f"layer:{event['status']}"
+                    counts[key] = counts.get(key, 0) + 1
+                    if event["type"] == "summary":
+                        summary = event
+            elapsed = time.perf_counter() - started
+    daemon.stop()
+    return {
+        "parallel": parallel,
+        "seconds": round(elapsed, 3),
+        "events": counts,
+        "summary": summary,
+    }
+
+
+async def main(args):
+    settings.STATS_ENABLED = False
+    settings.GC_ENABLED = False
+    settings.INVENTORY_ENABLED = False
+    settings.IMAGE_PUSH_MAX_CONCURRENT = max(args.parallel, 1)
+    memory_mongo.install()
+    results = [await run(args, 1), await run(args, args.parallel)]
+    print(json.dumps({"config": vars(args), "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=4, help="local images, each pushed to its own repository")
+    parser.add_argument("--tags", type=int, default=3, help="tags per repository")
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--layer-seconds", type=float, default=0.2, help="seconds the registry takes to upload one layer")
+    parser.add_argument("--chunks", type=int, default=20, help="progress events per uploaded layer")
+    parser.add_argument("--docker-latency", type=float, default=0.001, help="seconds added to every Docker call")
+    asyncio.run(main(parser.parse_args()))
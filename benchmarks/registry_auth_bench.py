@@ -0,0 +1,110 @@
+"""Per-user registry logins across pulls and pushes, served by ``app.create_app()``.
+
+Docker is the fake Engine API from ``benchmarks.fake_docker`` with ``registry_users``,
+so ``/auth`` checks credentials and every pull and push records the identity it
+was made as; Mongo is the in-memory stand-in from ``benchmarks.memory_mongo``.
+
+    python -m benchmarks.registry_auth_bench --users 10 --operations 20
+
+``--users`` users each log in to ``registry.local`` with their own credentials
+(one more tries a wrong password and one never logs in), then every user pulls
+and pushes ``--operations`` references of its own, ``--concurrency`` requests
+at a time. The result reports ``/auth`` calls against logins and operations,
+any operation that reached the registry as someone other than its caller, and
+the credential cache's hits and misses.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks import memory_mongo
+from benchmarks.e2e_bench import DaemonThread, resolve_routes
+from scripts.constants.app_configuration import settings
+from scripts.utils import docker_utils
+from scripts.utils.jwt_utils import create_user_token
+
+
+REGISTRY = "registry.local"
+
+
+async def main(args):
+    settings.STATS_ENABLED = False
+    settings.GC_ENABLED = False
+    settings.INVENTORY_ENABLED = False
+
+    users = [f"bench-reg-{u}" for u in range(args.users)]
+    daemon = DaemonThread(args.docker_latency, registry_users={f"{user}-remote": f"{user}-secret" for user in users})
+    for user in users + ["bench-anonymous"]:
+        for k in range(args.operations):
+            daemon.run(daemon.daemon.add_image, f"{user}-local-{k}:latest")
+    docker_utils.set_docker_client(docker_utils.DockerEngineClient(docker_host=f"unix://{daemon.socket_path}"))
+    memory_mongo.install()
+    headers = {user: {"Authorization": f"Bearer {create_user_token(user, 'User')}"} for user in users + ["bench-intruder", "bench-anonymous"]}
+
+    from app import create_app
+    from scripts.utils.registry_auth_utils import registry_credentials
+
+    app = create_app()
+    routes = resolve_routes(app)
+    statuses = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+            login = routes["DOCKER_REGISTRY_LOGIN"]["path"]
+            for user in users:
+                response = await client.post(login, params={"username": f"{user}-remote", "password": f"{user}-secret", "registry": REGISTRY}, headers=headers[user])
+                statuses[f"login:{response.status_code}"] = statuses.get(f"login:{response.status_code}", 0) + 1
+            response = await client.post(login, params={"username": f"{users[0]}-remote", "password": "wrong", "registry": REGISTRY}, headers=headers["bench-intruder"])
+            statuses[f"bad_login:{response.status_code}"] = 1
+            auth_calls = daemon.run(lambda: daemon.daemon.route_counts.get("login", 0))
+
+            slots = asyncio.Semaphore(args.concurrency)
+
+            async def operate(user: str, k: int):
+                async with slots:
+                    pull = await client.post(
+                        routes["IMAGE_PULL"]["path"], params={"repository": f"{REGISTRY}/{user}/pulled-{k}:latest"}, headers=headers[user]
+                    )
+                    push = await client.post(
+                        routes["IMAGE_PUSH"]["path"],
+                        params={"local_tag": f"{user}-local-{k}:latest", "remote_repo": f"{REGISTRY}/{user}/pushed-{k}:latest"},
+                        headers=headers[user],
+                    )
+                for kind, response in (("pull", pull), ("push", push)):
+                    key = f"{kind}:{response.status_code}"
+                    statuses[key] = statuses.get(key, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(operate(user, k) for user in users + ["bench-anonymous"] for k in range(args.operations)))
+            elapsed = time.perf_counter() - started
+            auth_calls_after = daemon.run(lambda: daemon.daemon.route_counts.get("login", 0))
+            identities = daemon.run(lambda: list(daemon.daemon.registry_identities))
+            stats = dict(registry_credentials.stats)
+
+    daemon.stop()
+    # References are "registry.local/<user>/..."; the identity should be "<user>-remote", or none for the anonymous user.
+    wrong = [
+        (reference, identity) for reference, identity in identities
+        if identity != (None if "/bench-anonymous/" in reference else f"{reference.split('/')[1]}-remote")
+    ]
+    print(json.dumps({
+        "config": vars(args),
+        "seconds": round(elapsed, 3),
+        "statuses": statuses,
+        "operations": len(identities),
+        "auth_calls": {"at_login": auth_calls, "during_operations": auth_calls_after - auth_calls},
+        "wrong_identity": len(wrong),
+        "wrong_identity_samples": wrong[:5],
+        "credential_cache": stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--operations", type=int, default=20, help="pulls and pushes per user")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--docker-latency", type=float, default=0.001, help="seconds added to every Docker call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""Container create latency with and without the warm pool, served by ``app.create_app()``.
+
+Docker is the fake Engine API from ``benchmarks.fake_docker``, with ``--create-latency``
+added to every container create to model the daemon's create cost. Mongo is the
+in-memory stand-in from ``benchmarks.memory_mongo``. Each mode runs in its own
+process, because the pool is configured from ``WARM_POOL_PROFILES`` at import:
+
+    python -m benchmarks.warm_pool_bench --requests 100 --pool-size 8 --interval 0.05
+
+"cold" runs without profiles. "warm" configures one profile that matches the
+requests, waits for it to fill, then sends the same requests, one every
+``--interval`` seconds, so refills race the arrivals. The result reports create
+latency per mode and the pool's hit rate and per-source latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks import memory_mongo
+from benchmarks.e2e_bench import DaemonThread, percentile, resolve_routes
+from scripts.constants.app_configuration import settings
+from scripts.utils import docker_utils
+from scripts.utils.jwt_utils import create_user_token
+
+
+IMAGE = "busybox:latest"
+PROFILE = {"image": IMAGE, "mem_limit": "128m", "nano_cpus": 250000000}
+
+
+async def run(args):
+    settings.STATS_ENABLED = False
+    settings.WARM_POOL_PROFILES = json.dumps([{**PROFILE, "size": args.pool_size}]) if args.mode == "warm" else ""
+    settings.WARM_POOL_REFILL_INTERVAL_SECONDS = 1.0
+
+    daemon = DaemonThread(args.docker_latency, route_latency={"create_container": args.create_latency})
+    daemon.run(daemon.daemon.add_image, IMAGE)
+    docker_utils.set_docker_client(docker_utils.DockerEngineClient(docker_host=f"unix://{daemon.socket_path}"))
+    database = memory_mongo.install()
+    database.collection("rate_limits").insert_one({"user_id": "bench-user", "limit": 10 ** 9, "time_window": 3600})
+    user = {"Authorization": f"Bearer {create_user_token('bench-user', 'User')}"}
+    admin = {"Authorization": f"Bearer {create_user_token('bench-admin', 'Admin')}"}
+
+    from app import create_app
+    from scripts.utils.warm_pool_utils import warm_pool
+
+    app = create_app()
+    routes = resolve_routes(app)
+    latencies, statuses = [], {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+            deadline = time.monotonic() + 30
+            while warm_pool.enabled and sum(map(len, warm_pool.ready.values())) < args.pool_size and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+
+            async def create(i: int):
+                started = time.perf_counter()
+                response = await client.post(
+                    routes["CONTAINER_CREATE_ADVANCED"]["path"], json={**PROFILE, "name": f"bench-{args.mode}-{i}"}, headers=user
+                )
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            tasks = []
+            for i in range(args.requests):
+                tasks.append(asyncio.create_task(create(i)))
+                await asyncio.sleep(args.interval)
+            await asyncio.gather(*tasks)
+            pool = (await client.get(routes["ADMIN_WARM_POOL"]["path"], headers=admin)).json()
+
+    daemon.stop()
+    return {
+        "requests": len(latencies),
+        "statuses": statuses,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "pool": {key: pool[key] for key in ("stats", "hit_rate", "create_latency")},
+    }
+
+
+def compare(args):
+    results = {}
+    for mode in ("cold", "warm"):
+        command = [sys.executable, "-m", "benchmarks.warm_pool_bench", "--mode", mode, *sys.argv[1:]]
+        output = subprocess.run(command, check=True, capture_output=True, text=True, env=os.environ).stdout
+        results[mode] = json.loads(output)
+    results["config"] = {
+        "requests": args.requests,
+        "pool_size": args.pool_size,
+        "interval_ms": args.interval * 1000,
+        "create_latency_ms": args.create_latency * 1000,
+        "docker_latency_ms": args.docker_latency * 1000,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["cold", "warm"], help="run one mode; by default both run and are compared")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between requests")
+    parser.add_argument("--create-latency", type=float, default=0.1, help="seconds added to each container create")
+    parser.add_argument("--docker-latency", type=float, default=0.002, help="seconds added to every other Docker call")
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(asyncio.run(run(args))))
+    else:
+        compare(args)
@@ -1,8 +1,20 @@
 import uvicorn
-from app import create_app
 from scripts.constants.app_configuration import settings
 
-app = create_app()
+
+def load_app():
+    from app import create_app
+    return create_app()
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host=settings.API_HOST, port=settings.API_PORT)
+    if settings.API_RELOAD:
+        # Development: restart on code changes (single process).
+        uvicorn.run("main:app", host=settings.API_HOST, port=settings.API_PORT, reload=True)
+    elif settings.API_WORKERS > 1:
+        from scripts.utils.supervisor_utils import Supervisor
+        Supervisor(load_app).run()
+    else:
+        uvicorn.run(load_app(), host=settings.API_HOST, port=settings.API_PORT)
+else:
+    app = load_app()
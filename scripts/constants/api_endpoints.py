@@ -8,9 +8,17 @@ class Endpoints:
 
     IMAGE_BUILD_ADVANCED = "/docker/images/build"
     IMAGE_BUILD_FROM_GITHUB = "/docker/images/github-build"
+    IMAGE_BUILD_JOBS = "/docker/images/builds"
+    IMAGE_BUILD_JOB_STATUS = "/docker/images/builds/{job_id}"
+    IMAGE_BUILD_JOB_PROGRESS = "/docker/images/builds/{job_id}/progress"
+    IMAGE_BUILD_JOB_RESULT = "/docker/images/builds/{job_id}/result"
     DOCKER_REGISTRY_LOGIN = "/docker/registry/login"
+    DOCKER_REGISTRY_LOGOUT = "/docker/registry/logout"
+    DOCKER_REGISTRY_LOGINS = "/docker/registry/logins"
     IMAGE_PUSH = "/docker/images/push"
+    IMAGE_PUSH_STREAM = "/docker/images/push/stream"
     IMAGE_PULL = "/docker/images/pull"
+    IMAGE_PULL_STREAM = "/docker/images/pull/stream"
     IMAGE_LIST = "/docker/images"
     IMAGE_DELETE = "/docker/images/{image_name}/delete"
 
@@ -19,17 +27,35 @@ class Endpoints:
     CONTAINER_START = "/docker/containers/{container_name}/start"
     CONTAINER_STOP = "/docker/containers/{container_name}/stop"
     CONTAINER_LOGS = "/docker/containers/{container_name}/logs"
-    CONTAINER_LIST = "/docker/containers"
+    CONTAINER_LOGS_STREAM = "/docker/containers/{container_name}/logs/stream"
+    CONTAINER_LOGS_WS = "/docker/containers/{container_name}/logs/ws"
+    CONTAINER_LIST = "/docker/containers/list"
+    CONTAINER_BULK = "/docker/containers/bulk"
+    CONTAINER_STATS = "/docker/containers/{container_name}/stats"
     CONTAINER_DETAILS = "/docker/containers/{container_name}"
     CONTAINER_DELETE = "/docker/containers/{container_name}/delete"
 
+    USER_STATS = "/docker/users/{username}/stats"
+    HOST_STATS = "/docker/host/stats"
+
+    VOLUME_LIST = "/docker/volumes"
     VOLUME_CREATE = "/docker/volumes/create"
     VOLUME_DELETE = "/docker/volumes/{volume_name}/delete"
+    DISK_USAGE = "/docker/disk-usage"
 
     ADMIN_USERS_LIST = "/admin/users"
     ADMIN_USER_DETAILS = "/admin/users/{username}"
     ADMIN_USER_DELETE = "/admin/users/{username}/delete"
     ADMIN_CONTAINERS_LIST = "/admin/containers"
+    ADMIN_TOKEN_CACHE_STATS = "/admin/cache/tokens"
+    ADMIN_INDEX_REPORT = "/admin/indexes"
+    ADMIN_DOCKER_HOSTS = "/admin/docker/hosts"
+    ADMIN_WARM_POOL = "/admin/docker/warm-pool"
+    ADMIN_GC_REPORT = "/admin/docker/gc"
+
+    METRICS = "/metrics"
+    HEALTHZ = "/healthz"
+    READYZ = "/readyz"
 
 
 
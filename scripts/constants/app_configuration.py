@@ -1,21 +1,129 @@
+import os
+import tempfile
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
 
     API_HOST: str
     API_PORT: int
+    API_WORKERS: int = 1
+    API_RELOAD: bool = False
+    API_PRELOAD: bool = True
+    API_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    SHARED_STORE_SOCKET: Optional[str] = None
+
+    LOG_LEVEL: str = "DEBUG"
+    LOG_FILE: str = "logs/EPR.log"
+    LOG_FILE_LEVEL: str = "INFO"
+    LOG_FILE_MAX_BYTES: int = 5 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATE: float = 1.0
 
     DOCKER_SOCK: str
     DOCKER_CLIENT_TIMEOUT: int
+    DOCKER_API_VERSION: str = ""
+    DOCKER_MAX_CONNECTIONS: int = 100
+    DOCKER_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    DOCKER_HOST_NAME: str = "local"
+    DOCKER_EXTRA_HOSTS: str = ""
+    DOCKER_HEALTH_INTERVAL_SECONDS: float = 10.0
+    PLACEMENT_STRATEGY: str = "balanced"
+    PLACEMENT_DEFAULT_MEMORY_BYTES: int = 256 * 1024 * 1024
+    PLACEMENT_DEFAULT_CPUS: float = 0.5
+    CONTAINER_HOST_CACHE_SIZE: int = 10000
+    WARM_POOL_PROFILES: str = ""
+    WARM_POOL_DEFAULT_SIZE: int = 2
+    WARM_POOL_REFILL_INTERVAL_SECONDS: float = 5.0
+    WARM_POOL_MAX_CONCURRENT_CREATES: int = 4
+    WARM_POOL_LATENCY_SAMPLES: int = 1000
+    GC_ENABLED: bool = True
+    GC_INTERVAL_SECONDS: float = 300.0
+    GC_HIGH_WATERMARK: float = 0.85
+    GC_LOW_WATERMARK: float = 0.70
+    GC_DISK_PATH: str = ""
+    GC_DISK_CAPACITY_BYTES: Optional[int] = None
+    GC_MIN_AGE_SECONDS: int = 3600
+    GC_KEEP_IMAGES: str = ""
+    GC_VOLUMES_ENABLED: bool = False
+    GC_REPORT_LIMIT: int = 50
+    DISK_USAGE_ENABLED: bool = True
+    DISK_USAGE_REFRESH_SECONDS: float = 60.0
+    DISK_USAGE_DEBOUNCE_SECONDS: float = 2.0
+    DEFAULT_DOCKER_TAG: str = "default:latest"
+    BUILD_MAX_CONCURRENT: int = 4
+    BUILD_MAX_CONCURRENT_PER_USER: int = 1
+    BUILD_MAX_QUEUED_PER_USER: int = 10
+    BUILD_JOB_RETENTION_SECONDS: int = 3600
+    BUILD_JOB_MAX_EVENTS: int = 5000
+    IMAGE_PULL_RESULT_CACHE_SECONDS: int = 30
+    IMAGE_PULL_RESULT_CACHE_SIZE: int = 1024
+    IMAGE_PULL_MAX_EVENTS: int = 2000
+    REGISTRY_CREDENTIALS_KEY: str = ""
+    REGISTRY_SESSION_SECONDS: int = 12 * 3600
+    REGISTRY_AUTH_CACHE_SECONDS: int = 300
+    REGISTRY_AUTH_CACHE_SIZE: int = 10000
+    IMAGE_PUSH_MAX_CONCURRENT: int = 4
+    IMAGE_PUSH_MAX_TARGETS: int = 20
+    IMAGE_PUSH_PROGRESS_INTERVAL_SECONDS: float = 0.25
+    IMAGE_PUSH_MAX_BUFFERED_EVENTS: int = 256
+    IMAGE_PUSH_RESULT_CACHE_SECONDS: int = 30
+    IMAGE_PUSH_RESULT_CACHE_SIZE: int = 1024
+    BULK_MAX_CONCURRENCY: int = 16
+    BULK_MAX_TARGETS: int = 1000
+    INVENTORY_ENABLED: bool = True
+    INVENTORY_RESYNC_SECONDS: int = 300
+    STATS_ENABLED: bool = True
+    STATS_INTERVAL_SECONDS: float = 5.0
+    STATS_HISTORY_SIZE: int = 120
+    STATS_MAX_CONCURRENCY: int = 32
+    METRICS_ENABLED: bool = True
+    METRICS_PUSH_INTERVAL_SECONDS: float = 5.0
+    READINESS_TIMEOUT_SECONDS: float = 2.0
+    GIT_MIRROR_DIR: str = os.path.join(tempfile.gettempdir(), "epr-git-mirrors")
+    GIT_MIRROR_FETCH_INTERVAL_SECONDS: int = 0
+    GIT_MIRROR_MAX_AGE_SECONDS: int = 7 * 24 * 3600
+    GIT_MIRROR_MAX_BYTES: int = 5 * 1024 ** 3
+    GIT_MIRROR_PRUNE_INTERVAL_SECONDS: int = 3600
+    GIT_ALLOWED_SCHEMES: str = "https"
+    GIT_ALLOWED_HOSTS: str = ""
+    GIT_COMMAND_TIMEOUT_SECONDS: int = 600
 
     MONGODB_URL: str
     MONGODB_DATABASE: str
+    MONGODB_TLS: bool = True
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 10000
+    MONGODB_WRITE_CONCERN: Optional[str] = None
+    MONGODB_WRITE_CONCERN_JOURNAL: Optional[bool] = None
+    MONGODB_READ_CONCERN: Optional[str] = None
+    MONGODB_READ_PREFERENCE: Optional[str] = None
+    MONGODB_CREATE_INDEXES: bool = True
+    CONTAINER_HISTORY_TTL_SECONDS: Optional[int] = None
+    ADMIN_PAGE_DEFAULT_LIMIT: int = 100
+    ADMIN_PAGE_MAX_LIMIT: int = 1000
+    ADMIN_EXPORT_BATCH_SIZE: int = 1000
 
     JWT_SECRET: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
 
     DEFAULT_MAX_CONTAINERS_PER_HOUR: int
+    RATE_LIMIT_DEFAULT_WINDOW_SECONDS: int = 3600
+    RATE_LIMIT_POLICY_CACHE_SECONDS: int = 60
 
     class Config:
         env_file = ".env"
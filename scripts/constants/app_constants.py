@@ -13,6 +13,9 @@ AUTH_SIGNUP_FAILURE = "User registration failed."
 AUTH_USER_EXISTS = "Username already exists."
 AUTH_LOGIN_SUCCESS = "Login successful."
 AUTH_LOGIN_FAILURE = "Invalid username or password."
+REGISTRY_LOGOUT_SUCCESS = "Logged out of the registry."
+REGISTRY_LOGIN_NOT_FOUND = "No stored login for this registry."
+REGISTRY_LOGINS_FAILURE = "Failed to retrieve registry logins."
 
 AUTH_TOKEN_CREATION_FAILURE = "Failed to create authentication token."
 AUTH_TOKEN_EXPIRED = "Authentication token has expired."
@@ -27,11 +30,22 @@ RATE_LIMIT_UPDATED = "User's rate limit successfully updated by admin."
 USER_MAX_CONTAINERS_REACHED = "User has reached the maximum number of containers allowed in this time window."
 
 DOCKER_DAEMON_UNAVAILABLE = "Docker daemon is unavailable or not running."
+NO_DOCKER_HOST_AVAILABLE = "No healthy Docker host is available to run the container."
 
 IMAGE_BUILD_SUCCESS = "Docker image built successfully."
 IMAGE_BUILD_FAILURE = "Failed to build Docker image."
+IMAGE_BUILD_QUEUED = "Docker image build queued."
+BUILD_JOB_NOT_FOUND = "Requested build job not found."
+BUILD_JOB_PENDING = "Build job has not finished yet."
+IMAGE_BUILD_REUSED = "Reusing image {image_id} already built from commit {commit}."
+BUILD_LABEL_SOURCE = "org.opencontainers.image.source"
+BUILD_LABEL_REVISION = "org.opencontainers.image.revision"
+BUILD_LABEL_DOCKERFILE = "docker-manager.dockerfile"
+BUILD_LABEL_DOCKERFILE_SHA = "docker-manager.dockerfile.sha"
+BUILD_QUEUE_FULL = "Too many builds queued for this user. Please wait for one to finish."
 IMAGE_PUSH_SUCCESS = "Docker image pushed successfully."
 IMAGE_PUSH_FAILURE = "Failed to push Docker image to registry."
+IMAGE_PUSH_TARGETS_INVALID = "Give between 1 and {limit} push targets."
 IMAGE_PULL_SUCCESS = "Docker image pulled successfully."
 IMAGE_PULL_FAILURE = "Failed to pull Docker image from registry."
 IMAGE_REMOVE_SUCCESS = "Docker image removed successfully."
@@ -55,6 +69,10 @@ CONTAINER_LIST_RETRIEVED = "List of Docker containers retrieved successfully."
 CONTAINER_LIST_FAILURE = "Failed to retrieve Docker containers."
 CONTAINER_DETAILS_FAILURE = "Requested container details not retrieved."
 CONTAINER_NOT_FOUND = "Requested container not found."
+CONTAINER_STATS_NOT_AVAILABLE = "No stats have been collected for this container yet."
+CONTAINER_OWNER_LABEL = "docker-manager.owner"
+WARM_POOL_LABEL = "docker-manager.warm-pool"
+WARM_POOL_WORKER_LABEL = "docker-manager.warm-pool.worker"
 
 VOLUME_CREATE_SUCCESS = "Docker volume created successfully."
 VOLUME_CREATE_FAILURE = "Failed to create Docker volume."
@@ -65,6 +83,8 @@ VOLUME_LIST_SUCCESS = "Docker volumes listed successfully."
 VOLUME_LIST_FAILURE = "Failed to retrieve Docker volumes."
 VOLUME_LIST_RETRIEVED = "List of Docker volumes retrieved successfully."
 VOLUME_RETRIEVE_FAILURE = "Volume retrieval failed."
+DISK_USAGE_SUCCESS = "Docker disk usage retrieved successfully."
+DISK_USAGE_FAILURE = "Failed to retrieve Docker disk usage."
 
 ADMIN_ACTION_SUCCESS = "Admin action successfully performed."
 ADMIN_ACTION_FAILED = "Admin action could not be completed."
@@ -76,6 +96,9 @@ USER_DELETED_SUCCESS = "User deleted successfully."
 USER_NOT_FOUND = "User not found."
 USER_ACTION_FAILED = "User action failed."
 USER_ACCESS_GRANTED = "User access granted."
+PASSWORD_HASHER_BUSY = "Too many sign-ins in progress, please retry shortly."
+INVALID_CURSOR = "Invalid or expired pagination cursor."
+INVALID_FIELDS = "Unknown fields requested"
 
 MONGODB_CONNECTION_FAILED = "Failed to connect to MongoDB."
 DATABASE_OPERATION_FAILED = "Database operation failed."
@@ -86,6 +109,9 @@ USER_CONTAINERS_ACCESS_DENIED = "You do not have permission to access other user
 
 USER_COLLECTION = "users"
 CONTAINER_COLLECTION = "user_containers"
+RATE_LIMIT_COLLECTION = "rate_limits"
+RATE_LIMIT_COUNTER_COLLECTION = "rate_limit_counters"
+REGISTRY_CREDENTIAL_COLLECTION = "registry_credentials"
 
 STATUS_OK = "Request processed successfully."
 STATUS_CREATED = "Resource created successfully."
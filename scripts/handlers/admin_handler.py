@@ -1,7 +1,18 @@
-from fastapi import HTTPException, Request, Depends
+import time
+from typing import Any, AsyncIterator, Dict
+from fastapi import HTTPException, Request, Depends, Response
 from fastapi.security import OAuth2PasswordBearer
-from scripts.utils.mongo_utils import MongoDBConnection
-from scripts.utils.jwt_utils import get_current_user_from_token
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.pagination_utils import KeysetQuery, object_id_range, parse_fields, prefix_pattern, time_range
+from scripts.models.admin_model import AdminUserListRequest, AdminContainerListRequest
+from scripts.models.jwt_model import TokenData
+from scripts.constants.app_configuration import settings
+from scripts.utils.index_utils import index_report
+from scripts.utils.fleet_utils import fleet
+from scripts.utils.warm_pool_utils import warm_pool
+from scripts.utils.gc_utils import docker_gc
+from scripts.utils.shared_store_utils import shared_store
+from scripts.utils.jwt_utils import TOKEN_REVOCATION_CHANNEL, get_current_user_from_token, invalidate_user_tokens, token_cache_stats
 from scripts.constants.app_constants import USER_COLLECTION, CONTAINER_COLLECTION, USER_NOT_FOUND
 from scripts.logging.logger import logger
 from scripts.constants.api_endpoints import Endpoints
@@ -9,35 +20,73 @@ from scripts.constants.api_endpoints import Endpoints
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-mongo = MongoDBConnection()
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+USER_FIELDS = ("_id", "username", "role")
+USER_DEFAULT_FIELDS = ("username", "role")
+USER_SORT_FIELDS = ("_id",)
+CONTAINER_FIELDS = ("_id", "user_id", "container_name", "container_id", "image", "image_id", "host", "created_time")
+CONTAINER_DEFAULT_FIELDS = ("user_id", "container_name", "created_time")
+CONTAINER_SORT_FIELDS = ("created_time", "_id")
+
 
 def admin_role_required(user: dict = Depends(get_current_user_from_token)):
-    if user['role'] != 'Admin':
-        logger.warning(f"User '{user['username']}' attempted to access admin function without admin privileges.")
+    if user.role != 'Admin':
+        logger.warning(f"User '{user.username}' attempted to access admin function without admin privileges.")
         raise HTTPException(status_code=403, detail="You don't have permission to perform this action.")
     return user
 
-def list_all_users(user: dict = Depends(admin_role_required)):
+def _users_query(params: AdminUserListRequest) -> KeysetQuery:
+    query = {}
+    if params.username:
+        query["username"] = prefix_pattern(params.username)
+    if params.role:
+        query["role"] = params.role
+    # Users have no timestamp field; ObjectIds carry their creation time.
+    created = object_id_range(params.created_after, params.created_before)
+    if created:
+        query["_id"] = created
+    return KeysetQuery(
+        mongo.get_async_collection(USER_COLLECTION),
+        query,
+        USER_SORT_FIELDS,
+        parse_fields(params.fields, USER_FIELDS),
+        USER_DEFAULT_FIELDS,
+        descending=params.order == "desc",
+        cursor=params.cursor,
+    )
+
+async def list_all_users(user: TokenData, params: AdminUserListRequest, response: Response):
     try:
-        users_collection = mongo.get_collection(USER_COLLECTION)
-        users = list(users_collection.find({}, {"_id": 0, "password": 0}))  # Exclude password from the result
-        logger.info(f"Admin '{user['username']}' fetched {len(users)} users")
+        users, next_cursor = await _users_query(params).page(params.limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        logger.info(f"Admin '{user.username}' fetched {len(users)} users")
         return users
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch users: {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching users.")
 
+def export_users(user: TokenData, params: AdminUserListRequest) -> AsyncIterator[Dict[str, Any]]:
+    query = _users_query(params)
+    logger.info(f"Admin '{user.username}' exporting users")
+    return query.iterate(settings.ADMIN_EXPORT_BATCH_SIZE)
+
 def get_user_details(username: str, user: dict = Depends(admin_role_required)):
     try:
         users_collection = mongo.get_collection(USER_COLLECTION)
         user_data = users_collection.find_one({"username": username}, {"_id": 0, "password": 0})
 
         if not user_data:
-            logger.warning(f"Admin '{user['username']}' could not find user '{username}'")
+            logger.warning(f"Admin '{user.username}' could not find user '{username}'")
             raise HTTPException(status_code=404, detail=USER_NOT_FOUND)
 
-        logger.info(f"Admin '{user['username']}' fetched details for user '{username}'")
+        logger.info(f"Admin '{user.username}' fetched details for user '{username}'")
         return user_data
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch user '{username}': {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching user details.")
@@ -48,21 +97,89 @@ def delete_user(username: str, user: dict = Depends(admin_role_required)):
         result = users_collection.delete_one({"username": username})
 
         if result.deleted_count == 0:
-            logger.warning(f"Admin '{user['username']}' tried to delete user '{username}', but user not found.")
+            logger.warning(f"Admin '{user.username}' tried to delete user '{username}', but user not found.")
             raise HTTPException(status_code=404, detail=USER_NOT_FOUND)
 
-        logger.info(f"Admin '{user['username']}' deleted user '{username}'")
+        revoked_at = time.time()
+        invalidated = invalidate_user_tokens(username, revoked_at)
+        shared_store.publish_from_thread(TOKEN_REVOCATION_CHANNEL, {"username": username, "revoked_at": revoked_at})
+        logger.info(f"Admin '{user.username}' deleted user '{username}' and invalidated {invalidated} cached tokens")
         return {"detail": f"User '{username}' deleted successfully."}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to delete user '{username}': {str(e)}")
         raise HTTPException(status_code=500, detail="Error deleting user.")
 
-def list_all_containers(user: dict = Depends(admin_role_required)):
+async def _containers_query(params: AdminContainerListRequest) -> KeysetQuery:
+    query: Dict[str, Any] = {}
+    if params.user:
+        query["user_id"] = params.user
+    if params.role:
+        users = mongo.get_async_collection(USER_COLLECTION)
+        usernames = await users.distinct("username", {"role": params.role})
+        query["user_id"] = {"$in": [u for u in usernames if not params.user or u == params.user]}
+    if params.container_name:
+        query["container_name"] = prefix_pattern(params.container_name)
+    created = time_range(params.created_after, params.created_before)
+    if created:
+        query["created_time"] = created
+    return KeysetQuery(
+        mongo.get_async_collection(CONTAINER_COLLECTION),
+        query,
+        CONTAINER_SORT_FIELDS,
+        parse_fields(params.fields, CONTAINER_FIELDS),
+        CONTAINER_DEFAULT_FIELDS,
+        descending=params.order == "desc",
+        cursor=params.cursor,
+    )
+
+async def list_all_containers(user: TokenData, params: AdminContainerListRequest, response: Response):
     try:
-        containers_collection = mongo.get_collection(CONTAINER_COLLECTION)
-        containers = list(containers_collection.find({}, {"_id": 0}))
-        logger.info(f"Admin '{user['username']}' fetched {len(containers)} containers")
+        containers, next_cursor = await (await _containers_query(params)).page(params.limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        logger.info(f"Admin '{user.username}' fetched {len(containers)} containers")
         return containers
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch containers: {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching containers.")
+
+async def export_containers(user: TokenData, params: AdminContainerListRequest) -> AsyncIterator[Dict[str, Any]]:
+    query = await _containers_query(params)
+    logger.info(f"Admin '{user.username}' exporting containers")
+    return query.iterate(settings.ADMIN_EXPORT_BATCH_SIZE)
+
+def get_token_cache_stats(user: dict = Depends(admin_role_required)):
+    logger.info(f"Admin '{user.username}' fetched token cache stats")
+    return token_cache_stats()
+
+async def get_docker_hosts(user: dict = Depends(admin_role_required)):
+    if fleet.multi_host:
+        await fleet.check()
+    logger.info(f"Admin '{user.username}' fetched the Docker host list")
+    return {"strategy": settings.PLACEMENT_STRATEGY, "hosts": fleet.status(), "stats": dict(fleet.stats)}
+
+def get_warm_pool(user: dict = Depends(admin_role_required)):
+    logger.info(f"Admin '{user.username}' fetched warm pool state")
+    return warm_pool.status()
+
+async def get_gc_report(user: dict = Depends(admin_role_required)):
+    try:
+        report = await docker_gc.report()
+        logger.info(f"Admin '{user.username}' fetched the garbage collection report")
+        return report
+    except Exception as e:
+        logger.error(f"Failed to build garbage collection report: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error building garbage collection report.")
+
+async def get_index_report(user: dict = Depends(admin_role_required)):
+    try:
+        report = await index_report()
+        logger.info(f"Admin '{user.username}' fetched the index report")
+        return report
+    except Exception as e:
+        logger.error(f"Failed to build index report: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error building index report.")
@@ -1,15 +1,20 @@
-import docker
-from docker.errors import NotFound
-from fastapi import HTTPException, Depends
+import time
+from typing import Any, AsyncIterator, Dict, List
+from fastapi import HTTPException, Response
 from fastapi.security import OAuth2PasswordBearer
-from scripts.utils.mongo_utils import MongoDBConnection
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.docker_utils import DockerAPIError, DockerNotFound, STDERR, parse_repository_tag, registry_for
+from scripts.utils.fleet_utils import fleet, requested_reservation
+from scripts.utils.warm_pool_utils import warm_pool
 from scripts.models.cont_model import (
     ContainerRunAdvancedRequest,
     ContainerListRequest,
     ContainerLogsRequest,
     ContainerLogsResponse,
-    ContainerRemoveRequest
+    ContainerRemoveRequest,
+    ContainerBulkRequest
 )
+from scripts.models.jwt_model import TokenData
 from scripts.constants.app_constants import (
     CONTAINER_CREATE_FAILURE,
     CONTAINER_START_SUCCESS,
@@ -21,114 +26,146 @@ from scripts.constants.app_constants import (
     CONTAINER_LOGS_RETRIEVED,
     CONTAINER_REMOVE_FAILURE,
     CONTAINER_REMOVE_SUCCESS,
-    CONTAINER_NOT_FOUND
+    CONTAINER_NOT_FOUND,
+    CONTAINER_OWNER_LABEL,
+    CONTAINER_COLLECTION
 )
-from scripts.utils.jwt_utils import get_current_user_from_token
 from datetime import datetime
-from scripts.utils.rate_limit_utils import check_rate_limit
+from scripts.utils.rate_limit_utils import check_rate_limit, rate_limiter
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.registry_auth_utils import registry_credentials
+from scripts.utils.stream_utils import bounded_as_completed
+from scripts.constants.app_configuration import settings
+from scripts.logging.logger import logger
 from scripts.constants.api_endpoints import Endpoints
 
 
 
-client = docker.from_env()
-mongo = MongoDBConnection()
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def run_container_advanced(data: ContainerRunAdvancedRequest, token: str = Depends(oauth2_scheme)):
+async def run_container_advanced(data: ContainerRunAdvancedRequest, current_user: TokenData, response: Response = None):
     try:
         kwargs = data.dict(exclude_unset=True)
         image = kwargs.pop("image")
         command = kwargs.pop("command", None)
 
-        user = get_current_user_from_token(token)
-        user_id = user.id
-
-        check_rate_limit(user_id)
-
-        container = client.containers.run(image=image, command=command, **kwargs)
-
-        containers_collection = mongo.get_collection("user_containers")
-        containers_collection.insert_one({
+        user_id = current_user.username
+        labels = kwargs.get("labels") or {}
+        kwargs["labels"] = {**(dict.fromkeys(labels, "") if isinstance(labels, list) else labels), CONTAINER_OWNER_LABEL: user_id}
+
+        rate_status = await check_rate_limit(user_id)
+        if response is not None:
+            response.headers.update(rate_status.headers())
+
+        started = time.perf_counter()
+        try:
+            claimed = await warm_pool.claim(image, command, kwargs)
+            if claimed is not None:
+                host, container, reservation = claimed
+                host.record(container["Id"], reservation)
+            else:
+                reservation = requested_reservation(kwargs)
+                auth_config = await registry_credentials.auth_config(user_id, registry_for(parse_repository_tag(image)[0]))
+                async with fleet.placement(image, reservation) as host:
+                    container = await host.client.run_container(image, command, auth_config=auth_config, **kwargs)
+                    host.record(container["Id"], reservation)
+        except Exception:
+            await rate_limiter.release(user_id, rate_status)
+            raise
+        warm_pool.observe("warm_pool" if claimed is not None else "cold", time.perf_counter() - started)
+        inventory.mark_containers(container["Id"])
+
+        container_name = container["Name"].lstrip("/")
+        fleet.remember(container_name, host)
+        containers_collection = mongo.get_async_collection(CONTAINER_COLLECTION)
+        await containers_collection.insert_one({
             "user_id": user_id,
-            "container_name": container.name,
+            "container_name": container_name,
+            "container_id": container["Id"],
+            "image": image,
+            "image_id": container["Image"],
+            "host": host.name,
             "created_time": datetime.utcnow()
         })
 
         return {
             "message": CONTAINER_START_SUCCESS,
-            "id": container.id,
-            "status": container.status
+            "id": container["Id"],
+            "status": container["State"]["Status"],
+            "host": host.name
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.error(f"Failed to run container from image '{data.image}': {str(e)}")
         raise HTTPException(status_code=500, detail=CONTAINER_CREATE_FAILURE)
 
-def list_containers_with_filters(params: ContainerListRequest, token: str = Depends(oauth2_scheme)):
+async def list_containers_with_filters(params: ContainerListRequest, current_user: TokenData):
     try:
-        kwargs = params.dict(exclude_unset=True)
-
-        user = get_current_user_from_token(token)
+        kwargs = params.dict(exclude_unset=True, exclude={"sparse", "ignore_removed"})
 
-        if user.role != "Admin":
+        if current_user.role != "Admin":
             raise HTTPException(status_code=403, detail="You do not have permission to access all containers.")
 
-        containers = client.containers.list(**kwargs)
+        containers = await inventory.list_containers(**kwargs)
 
         return [
             {
-                "name": c.name,
-                "id": c.id,
-                "image": c.image.tags,
-                "status": c.status
+                "name": c["Names"][0].lstrip("/") if c.get("Names") else c["Id"][:12],
+                "id": c["Id"],
+                "image": [c["Image"]],
+                "status": c["State"],
+                "host": c.get("Host")
             } for c in containers
         ]
-    except Exception:
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to list containers: {str(e)}")
         raise HTTPException(status_code=500, detail=CONTAINER_LIST_FAILURE)
 
-def stop_container(name: str, timeout: float = None, token: str = Depends(oauth2_scheme)):
+async def stop_container(name: str, current_user: TokenData, timeout: float = None):
     try:
-        container = client.containers.get(name)
-        stop_args = {"timeout": timeout} if timeout is not None else {}
-
-        user = get_current_user_from_token(token)
-
-        if user.role != "Admin":
+        if current_user.role != "Admin":
             raise HTTPException(status_code=403, detail="You do not have permission to stop containers.")
 
-        container.stop(**stop_args)
+        await (await fleet.locate(name)).client.stop_container(name, timeout)
+        inventory.mark_container(name)
         return {"message": CONTAINER_STOP_SUCCESS}
-    except NotFound:
+    except HTTPException:
+        raise
+    except DockerNotFound:
         raise HTTPException(status_code=404, detail=CONTAINER_NOT_FOUND)
-    except Exception:
+    except Exception as e:
+        logger.error(f"Failed to stop container '{name}': {str(e)}")
         raise HTTPException(status_code=500, detail=CONTAINER_STOP_FAILURE)
 
-def start_container(name: str, token: str = Depends(oauth2_scheme)):
+async def start_container(name: str, current_user: TokenData):
     try:
-        container = client.containers.get(name)
-
-        user = get_current_user_from_token(token)
-
-        if user.role != "Admin":
+        if current_user.role != "Admin":
             raise HTTPException(status_code=403, detail="You do not have permission to start containers.")
 
-        container.start()
+        await (await fleet.locate(name)).client.start_container(name)
+        inventory.mark_container(name)
         return {"message": CONTAINER_START_SUCCESS}
-    except NotFound:
+    except HTTPException:
+        raise
+    except DockerNotFound:
         raise HTTPException(status_code=404, detail=CONTAINER_NOT_FOUND)
-    except Exception:
+    except Exception as e:
+        logger.error(f"Failed to start container '{name}': {str(e)}")
         raise HTTPException(status_code=500, detail=CONTAINER_START_FAILURE)
 
-def get_logs_with_params(name: str, params: ContainerLogsRequest, token: str = Depends(oauth2_scheme)) -> ContainerLogsResponse:
+async def get_logs_with_params(name: str, params: ContainerLogsRequest, current_user: TokenData) -> ContainerLogsResponse:
     try:
-        container = client.containers.get(name)
+        client = (await fleet.locate(name)).client
+        container = await client.inspect_container(name)
         opts = params.dict(exclude_unset=True)
 
-        user = get_current_user_from_token(token)
-
         if opts.pop("follow", False):
-            raise HTTPException(status_code=400, detail="Streaming logs not supported in structured response.")
+            raise HTTPException(status_code=400, detail="Streaming logs not supported in structured response, use the logs stream endpoint.")
 
-        raw_logs = container.logs(stream=False, **opts)
+        raw_logs = await client.container_logs(name, tty=container["Config"].get("Tty", False), **opts)
         logs = raw_logs.decode("utf-8", errors="ignore").splitlines()
 
         return ContainerLogsResponse(
@@ -137,27 +174,133 @@ def get_logs_with_params(name: str, params: ContainerLogsRequest, token: str = D
             message=CONTAINER_LOGS_RETRIEVED
         )
 
-    except NotFound:
+    except HTTPException:
+        raise
+    except DockerNotFound:
         raise HTTPException(status_code=404, detail=CONTAINER_NOT_FOUND)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"{CONTAINER_LOGS_FAILURE}: {str(e)}")
 
-def remove_container_with_params(name: str, params: ContainerRemoveRequest, token: str = Depends(oauth2_scheme)):
+async def open_log_stream(name: str, params: ContainerLogsRequest, current_user: TokenData) -> AsyncIterator[Dict[str, str]]:
+    try:
+        client = (await fleet.locate(name)).client
+        container = await client.inspect_container(name)
+    except DockerNotFound:
+        raise HTTPException(status_code=404, detail=CONTAINER_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Failed to open log stream for container '{name}': {str(e)}")
+        raise HTTPException(status_code=500, detail=CONTAINER_LOGS_FAILURE)
+
+    opts = params.dict(exclude_unset=True)
+    tty = container["Config"].get("Tty", False)
+
+    async def events():
+        try:
+            async for stream_type, line in client.iter_log_lines(container["Id"], tty=tty, **opts):
+                yield {
+                    "stream": "stderr" if stream_type == STDERR else "stdout",
+                    "line": line.decode("utf-8", errors="replace").rstrip("\r")
+                }
+        except Exception as e:
+            logger.error(f"Log stream for container '{name}' failed: {str(e)}")
+            yield {"stream": "error", "line": CONTAINER_LOGS_FAILURE}
+
+    logger.info(f"User '{current_user.username}' opened log stream for container '{name}' (follow={opts.get('follow', False)})")
+    return events()
+
+async def remove_container_with_params(name: str, params: ContainerRemoveRequest, current_user: TokenData):
     try:
-        container = client.containers.get(name)
         opts = params.dict(exclude_unset=True)
 
-        user = get_current_user_from_token(token)
-
-        if user.role != "Admin":
+        if current_user.role != "Admin":
             raise HTTPException(status_code=403, detail="You do not have permission to remove containers.")
 
-        container.remove(**opts)
+        inventory.mark_container(name)
+        await (await fleet.locate(name)).client.remove_container(name, **opts)
+        fleet.forget(name)
         return {
             "message": CONTAINER_REMOVE_SUCCESS,
             "used_options": opts
         }
-    except NotFound:
+    except HTTPException:
+        raise
+    except DockerNotFound:
         raise HTTPException(status_code=404, detail=CONTAINER_NOT_FOUND)
-    except Exception:
+    except Exception as e:
+        logger.error(f"Failed to remove container '{name}': {str(e)}")
         raise HTTPException(status_code=500, detail=CONTAINER_REMOVE_FAILURE)
+
+async def resolve_bulk_targets(data: ContainerBulkRequest) -> List[str]:
+    if bool(data.names) == bool(data.labels):
+        raise HTTPException(status_code=400, detail="Provide either 'names' or 'labels', not both.")
+    if data.names:
+        names = list(dict.fromkeys(data.names))
+    else:
+        containers = await inventory.list_containers(all=True, filters={"label": data.labels})
+        names = []
+        for c in containers:
+            name = c["Names"][0].lstrip("/") if c.get("Names") else c["Id"]
+            if c.get("Host") in fleet.hosts:
+                fleet.remember(name, fleet.hosts[c["Host"]])
+            names.append(name)
+    if len(names) > settings.BULK_MAX_TARGETS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_TARGETS} containers can be targeted per call.")
+    return names
+
+async def open_bulk_action(data: ContainerBulkRequest, current_user: TokenData) -> AsyncIterator[Dict[str, Any]]:
+    """Validate a bulk lifecycle request and return a stream of per-container results.
+
+    Containers are processed concurrently (at most ``BULK_MAX_CONCURRENCY``), so stop
+    timeouts overlap instead of adding up. Results arrive in completion order and the
+    stream ends with a summary item.
+    """
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail=f"You do not have permission to {data.action} containers.")
+
+    names = await resolve_bulk_targets(data)
+    limit = min(data.concurrency or settings.BULK_MAX_CONCURRENCY, settings.BULK_MAX_CONCURRENCY)
+
+    async def apply(name: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        result = {"type": "result", "name": name, "action": data.action, "status": "ok"}
+        try:
+            client = (await fleet.locate(name)).client
+            if data.action == "start":
+                await client.start_container(name)
+            elif data.action == "stop":
+                await client.stop_container(name, data.timeout)
+            elif data.action == "restart":
+                await client.restart_container(name, data.timeout)
+            else:
+                inventory.mark_container(name)
+                await client.remove_container(name, v=data.v, force=data.force)
+                fleet.forget(name)
+            inventory.mark_container(name)
+        except DockerNotFound:
+            result.update(status="not_found", error=CONTAINER_NOT_FOUND)
+        except DockerAPIError as e:
+            result.update(status="error", error=e.explanation, code=e.status_code)
+        except Exception as e:
+            logger.error(f"Bulk {data.action} of container '{name}' failed: {str(e)}")
+            result.update(status="error", error=str(e))
+        result["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    async def events():
+        started = time.monotonic()
+        counts = {"ok": 0, "not_found": 0, "error": 0}
+        logger.info(f"User '{current_user.username}' running bulk {data.action} on {len(names)} containers (concurrency {limit})")
+        async for result in bounded_as_completed(names, apply, limit):
+            counts[result["status"]] += 1
+            yield result
+        yield {
+            "type": "summary",
+            "action": data.action,
+            "total": len(names),
+            "succeeded": counts["ok"],
+            "not_found": counts["not_found"],
+            "failed": counts["error"],
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    return events()
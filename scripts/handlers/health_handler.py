@@ -0,0 +1,11 @@
+from fastapi.responses import JSONResponse
+from scripts.utils.health_utils import app_health
+
+
+def get_liveness():
+    return app_health.liveness()
+
+
+async def get_readiness() -> JSONResponse:
+    report = await app_health.readiness()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
@@ -1,27 +1,44 @@
-import docker
 import re
-import os
-import tempfile
-from fastapi import HTTPException, Depends
-from typing import Dict, Any
-from pip._internal.vcs import git
+from fastapi import HTTPException, Response
+from typing import Any, AsyncIterator, Dict, Optional
 from fastapi.security import OAuth2PasswordBearer
 from scripts.constants.api_endpoints import Endpoints
-from scripts.models.image_model import ImageBuildRequest, ImageRemoveRequest, ImageGithubBuildRequest
+from scripts.models.image_model import ImageBuildRequest, ImageRemoveRequest, ImageGithubBuildRequest, ImagePushBatchRequest
+from scripts.models.jwt_model import TokenData
 from scripts.constants.app_constants import *
 from scripts.constants.app_configuration import settings
-from scripts.utils.jwt_utils import get_current_user_from_token
+from scripts.utils.docker_utils import get_docker_client, parse_repository_tag, registry_for, DockerAPIError, DockerNotFound
+from scripts.utils.pull_utils import image_pulls
+from scripts.utils.push_utils import image_pushes, PushTarget
+from scripts.utils.registry_auth_utils import registry_credentials
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.disk_usage_utils import disk_usage
+from scripts.utils.build_job_utils import build_jobs, BuildJob, SUCCEEDED
+from scripts.logging.logger import logger
 
 
-client = docker.from_env()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def is_valid_docker_tag(tag: str) -> bool:
     """Validate Docker image tag format."""
     return bool(re.match(r"^[a-z0-9]+([._-]?[a-z0-9]+)*(\/[a-z0-9]+([._-]?[a-z0-9]+)*)*(\:[a-zA-Z0-9_.-]+)?$", tag))
 
-def build_image(data: ImageBuildRequest, token: str = Depends(oauth2_scheme)):
-    """Build a Docker image."""
+def is_auth_error(e: DockerAPIError) -> bool:
+    message = str(e).lower()
+    return e.status_code == 401 or "unauthorized" in message or "authentication required" in message
+
+def build_job_response(job: BuildJob) -> Dict[str, Any]:
+    return {
+        "message": IMAGE_BUILD_QUEUED,
+        "job_id": job.id,
+        "status": job.state,
+        "status_url": Endpoints.IMAGE_BUILD_JOB_STATUS.format(job_id=job.id),
+        "progress_url": Endpoints.IMAGE_BUILD_JOB_PROGRESS.format(job_id=job.id),
+        "result_url": Endpoints.IMAGE_BUILD_JOB_RESULT.format(job_id=job.id),
+    }
+
+async def build_image(data: ImageBuildRequest, current_user: TokenData):
+    """Queue a Docker image build and return its job ID."""
     try:
         # Validate and prepare build arguments
         build_args = data.dict(exclude_unset=True)
@@ -36,151 +53,232 @@ def build_image(data: ImageBuildRequest, token: str = Depends(oauth2_scheme)):
         else:
             build_args["tag"] = settings.DEFAULT_DOCKER_TAG
 
-        user = get_current_user_from_token(token)
-        user_id = user.username
-
-        image, _ = client.images.build(**build_args)
-
-        return {
-            "message": IMAGE_BUILD_SUCCESS.format(tag=build_args['tag']),
-            "id": image.id,
-            "tags": image.tags or ["<none>:<none>"]
-        }
+        source = build_args.get("path") or "inline Dockerfile"
+        job = await build_jobs.submit(current_user.username, build_args["tag"], source, build_args)
+        return build_job_response(job)
 
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.error(f"User '{current_user.username}' failed to queue image build: {str(e)}")
         raise HTTPException(status_code=500, detail=IMAGE_BUILD_FAILURE)
 
-def build_image_from_github(data: ImageGithubBuildRequest, token: str = Depends(oauth2_scheme)):
-    try:
-        temp_dir = tempfile.mkdtemp()
-        repo_url = data.github_url
-        repo_name = repo_url.split("/")[-1].replace(".git", "")  # Extract repo name
-        dockerfile_path = data.dockerfile_path
+async def find_built_image(labels: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    images = await inventory.list_images(filters={"label": [f"{k}={v}" for k, v in labels.items()]})
+    return images[0] if images else None
 
-        git.Repo.clone_from(repo_url, temp_dir)
+async def build_image_from_github(data: ImageGithubBuildRequest, current_user: TokenData):
+    """Queue a build of a GitHub repository from the local mirror cache.
 
-        dockerfile_full_path = os.path.join(temp_dir, dockerfile_path)
-        if not os.path.exists(dockerfile_full_path):
-            raise HTTPException(status_code=400, detail=f"Dockerfile not found at {dockerfile_path}")
-
-        build_args = {
-            "path": temp_dir,
-            "dockerfile": dockerfile_path,
-            "tag": data.tag
-        }
+    The resolved commit and Dockerfile are recorded as image labels; when an image
+    with the same labels exists the build is skipped and that image is re-tagged.
+    """
+    # Git support is only loaded once a GitHub build is requested.
+    from scripts.utils.git_utils import git_mirrors, GitError, is_allowed_remote, is_valid_ref
 
-        user = get_current_user_from_token(token)
-        user_id = user.username
-
-        image, _ = client.images.build(**build_args)
-
-        for root, dirs, files in os.walk(temp_dir, topdown=False):
-            for file in files:
-                os.remove(os.path.join(root, file))
-            for dir in dirs:
-                os.rmdir(os.path.join(root, dir))
-        os.rmdir(temp_dir)
-
-        return {
-            "message": IMAGE_BUILD_SUCCESS.format(tag=data.tag),
-            "id": image.id,
-            "tags": image.tags or ["<none>:<none>"]
-        }
+    try:
+        repo_url = data.github_url
+        dockerfile_path = data.dockerfile_path
+        if data.tag and not is_valid_docker_tag(data.tag):
+            raise HTTPException(status_code=400, detail=INVALID_REQUEST)
+        if not is_allowed_remote(repo_url) or not is_valid_ref(data.ref):
+            raise HTTPException(status_code=400, detail=INVALID_REQUEST)
 
-    except git.exc.GitCommandError as e:
-        raise HTTPException(status_code=400, detail=f"Error cloning GitHub repository: {str(e)}")
+        async def prepare(job: BuildJob) -> Optional[Dict[str, Any]]:
+            try:
+                mirror, commit, dockerfile_sha = await git_mirrors.resolve(repo_url, data.ref, dockerfile_path)
+            except GitError as e:
+                raise HTTPException(status_code=400, detail=f"Error fetching GitHub repository: {str(e)}")
+            except FileNotFoundError:
+                raise HTTPException(status_code=400, detail=f"Dockerfile not found at {dockerfile_path}")
+
+            labels = {
+                BUILD_LABEL_SOURCE: repo_url,
+                BUILD_LABEL_REVISION: commit,
+                BUILD_LABEL_DOCKERFILE: dockerfile_path,
+                BUILD_LABEL_DOCKERFILE_SHA: dockerfile_sha,
+            }
+            job.metadata.update({"commit": commit, "reused": False})
+
+            existing = None if data.nocache else await find_built_image(labels)
+            if existing:
+                if data.tag:
+                    repository, tag = parse_repository_tag(data.tag)
+                    await get_docker_client().tag_image(existing["Id"], repository, tag)
+                job.image_id = existing["Id"]
+                job.metadata["reused"] = True
+                await job.add_event({"stream": IMAGE_BUILD_REUSED.format(image_id=existing["Id"], commit=commit) + "\n"})
+                return None
+
+            context = await git_mirrors.archive(mirror, commit)
+            return {"fileobj": context, "custom_context": True, "labels": labels}
+
+        build_args = {"dockerfile": dockerfile_path, "tag": data.tag, "nocache": data.nocache}
+        job = await build_jobs.submit(current_user.username, data.tag, repo_url, build_args, prepare)
+        return build_job_response(job)
+
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.error(f"User '{current_user.username}' failed to queue build from '{data.github_url}': {str(e)}")
         raise HTTPException(status_code=500, detail=IMAGE_BUILD_FAILURE)
 
-def list_images(name: str = None, all: bool = False, filters: Dict[str, Any] = None, token: str = Depends(oauth2_scheme)):
+async def get_build_job(job_id: str, current_user: TokenData) -> BuildJob:
+    job = await build_jobs.find(job_id)
+    if job is None or (job.owner != current_user.username and current_user.role != "Admin"):
+        raise HTTPException(status_code=404, detail=BUILD_JOB_NOT_FOUND)
+    return job
+
+async def list_build_jobs(current_user: TokenData):
+    owner = None if current_user.role == "Admin" else current_user.username
+    jobs = sorted(await build_jobs.list_all(owner), key=lambda job: job.created, reverse=True)
+    return {"jobs": [job.status() for job in jobs]}
+
+async def get_build_job_status(job_id: str, current_user: TokenData):
+    return (await get_build_job(job_id, current_user)).status()
+
+async def get_build_job_result(job_id: str, current_user: TokenData, response: Response):
+    job = await get_build_job(job_id, current_user)
+    if not job.done:
+        response.status_code = 202
+        return {"message": BUILD_JOB_PENDING, "job_id": job.id, "status": job.state}
+    if job.state != SUCCEEDED:
+        return {"message": IMAGE_BUILD_FAILURE, "job_id": job.id, "status": job.state, "error": job.error}
+    return {
+        "message": IMAGE_BUILD_SUCCESS.format(tag=job.tag),
+        "job_id": job.id,
+        "status": job.state,
+        "id": job.image_id,
+        "tags": job.tags or ["<none>:<none>"]
+    }
+
+async def open_build_progress(job_id: str, current_user: TokenData, since: int = 0) -> AsyncIterator[Dict[str, Any]]:
+    return (await get_build_job(job_id, current_user)).progress(since)
+
+async def list_images(current_user: TokenData, name: str = None, all: bool = False, filters: Dict[str, Any] = None):
     try:
-        user = get_current_user_from_token(token)
-        user_id = user.username
-
-        kwargs = {}
-        if name is not None:
-            kwargs["name"] = name
-        if all:
-            kwargs["all"] = True
-        if filters is not None:
-            kwargs["filters"] = filters
-
-        images = client.images.list(**kwargs)
+        images = await inventory.list_images(name=name, all=all, filters=filters)
+        await disk_usage.current()
 
         return {
             "message": IMAGE_LIST_SUCCESS,
-            "images": [{"id": img.id, "tags": img.tags} for img in images]
+            "images": [
+                {
+                    "id": img["Id"],
+                    "tags": img.get("RepoTags") or [],
+                    "labels": img.get("Labels") or {},
+                    "size": img.get("Size"),
+                    "shared_size": disk_usage.images.get(img["Id"], {}).get("shared_size"),
+                    "containers": disk_usage.images.get(img["Id"], {}).get("containers"),
+                }
+                for img in images
+            ],
+            "usage": disk_usage.freshness()
         }
 
     except Exception as e:
+        logger.error(f"User '{current_user.username}' failed to list images: {str(e)}")
         raise HTTPException(status_code=500, detail=IMAGE_LIST_RETRIEVED)
 
-def dockerhub_login(username: str, password: str, token: str = Depends(oauth2_scheme)):
+async def dockerhub_login(username: str, password: str, current_user: TokenData, registry: Optional[str] = None):
     try:
-        user = get_current_user_from_token(token)
-        user_id = user.username
-
-        client.login(username=username, password=password)
-        return {"message": AUTH_LOGIN_SUCCESS}
+        login = await registry_credentials.login(current_user.username, username, password, registry)
+        return {"message": AUTH_LOGIN_SUCCESS, **login}
     except Exception as e:
+        logger.warning(f"User '{current_user.username}' failed registry login as '{username}': {str(e)}")
         raise HTTPException(status_code=401, detail=AUTH_LOGIN_FAILURE)
 
-def push_image(local_tag: str, remote_repo: str, token: str = Depends(oauth2_scheme)):
+async def registry_logout(current_user: TokenData, registry: Optional[str] = None):
+    if not await registry_credentials.logout(current_user.username, registry):
+        raise HTTPException(status_code=404, detail=REGISTRY_LOGIN_NOT_FOUND)
+    return {"message": REGISTRY_LOGOUT_SUCCESS}
+
+async def list_registry_logins(current_user: TokenData):
     try:
-        user = get_current_user_from_token(token)
-        user_id = user.username
+        return {"logins": await registry_credentials.list_logins(current_user.username)}
+    except Exception as e:
+        logger.error(f"User '{current_user.username}' failed to list registry logins: {str(e)}")
+        raise HTTPException(status_code=500, detail=REGISTRY_LOGINS_FAILURE)
+
+async def registry_auth(current_user: TokenData, repository: str) -> Optional[Dict[str, Any]]:
+    return await registry_credentials.auth_config(current_user.username, registry_for(parse_repository_tag(repository)[0]))
 
-        image = client.images.get(local_tag)
-        image.tag(remote_repo)
-        result = client.images.push(remote_repo)
+async def push_image(local_tag: str, remote_repo: str, current_user: TokenData):
+    try:
+        target = PushTarget(local_tag, remote_repo)
+        result = await image_pushes.push_one(target, auth_config=await registry_auth(current_user, target.repository))
 
         return {
             "message": IMAGE_PUSH_SUCCESS.format(tag=remote_repo),
             "result": result
         }
-    except docker.errors.APIError as e:
-        if "unauthorized" in str(e).lower() or "authentication required" in str(e).lower():
+    except DockerNotFound:
+        raise HTTPException(status_code=404, detail=IMAGE_NOT_FOUND)
+    except DockerAPIError as e:
+        if is_auth_error(e):
             raise HTTPException(status_code=401, detail=UNAUTHORIZED)
         raise HTTPException(status_code=500, detail=IMAGE_PUSH_FAILURE)
-    except Exception:
+    except Exception as e:
+        logger.error(f"User '{current_user.username}' failed to push '{local_tag}' to '{remote_repo}': {str(e)}")
         raise HTTPException(status_code=500, detail=IMAGE_PUSH_FAILURE)
 
-def pull_image(repository: str, local_tag: str = None, token: str = Depends(oauth2_scheme)):
+async def open_push_progress(data: ImagePushBatchRequest, current_user: TokenData) -> AsyncIterator[Dict[str, Any]]:
+    if not 0 < len(data.targets) <= settings.IMAGE_PUSH_MAX_TARGETS:
+        raise HTTPException(status_code=400, detail=IMAGE_PUSH_TARGETS_INVALID.format(limit=settings.IMAGE_PUSH_MAX_TARGETS))
+    logger.info(f"User '{current_user.username}' is pushing {len(data.targets)} image target(s)")
+    targets = [PushTarget(t.local_tag, t.remote_repo) for t in data.targets]
+    auth_configs = {}
+    for registry in {registry_for(t.repository) for t in targets}:
+        auth_config = await registry_credentials.auth_config(current_user.username, registry)
+        if auth_config:
+            auth_configs[registry] = auth_config
+    return image_pushes.push(targets, auth_configs, parallel=data.parallel, force=bool(data.force))
+
+async def pull_image(repository: str, current_user: TokenData, local_tag: str = None):
     try:
-        user = get_current_user_from_token(token)
-        user_id = user.username
-
-        image = client.images.pull(repository)
+        client = get_docker_client()
+        image, source = await image_pulls.pull(repository, await registry_auth(current_user, repository))
+        inventory.mark_images()
+        disk_usage.invalidate()
 
         if local_tag:
-            image.tag(local_tag)
+            await client.tag_image(image["Id"], local_tag)
+            image = await client.inspect_image(image["Id"])
 
         return {
             "message": IMAGE_PULL_SUCCESS.format(tag=repository),
-            "tags": image.tags,
-            "retagged_as": local_tag if local_tag else "Not retagged"
+            "id": image["Id"],
+            "tags": image.get("RepoTags") or [],
+            "retagged_as": local_tag if local_tag else "Not retagged",
+            "source": source
         }
 
-    except docker.errors.APIError as e:
-        if "unauthorized" in str(e).lower() or "authentication required" in str(e).lower():
+    except DockerAPIError as e:
+        if is_auth_error(e):
             raise HTTPException(status_code=401, detail=UNAUTHORIZED)
         raise HTTPException(status_code=500, detail=IMAGE_PULL_FAILURE)
-    except Exception:
+    except Exception as e:
+        logger.error(f"User '{current_user.username}' failed to pull '{repository}': {str(e)}")
         raise HTTPException(status_code=500, detail=IMAGE_PULL_FAILURE)
 
-def remove_image(image_name: str, params: ImageRemoveRequest, token: str = Depends(oauth2_scheme)):
-    try:
-        user = get_current_user_from_token(token)
-        user_id = user.username
+async def open_pull_progress(repository: str, current_user: TokenData) -> AsyncIterator[Dict[str, Any]]:
+    logger.info(f"User '{current_user.username}' is following the pull of '{repository}'")
+    return image_pulls.progress(repository, await registry_auth(current_user, repository))
 
+async def remove_image(image_name: str, params: ImageRemoveRequest, current_user: TokenData):
+    try:
         opts = params.dict(exclude_unset=True)
-        client.images.remove(image=image_name, **opts)
+        await get_docker_client().remove_image(image_name, **opts)
+        image_pulls.invalidate(image_name)
+        inventory.mark_images()
+        disk_usage.invalidate()
 
         return {
             "message": IMAGE_REMOVE_SUCCESS.format(tag=image_name),
             "used_options": opts
         }
-    except docker.errors.ImageNotFound:
+    except DockerNotFound:
         raise HTTPException(status_code=404, detail=IMAGE_NOT_FOUND)
-    except Exception:
+    except Exception as e:
+        logger.error(f"User '{current_user.username}' failed to remove image '{image_name}': {str(e)}")
         raise HTTPException(status_code=500, detail=IMAGE_REMOVE_FAILURE)
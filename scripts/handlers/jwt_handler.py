@@ -1,18 +1,15 @@
 from fastapi import HTTPException, status
 from scripts.models.jwt_model import UserSignupRequest, Token, UserLoginRequest, UserLoginResponse
 from scripts.utils.jwt_utils import create_user_token
-from scripts.utils.mongo_utils import MongoDBConnection
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.password_utils import password_hasher
 from scripts.logging.logger import logger
-from passlib.context import CryptContext
 
-mongodb = MongoDBConnection()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+async def signup_user_handler(user: UserSignupRequest) -> Token:
+    users_collection = mongo.get_async_collection("users")
 
-def signup_user_handler(user: UserSignupRequest) -> Token:
-    users_collection = mongodb.get_collection("users")
-
-    existing_user = users_collection.find_one({"username": user.username})
+    existing_user = await users_collection.find_one({"username": user.username})
 
     if existing_user:
         logger.warning(f"Signup failed: User '{user.username}' already exists")
@@ -21,14 +18,14 @@ def signup_user_handler(user: UserSignupRequest) -> Token:
             detail="Username already exists"
         )
 
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
 
     new_user = {
         "username": user.username,
         "password": hashed_password,
         "role": user.role
     }
-    users_collection.insert_one(new_user)
+    await users_collection.insert_one(new_user)
 
     logger.info(f"User '{user.username}' registered successfully")
 
@@ -36,13 +33,13 @@ def signup_user_handler(user: UserSignupRequest) -> Token:
     return Token(access_token=access_token, token_type="bearer", expires_in=3600)  # 1-hour expiration
 
 
-def login_user_handler(user_login: UserLoginRequest) -> UserLoginResponse:
-    users_collection = mongodb.get_collection("users")
+async def login_user_handler(user_login: UserLoginRequest) -> UserLoginResponse:
+    users_collection = mongo.get_async_collection("users")
 
     username = user_login.username
     password = user_login.password
 
-    user_record = users_collection.find_one({"username": username})
+    user_record = await users_collection.find_one({"username": username})
 
     if not user_record:
         logger.warning(f"Login failed for user '{username}' - User not found")
@@ -51,13 +48,19 @@ def login_user_handler(user_login: UserLoginRequest) -> UserLoginResponse:
             detail="Invalid username or password"
         )
 
-    if not pwd_context.verify(password, user_record["password"]):
+    valid, new_hash = await password_hasher.verify(password, user_record["password"])
+    if not valid:
         logger.warning(f"Login failed for user '{username}' - Incorrect password")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
 
+    if new_hash:
+        # Bcrypt settings changed since this hash was made; store one with the current cost.
+        await users_collection.update_one({"_id": user_record["_id"], "password": user_record["password"]}, {"$set": {"password": new_hash}})
+        logger.info(f"Rehashed password for user '{username}'")
+
     logger.info(f"User '{username}' authenticated successfully")
 
     access_token = create_user_token(username, user_record["role"])
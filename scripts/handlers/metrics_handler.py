@@ -0,0 +1,5 @@
+from scripts.utils.metrics_utils import worker_metrics
+
+
+async def get_metrics() -> str:
+    return await worker_metrics.render()
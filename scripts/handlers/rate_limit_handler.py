@@ -1,8 +1,11 @@
 from fastapi import HTTPException, status, Depends
-from scripts.utils.mongo_utils import MongoDBConnection
+from scripts.utils.mongo_utils import mongo
 from scripts.models.rate_limit_model import RateLimitConfig
 from scripts.logging.logger import logger
 from scripts.utils.jwt_utils import decode_access_token
+from scripts.utils.rate_limit_utils import RATE_LIMIT_CHANNEL, rate_limiter
+from scripts.utils.shared_store_utils import shared_store
+from scripts.constants.app_constants import RATE_LIMIT_COLLECTION
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime
 from scripts.constants.api_endpoints import Endpoints
@@ -10,12 +13,11 @@ from scripts.constants.api_endpoints import Endpoints
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-mongodb = MongoDBConnection()
 
 def get_user_role(token: str = Depends(oauth2_scheme)) -> str:
 
     user_data = decode_access_token(token)
-    return user_data['role']
+    return user_data.role
 
 def get_rate_limit_handler(user_id: str, role: str = Depends(get_user_role)) -> RateLimitConfig:
 
@@ -26,7 +28,7 @@ def get_rate_limit_handler(user_id: str, role: str = Depends(get_user_role)) ->
             detail="Insufficient role to access rate limit data"
         )
 
-    rate_limit_collection = mongodb.get_collection("rate_limits")
+    rate_limit_collection = mongo.get_collection(RATE_LIMIT_COLLECTION)
 
     user_limit = rate_limit_collection.find_one({"user_id": user_id})
     if not user_limit:
@@ -58,7 +60,7 @@ def set_rate_limit_handler(user_id: str, limit: int, time_window: int, role: str
             detail="Insufficient role to set rate limit"
         )
 
-    rate_limit_collection = mongodb.get_collection("rate_limits")
+    rate_limit_collection = mongo.get_collection(RATE_LIMIT_COLLECTION)
 
     existing = rate_limit_collection.find_one({"user_id": user_id})
     if existing:
@@ -78,6 +80,8 @@ def set_rate_limit_handler(user_id: str, limit: int, time_window: int, role: str
         "created_at": datetime.utcnow()
     })
 
+    rate_limiter.invalidate_policy(user_id)
+    shared_store.publish_from_thread(RATE_LIMIT_CHANNEL, user_id)
     logger.info(f"Set new rate limit for user '{user_id}' to {limit}")
     return {"message": "Rate limit set successfully"}
 
@@ -90,7 +94,7 @@ def update_rate_limit_handler(user_id: str, limit: int, time_window: int, role:
             detail="Insufficient role to update rate limit"
         )
 
-    rate_limit_collection = mongodb.get_collection("rate_limits")
+    rate_limit_collection = mongo.get_collection(RATE_LIMIT_COLLECTION)
 
     update_result = rate_limit_collection.update_one(
         {"user_id": user_id},
@@ -110,5 +114,7 @@ def update_rate_limit_handler(user_id: str, limit: int, time_window: int, role:
             detail="Rate limit configuration not found"
         )
 
+    rate_limiter.invalidate_policy(user_id)
+    shared_store.publish_from_thread(RATE_LIMIT_CHANNEL, user_id)
     logger.info(f"Updated rate limit for user '{user_id}' to {limit}")
     return {"message": "Rate limit updated successfully"}
@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Depends, status
+from fastapi.security import OAuth2PasswordBearer
+from scripts.constants.app_constants import (
+    CONTAINER_NOT_FOUND,
+    CONTAINER_STATS_NOT_AVAILABLE,
+    CONTAINER_COLLECTION,
+    USER_CONTAINERS_ACCESS_DENIED
+)
+from scripts.models.jwt_model import TokenData
+from scripts.utils.jwt_utils import decode_access_token
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.stats_utils import stats_collector, RingBuffer
+from scripts.logging.logger import logger
+from scripts.constants.api_endpoints import Endpoints
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    user = decode_access_token(token)
+    if not user:
+        logger.warning("Invalid or expired token")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    return user
+
+
+def _series(buffer: RingBuffer, since: Optional[float], limit: Optional[int]) -> Dict[str, Any]:
+    return {"current": buffer.latest(), "history": buffer.history(since, limit)}
+
+
+async def _owns_container(username: str, name: str) -> bool:
+    collection = mongo.get_async_collection(CONTAINER_COLLECTION)
+    return await collection.find_one({"user_id": username, "container_name": name}, {"_id": 1}) is not None
+
+
+async def get_container_stats(name: str, current_user: TokenData, since: Optional[float] = None, limit: Optional[int] = None):
+    entry = stats_collector.find_container(name)
+    if entry is None:
+        known = inventory.find_container(name) is not None
+        raise HTTPException(status_code=404, detail=CONTAINER_STATS_NOT_AVAILABLE if known else CONTAINER_NOT_FOUND)
+
+    if current_user.role != "Admin" and entry.owner != current_user.username:
+        # Containers created before owner labels existed are matched through their creation record.
+        if entry.owner is not None or not await _owns_container(current_user.username, entry.name):
+            raise HTTPException(status_code=403, detail="You do not have permission to view this container's stats.")
+
+    return {"id": entry.id, "name": entry.name, "owner": entry.owner, **_series(entry.history, since, limit)}
+
+
+async def get_user_stats(username: str, current_user: TokenData, since: Optional[float] = None, limit: Optional[int] = None):
+    if current_user.role != "Admin" and current_user.username != username:
+        raise HTTPException(status_code=403, detail=USER_CONTAINERS_ACCESS_DENIED)
+
+    containers: List[Dict[str, Any]] = [
+        {"id": entry.id, "name": entry.name, "current": entry.history.latest()}
+        for entry in stats_collector.user_containers(username)
+    ]
+    buffer = stats_collector.users.get(username)
+    series = _series(buffer, since, limit) if buffer is not None else {"current": None, "history": []}
+    return {"username": username, "containers": containers, **series}
+
+
+async def get_host_stats(current_user: TokenData, since: Optional[float] = None, limit: Optional[int] = None):
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="You do not have permission to view host stats.")
+
+    return {
+        "containers": len(stats_collector.containers),
+        "users": len(stats_collector.users),
+        "last_sample": stats_collector.last_sample,
+        "collector": stats_collector.stats,
+        **_series(stats_collector.host, since, limit),
+    }
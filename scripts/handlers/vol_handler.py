@@ -1,4 +1,4 @@
-import docker
+from typing import List, Optional
 from fastapi import HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer
 from scripts.models.volume_model import VolumeCreateRequest, VolumeRemoveRequest
@@ -7,14 +7,20 @@ from scripts.constants.app_constants import (
     VOLUME_CREATE_FAILURE,
     VOLUME_REMOVE_SUCCESS,
     VOLUME_REMOVE_FAILURE,
-    VOLUME_NOT_FOUND
+    VOLUME_NOT_FOUND,
+    VOLUME_LIST_SUCCESS,
+    VOLUME_LIST_FAILURE,
+    DISK_USAGE_SUCCESS,
+    DISK_USAGE_FAILURE
 )
+from scripts.models.jwt_model import TokenData
 from scripts.utils.jwt_utils import decode_access_token
+from scripts.utils.docker_utils import get_docker_client, DockerAPIError, DockerNotFound
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.disk_usage_utils import disk_usage
 from scripts.logging.logger import logger
 from scripts.constants.api_endpoints import Endpoints
 
-client = docker.from_env()
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -25,27 +31,31 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     return user
 
 
-def create_volume_with_params(data: VolumeCreateRequest, current_user: dict = Depends(get_current_user)):
+async def create_volume_with_params(data: VolumeCreateRequest, current_user: TokenData):
     try:
-        if current_user["role"] != "Admin":
-            logger.warning(f"User '{current_user['username']}' is not authorized to create volumes")
+        if current_user.role != "Admin":
+            logger.warning(f"User '{current_user.username}' is not authorized to create volumes")
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You don't have permission to create volumes"
             )
 
         opts = data.dict(exclude_unset=True)
-        volume = client.volumes.create(**opts)
+        volume = await get_docker_client().create_volume(**opts)
+        inventory.mark_volumes(volume["Name"])
+        disk_usage.invalidate()
 
-        logger.info(f"Created volume '{volume.name}' successfully by user '{current_user['username']}'")
+        logger.info(f"Created volume '{volume['Name']}' successfully by user '{current_user.username}'")
         return {
-            "message": f"{VOLUME_CREATE_SUCCESS}: '{volume.name}'",
-            "name": volume.name,
-            "driver": volume.attrs.get("Driver"),
-            "labels": volume.attrs.get("Labels")
+            "message": f"{VOLUME_CREATE_SUCCESS}: '{volume['Name']}'",
+            "name": volume["Name"],
+            "driver": volume.get("Driver"),
+            "labels": volume.get("Labels")
         }
 
-    except docker.errors.APIError as e:
+    except HTTPException:
+        raise
+    except DockerAPIError as e:
         logger.error(f"Docker API error while creating volume: {str(e)}")
         raise HTTPException(status_code=500, detail=VOLUME_CREATE_FAILURE)
     except Exception as e:
@@ -53,10 +63,10 @@ def create_volume_with_params(data: VolumeCreateRequest, current_user: dict = De
         raise HTTPException(status_code=500, detail=VOLUME_CREATE_FAILURE)
 
 
-def remove_volume_with_params(name: str, params: VolumeRemoveRequest, current_user: dict = Depends(get_current_user)):
+async def remove_volume_with_params(name: str, params: VolumeRemoveRequest, current_user: TokenData):
     try:
-        if current_user["role"] != "Admin":
-            logger.warning(f"User '{current_user['username']}' is not authorized to remove volumes")
+        if current_user.role != "Admin":
+            logger.warning(f"User '{current_user.username}' is not authorized to remove volumes")
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You don't have permission to remove volumes"
@@ -64,18 +74,78 @@ def remove_volume_with_params(name: str, params: VolumeRemoveRequest, current_us
 
         opts = params.dict(exclude_unset=True)
 
-        volume = client.volumes.get(name)
-        volume.remove(**opts)
+        await get_docker_client().remove_volume(name, **opts)
+        inventory.mark_volumes(name)
+        disk_usage.invalidate()
 
-        logger.info(f"Removed volume '{name}' successfully by user '{current_user['username']}'")
+        logger.info(f"Removed volume '{name}' successfully by user '{current_user.username}'")
         return {"message": f"{VOLUME_REMOVE_SUCCESS}: '{name}'"}
 
-    except docker.errors.NotFound:
+    except HTTPException:
+        raise
+    except DockerNotFound:
         logger.warning(f"Volume '{name}' not found")
         raise HTTPException(status_code=404, detail=VOLUME_NOT_FOUND)
-    except docker.errors.APIError as e:
+    except DockerAPIError as e:
         logger.error(f"Docker API error while removing volume '{name}': {str(e)}")
         raise HTTPException(status_code=500, detail=VOLUME_REMOVE_FAILURE)
     except Exception as e:
         logger.error(f"Failed to remove volume '{name}': {str(e)}")
         raise HTTPException(status_code=500, detail=VOLUME_REMOVE_FAILURE)
+
+
+async def list_volumes_with_filters(current_user: TokenData, name: Optional[str] = None, driver: Optional[str] = None, label: Optional[List[str]] = None):
+    try:
+        if current_user.role != "Admin":
+            logger.warning(f"User '{current_user.username}' is not authorized to list volumes")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have permission to list volumes"
+            )
+
+        filters = {"name": name, "driver": driver, "label": label}
+        volumes = await inventory.list_volumes(filters={k: v for k, v in filters.items() if v})
+        await disk_usage.current()
+
+        return {
+            "message": VOLUME_LIST_SUCCESS,
+            "volumes": [
+                {
+                    "name": v["Name"],
+                    "driver": v.get("Driver"),
+                    "labels": v.get("Labels") or {},
+                    "mountpoint": v.get("Mountpoint"),
+                    "created_at": v.get("CreatedAt"),
+                    # None until the next snapshot for volumes created since the last one.
+                    "size": disk_usage.volumes.get(v["Name"], {}).get("size"),
+                    "ref_count": disk_usage.volumes.get(v["Name"], {}).get("ref_count"),
+                }
+                for v in volumes
+            ],
+            "usage": disk_usage.freshness()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to list volumes: {str(e)}")
+        raise HTTPException(status_code=500, detail=VOLUME_LIST_FAILURE)
+
+
+async def get_disk_usage(current_user: TokenData):
+    try:
+        if current_user.role != "Admin":
+            logger.warning(f"User '{current_user.username}' is not authorized to view disk usage")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have permission to view disk usage"
+            )
+
+        await disk_usage.get()
+        return {"message": DISK_USAGE_SUCCESS, **disk_usage.summary(), "usage": disk_usage.freshness()}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get Docker disk usage: {str(e)}")
+        raise HTTPException(status_code=500, detail=DISK_USAGE_FAILURE)
@@ -1,26 +1,162 @@
+import atexit
+import json
 import logging
+import multiprocessing
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional, Tuple
+from scripts.constants.app_configuration import settings
 
-LOG_FILE = "logs/EPR.log"
+LOG_FILE = settings.LOG_FILE
 
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
-LOG_FORMAT = "%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s"
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(request_id)s | %(filename)s:%(lineno)d | %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Correlation ID of the request being handled; copied into tasks and worker threads with the context.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps ``rate`` of the records below WARNING; warnings and errors are always kept.
+
+    Records of a request are kept or dropped together, decided from its correlation ID.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            return zlib.crc32(request_id.encode()) % 10000 < self.rate * 10000
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "request_id": getattr(record, "request_id", "-"),
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the background writer; when the queue is full they are dropped and counted."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the message is merged here; the writer thread does the formatting.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def build_handlers(log_file: str = LOG_FILE, stream=None) -> List[logging.Handler]:
+    """The file and console handlers the background writer feeds."""
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=settings.LOG_FILE_MAX_BYTES, backupCount=settings.LOG_FILE_BACKUP_COUNT
+    )
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(settings.LOG_FILE_LEVEL)
+
+    console_handler = logging.StreamHandler(stream)
+    console_handler.setFormatter(formatter)
+    console_handler.setLevel(settings.LOG_LEVEL)
+    return [file_handler, console_handler]
+
+
 logger = logging.getLogger("FastAPI-Docker-Manager")
-logger.setLevel(logging.DEBUG)
+logger.setLevel(settings.LOG_LEVEL)
+
+queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+queue_handler.addFilter(RequestIdFilter())
+queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+logger.addHandler(queue_handler)
+
+listener = QueueListener(queue_handler.queue, *build_handlers(), respect_handler_level=True)
+listener.start()
+_listener_pid = os.getpid()
+# The listeners this process runs: its own, and one per forked child it reads records from.
+_listeners: List[QueueListener] = [listener]
+
+
+def child_log_queue() -> Tuple[multiprocessing.Queue, QueueListener]:
+    """A queue for one forked child to log through, written by this process's handlers.
+
+    Create it right before forking the child, so the queue has never been used in
+    this process and the child starts with a clean copy; call ``use_child_queue``
+    in the child, and ``stop_listener`` once it has exited.
+    """
+    log_queue = multiprocessing.get_context("fork").Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    child_listener = QueueListener(log_queue, *listener.handlers, respect_handler_level=listener.respect_handler_level)
+    child_listener.start()
+    _listeners.append(child_listener)
+    return log_queue, child_listener
+
+
+def use_child_queue(log_queue: multiprocessing.Queue):
+    """In a forked child: send records to the parent through ``log_queue`` from ``child_log_queue``."""
+    # The parent's listener threads were not carried over by the fork.
+    _listeners.clear()
+    queue_handler.queue = log_queue
+
+
+def stop_listener(child_listener: QueueListener):
+    """Write what a child sent before it exited, then stop reading its queue."""
+    if child_listener in _listeners:
+        _listeners.remove(child_listener)
+        child_listener.stop()
+
 
-file_handler = RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5)
-file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
-file_handler.setLevel(logging.INFO)
+def flush_logs():
+    """Flush queued records: stop the writers in the process that owns them, or drain the feeder in a child."""
+    if os.getpid() == _listener_pid:
+        while _listeners:
+            _listeners.pop().stop()
+    elif hasattr(queue_handler.queue, "join_thread"):
+        queue_handler.queue.close()
+        queue_handler.queue.join_thread()
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
-console_handler.setLevel(logging.DEBUG)
 
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+atexit.register(flush_logs)
 
 logger.info("Logger initialized successfully")
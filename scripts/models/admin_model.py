@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+from scripts.constants.app_configuration import settings
+
+
+class AdminListRequest(BaseModel):
+    created_after: Optional[datetime] = Field(None, description="Only records created at or after this time")
+    created_before: Optional[datetime] = Field(None, description="Only records created before this time")
+    role: Optional[str] = Field(None, description="Only records of users with this role")
+    fields: Optional[str] = Field(None, description="Comma-separated fields to return")
+    cursor: Optional[str] = Field(None, description="The X-Next-Cursor value of the previous page")
+    limit: int = Field(settings.ADMIN_PAGE_DEFAULT_LIMIT, ge=1, le=settings.ADMIN_PAGE_MAX_LIMIT)
+    order: Literal["desc", "asc"] = "desc"
+
+
+class AdminUserListRequest(AdminListRequest):
+    username: Optional[str] = Field(None, description="Only usernames starting with this prefix")
+
+
+class AdminContainerListRequest(AdminListRequest):
+    user: Optional[str] = Field(None, description="Only containers created by this user")
+    container_name: Optional[str] = Field(None, description="Only container names starting with this prefix")
@@ -9,6 +9,7 @@ class ContainerRunAdvancedRequest(BaseModel):
     name: Optional[str] = None
     detach: Optional[bool] = True
     auto_remove: Optional[bool] = False
+    labels: Optional[Union[Dict[str, str], List[str]]] = None
     stdout: Optional[bool] = True
     stderr: Optional[bool] = False
     remove: Optional[bool] = False
@@ -79,6 +80,16 @@ class ContainerRemoveRequest(BaseModel):
     force: Optional[bool] = False
 
 
+class ContainerBulkRequest(BaseModel):
+    action: Literal["start", "stop", "restart", "remove"]
+    names: Optional[List[str]] = None
+    labels: Optional[List[str]] = None
+    timeout: Optional[float] = 10
+    force: Optional[bool] = False
+    v: Optional[bool] = False
+    concurrency: Optional[int] = None
+
+
 class ContainerLogsResponse(BaseModel):
     container_id: str = Field(..., title="Container ID", description="ID of the container")
     logs: List[str] = Field(..., title="Logs", description="Container logs output")
@@ -3,8 +3,10 @@ from typing import Optional, Union, Any, Dict, List
 
 class ImageGithubBuildRequest(BaseModel):
     github_url: str
+    ref: Optional[str] = None
     dockerfile_path: Optional[str] = "Dockerfile"
     tag: Optional[str] = "default:latest"
+    nocache: Optional[bool] = False
 
 
 class ImageBuildRequest(BaseModel):
@@ -56,6 +58,12 @@ class ImagePushRequest(BaseModel):
     remote_repo: str
 
 
+class ImagePushBatchRequest(BaseModel):
+    targets: List[ImagePushRequest]
+    parallel: Optional[int] = None
+    force: Optional[bool] = False
+
+
 class ImagePullRequest(BaseModel):
     repository: str
     local_tag: Optional[str] = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict
 
 class RateLimitConfig(BaseModel):
     user_id: str
@@ -15,3 +15,23 @@ class RateLimitConfig(BaseModel):
         json_encoders = {
             datetime: lambda v: v.isoformat() if v else None
         }
+
+
+class RateLimitStatus(BaseModel):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int
+    retry_after: Optional[int] = None
+    # The counter window the request was charged to, so a failed operation gives back that slot.
+    window_start: Optional[int] = Field(default=None, exclude=True)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset),
+        }
+        if self.retry_after is not None:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Query, Response, status, HTTPException
 from scripts.handlers.admin_handler import (
     list_all_users,
+    export_users,
+    export_containers,
     get_user_details,
     delete_user,
-    list_all_containers
+    list_all_containers,
+    get_token_cache_stats,
+    get_index_report,
+    get_docker_hosts,
+    get_warm_pool,
+    get_gc_report
 )
 from scripts.constants.api_endpoints import Endpoints
 from scripts.logging.logger import logger
 from scripts.utils.jwt_utils import get_current_user_from_token
+from scripts.utils.stream_utils import stream_response
+from scripts.models.admin_model import AdminUserListRequest, AdminContainerListRequest
 
 
 admin_router = APIRouter()
 
 
 def admin_required(user: dict = Depends(get_current_user_from_token)):
-    if user["role"] != "Admin":
-        logger.warning(f"User '{user['username']}' attempted to access restricted route without admin privileges")
+    if user.role != "Admin":
+        logger.warning(f"User '{user.username}' attempted to access restricted route without admin privileges")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have permission to perform this action."
@@ -24,9 +33,16 @@ def admin_required(user: dict = Depends(get_current_user_from_token)):
 
 
 @admin_router.get(Endpoints.ADMIN_USERS_LIST, status_code=status.HTTP_200_OK)
-def list_users(user: dict = Depends(admin_required)):
-    logger.info("Request to fetch all users")
-    return list_all_users(user)
+async def list_users(
+    response: Response,
+    params: AdminUserListRequest = Depends(),
+    format: str = Query("json", enum=["json", "ndjson"], description="json for one page, ndjson to stream every match"),
+    user: dict = Depends(admin_required)
+):
+    logger.info(f"Request to fetch users as {format}")
+    if format == "ndjson":
+        return stream_response(export_users(user, params))
+    return await list_all_users(user, params, response)
 
 
 @admin_router.get(Endpoints.ADMIN_USER_DETAILS, status_code=status.HTTP_200_OK)
@@ -42,6 +58,43 @@ def delete_user_account(username: str, user: dict = Depends(admin_required)):
 
 
 @admin_router.get(Endpoints.ADMIN_CONTAINERS_LIST, status_code=status.HTTP_200_OK)
-def list_containers(user: dict = Depends(admin_required)):
-    logger.info("Request to fetch all containers")
-    return list_all_containers(user)
+async def list_containers(
+    response: Response,
+    params: AdminContainerListRequest = Depends(),
+    format: str = Query("json", enum=["json", "ndjson"], description="json for one page, ndjson to stream every match"),
+    user: dict = Depends(admin_required)
+):
+    logger.info(f"Request to fetch containers as {format}")
+    if format == "ndjson":
+        return stream_response(await export_containers(user, params))
+    return await list_all_containers(user, params, response)
+
+
+@admin_router.get(Endpoints.ADMIN_TOKEN_CACHE_STATS, status_code=status.HTTP_200_OK)
+def token_cache_stats_view(user: dict = Depends(admin_required)):
+    logger.info("Request to fetch token cache stats")
+    return get_token_cache_stats(user)
+
+
+@admin_router.get(Endpoints.ADMIN_DOCKER_HOSTS, status_code=status.HTTP_200_OK)
+async def docker_hosts_view(user: dict = Depends(admin_required)):
+    logger.info("Request to fetch Docker hosts and placement state")
+    return await get_docker_hosts(user)
+
+
+@admin_router.get(Endpoints.ADMIN_WARM_POOL, status_code=status.HTTP_200_OK)
+def warm_pool_view(user: dict = Depends(admin_required)):
+    logger.info("Request to fetch warm pool state")
+    return get_warm_pool(user)
+
+
+@admin_router.get(Endpoints.ADMIN_GC_REPORT, status_code=status.HTTP_200_OK)
+async def gc_report_view(user: dict = Depends(admin_required)):
+    logger.info("Request to fetch the garbage collection dry-run report")
+    return await get_gc_report(user)
+
+
+@admin_router.get(Endpoints.ADMIN_INDEX_REPORT, status_code=status.HTTP_200_OK)
+async def index_report_view(user: dict = Depends(admin_required)):
+    logger.info("Request to fetch index usage and query plans")
+    return await get_index_report(user)
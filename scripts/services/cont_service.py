@@ -1,103 +1,200 @@
-from fastapi import APIRouter, Query, Body
+import asyncio
+from fastapi import APIRouter, Path, Query, Body, Depends, HTTPException, Response, WebSocket, WebSocketDisconnect, status
 from scripts.handlers.cont_handler import *
 from scripts.models.cont_model import *
 from scripts.constants.api_endpoints import Endpoints
 from scripts.logging.logger import logger
-from scripts.utils.jwt_utils import get_current_user_from_token
+from scripts.utils.jwt_utils import decode_access_token
 from scripts.models.jwt_model import TokenData
+from scripts.utils.stream_utils import stream_response, STREAM_FORMATS
 
 
 container_router = APIRouter()
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
-    user = get_current_user_from_token(token)
+    user = decode_access_token(token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return user
 
 @container_router.post(Endpoints.CONTAINER_CREATE)
-def run_container_view(
+async def run_container_view(
     request: ContainerRunAdvancedRequest,
+    response: Response,
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         logger.info(f"User '{current_user.username}' running container with basic parameters")
-        return run_container_advanced(request)
+        return await run_container_advanced(request, current_user, response)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error running container: {e}")
         raise HTTPException(status_code=500, detail="Error running container")
 
 @container_router.post(Endpoints.CONTAINER_CREATE_ADVANCED)
-def run_container_advanced_view(
+async def run_container_advanced_view(
     data: ContainerRunAdvancedRequest,
+    response: Response,
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         logger.info(f"User '{current_user.username}' running container with advanced parameters")
-        return run_container_advanced(data)
+        return await run_container_advanced(data, current_user, response)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error running container with advanced parameters: {e}")
         raise HTTPException(status_code=500, detail="Error running container with advanced parameters")
 
 @container_router.post(Endpoints.CONTAINER_LIST)
-def list_containers_view(
+async def list_containers_view(
     params: ContainerListRequest = Body(...),
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         logger.info(f"User '{current_user.username}' listing containers with filters: {params.dict(exclude_unset=True)}")
-        return list_containers_with_filters(params)
+        return await list_containers_with_filters(params, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing containers: {e}")
         raise HTTPException(status_code=500, detail="Error listing containers")
 
 @container_router.post(Endpoints.CONTAINER_LOGS)
-def get_container_logs(
-    name: str,
+async def get_container_logs(
+    name: str = Path(..., alias="container_name"),
     params: ContainerLogsRequest = Body(...),
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         logger.info(f"User '{current_user.username}' fetching logs for container '{name}' with params: {params.dict(exclude_unset=True)}")
-        return get_logs_with_params(name, params)
+        return await get_logs_with_params(name, params, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching logs for container '{name}': {e}")
         raise HTTPException(status_code=500, detail="Error fetching container logs")
 
+def log_stream_params(
+    follow: bool = Query(False, description="Keep the stream open and send new lines as they are written"),
+    tail: str = Query("all", description="Number of lines from the end of the log, or 'all'"),
+    since: Optional[float] = Query(None, description="Only lines since this UNIX timestamp"),
+    until: Optional[float] = Query(None, description="Only lines before this UNIX timestamp"),
+    stdout: bool = Query(True),
+    stderr: bool = Query(True),
+    timestamps: bool = Query(False)
+) -> ContainerLogsRequest:
+    params = {"follow": follow, "tail": int(tail) if tail.isdigit() else "all", "stdout": stdout, "stderr": stderr, "timestamps": timestamps}
+    if since is not None:
+        params["since"] = since
+    if until is not None:
+        params["until"] = until
+    return ContainerLogsRequest(**params)
+
+@container_router.get(Endpoints.CONTAINER_LOGS_STREAM)
+async def stream_container_logs_view(
+    container_name: str,
+    format: str = Query("ndjson", enum=list(STREAM_FORMATS), description="ndjson or sse"),
+    params: ContainerLogsRequest = Depends(log_stream_params),
+    current_user: TokenData = Depends(get_current_user)
+):
+    logger.info(f"User '{current_user.username}' streaming logs for container '{container_name}' as {format}")
+    events = await open_log_stream(container_name, params, current_user)
+    return stream_response(events, format, event_field="stream")
+
+@container_router.websocket(Endpoints.CONTAINER_LOGS_WS)
+async def container_logs_websocket(
+    websocket: WebSocket,
+    container_name: str,
+    params: ContainerLogsRequest = Depends(log_stream_params)
+):
+    auth_header = websocket.headers.get("authorization", "")
+    token = auth_header[7:] if auth_header.lower().startswith("bearer ") else websocket.query_params.get("token")
+    try:
+        current_user = get_current_user(token) if token else None
+        events = await open_log_stream(container_name, params, current_user) if current_user else None
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    if events is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Authentication is required")
+        return
+
+    await websocket.accept()
+
+    async def pump():
+        async for event in events:
+            await websocket.send_json(event)
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender = asyncio.create_task(pump())
+    receiver = asyncio.create_task(wait_for_disconnect())
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    await events.aclose()
+
+    if sender in done:
+        error = sender.exception()
+        if error is None:
+            await websocket.close()
+        elif not isinstance(error, WebSocketDisconnect):
+            logger.error(f"Log websocket for container '{container_name}' failed: {error}")
+
+@container_router.post(Endpoints.CONTAINER_BULK)
+async def bulk_container_action_view(
+    data: ContainerBulkRequest,
+    format: str = Query("ndjson", enum=list(STREAM_FORMATS), description="ndjson or sse"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    events = await open_bulk_action(data, current_user)
+    return stream_response(events, format, event_field="type")
+
 @container_router.post(Endpoints.CONTAINER_STOP)
-def stop_container_view(
-    name: str,
+async def stop_container_view(
+    name: str = Path(..., alias="container_name"),
     timeout: Optional[float] = Query(None, description="Timeout in seconds before force stop"),
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         logger.info(f"User '{current_user.username}' stopping container '{name}' with timeout={timeout}")
-        return stop_container(name, timeout)
+        return await stop_container(name, current_user, timeout)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error stopping container '{name}': {e}")
         raise HTTPException(status_code=500, detail="Error stopping container")
 
 @container_router.post(Endpoints.CONTAINER_START)
-def start_container_view(
-    name: str,
+async def start_container_view(
+    name: str = Path(..., alias="container_name"),
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         logger.info(f"User '{current_user.username}' starting container '{name}'")
-        return start_container(name)
+        return await start_container(name, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error starting container '{name}': {e}")
         raise HTTPException(status_code=500, detail="Error starting container")
 
 @container_router.post(Endpoints.CONTAINER_DELETE)
-def remove_container_view(
-    name: str,
+async def remove_container_view(
+    name: str = Path(..., alias="container_name"),
     params: ContainerRemoveRequest = Body(...),
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         logger.info(f"User '{current_user.username}' removing container '{name}' with params: {params.dict(exclude_unset=True)}")
-        return remove_container_with_params(name, params)
+        return await remove_container_with_params(name, params, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error removing container '{name}': {e}")
         raise HTTPException(status_code=500, detail="Error removing container")
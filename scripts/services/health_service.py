@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from scripts.constants.api_endpoints import Endpoints
+from scripts.handlers.health_handler import get_liveness, get_readiness
+
+health_router = APIRouter()
+
+@health_router.get(Endpoints.HEALTHZ)
+async def liveness_view():
+    return get_liveness()
+
+@health_router.get(Endpoints.READYZ)
+async def readiness_view():
+    return await get_readiness()
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from typing import Optional
 
-from scripts.models.image_model import ImageBuildRequest, ImageRemoveRequest, ImageGithubBuildRequest
+from scripts.models.image_model import ImageBuildRequest, ImageRemoveRequest, ImageGithubBuildRequest, ImagePushBatchRequest
 from scripts.constants.api_endpoints import Endpoints
 from scripts.handlers.image_handler import (
     build_image,
@@ -10,84 +10,157 @@ from scripts.handlers.image_handler import (
     list_images,
     pull_image,
     push_image,
-    dockerhub_login
+    dockerhub_login,
+    registry_logout,
+    list_registry_logins,
+    list_build_jobs,
+    get_build_job_status,
+    get_build_job_result,
+    open_build_progress,
+    open_pull_progress,
+    open_push_progress
 )
 from scripts.logging.logger import logger
-from scripts.utils.jwt_utils import get_current_user_from_token
+from scripts.utils.jwt_utils import decode_access_token
 from scripts.models.jwt_model import TokenData
 from scripts.constants.api_endpoints import Endpoints
+from scripts.utils.stream_utils import stream_response, STREAM_FORMATS
 from fastapi.security import OAuth2PasswordBearer
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=Endpoints.AUTH_LOGIN)
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
-    user = get_current_user_from_token(token)
+    user = decode_access_token(token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return user
 
 image_router = APIRouter()
 
-@image_router.post(Endpoints.IMAGE_BUILD_ADVANCED)
-def build_image_service(data: ImageBuildRequest, current_user: TokenData = Depends(get_current_user)):
+@image_router.post(Endpoints.IMAGE_BUILD_ADVANCED, status_code=status.HTTP_202_ACCEPTED)
+async def build_image_service(data: ImageBuildRequest, current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"User '{current_user.username}' is attempting to build an image with tag: {data.tag}")
-        return build_image(data, current_user.access_token)
+        return await build_image(data, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error building image with tag {data.tag}: {e}")
         raise HTTPException(status_code=500, detail="Error building image")
 
-@image_router.post(Endpoints.IMAGE_BUILD_FROM_GITHUB)
-def build_image_from_github_service(data: ImageGithubBuildRequest, current_user: TokenData = Depends(get_current_user)):
+@image_router.post(Endpoints.IMAGE_BUILD_FROM_GITHUB, status_code=status.HTTP_202_ACCEPTED)
+async def build_image_from_github_service(data: ImageGithubBuildRequest, current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"User '{current_user.username}' is attempting to build an image from GitHub repository: {data.github_url}")
-        return build_image_from_github(data, current_user.access_token)
+        return await build_image_from_github(data, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error building image from GitHub repository {data.github_url}: {e}")
         raise HTTPException(status_code=500, detail="Error building image from GitHub repository")
 
+@image_router.get(Endpoints.IMAGE_BUILD_JOBS)
+async def list_build_jobs_service(current_user: TokenData = Depends(get_current_user)):
+    return await list_build_jobs(current_user)
+
+@image_router.get(Endpoints.IMAGE_BUILD_JOB_STATUS)
+async def build_job_status_service(job_id: str, current_user: TokenData = Depends(get_current_user)):
+    return await get_build_job_status(job_id, current_user)
+
+@image_router.get(Endpoints.IMAGE_BUILD_JOB_PROGRESS)
+async def build_job_progress_service(
+    job_id: str,
+    format: str = Query("ndjson", enum=list(STREAM_FORMATS), description="ndjson or sse"),
+    since: int = Query(0, ge=0, description="Resume from this event sequence number"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    logger.info(f"User '{current_user.username}' is following build job {job_id} as {format}")
+    events = await open_build_progress(job_id, current_user, since)
+    return stream_response(events, format, event_field="type")
+
+@image_router.get(Endpoints.IMAGE_BUILD_JOB_RESULT)
+async def build_job_result_service(job_id: str, response: Response, current_user: TokenData = Depends(get_current_user)):
+    return await get_build_job_result(job_id, current_user, response)
+
 @image_router.get(Endpoints.IMAGE_LIST)
-def list_images_service(name: str = None, all: bool = False, filters: Optional[dict] = None, current_user: TokenData = Depends(get_current_user)):
+async def list_images_service(name: str = None, all: bool = False, filters: Optional[dict] = None, current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"User '{current_user.username}' is listing Docker images with filters: {filters}")
-        return list_images(name, all, filters, current_user.access_token)
+        return await list_images(current_user, name, all, filters)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing Docker images with filters {filters}: {e}")
         raise HTTPException(status_code=500, detail="Error listing Docker images")
 
 @image_router.post(Endpoints.DOCKER_REGISTRY_LOGIN)
-def dockerhub_login_service(username: str, password: str, current_user: TokenData = Depends(get_current_user)):
+async def dockerhub_login_service(username: str, password: str, registry: Optional[str] = None, current_user: TokenData = Depends(get_current_user)):
     try:
-        logger.info(f"User '{current_user.username}' is attempting to login to DockerHub with username: {username}")
-        return dockerhub_login(username, password, current_user.access_token)
+        logger.info(f"User '{current_user.username}' is attempting to login to {registry or 'DockerHub'} with username: {username}")
+        return await dockerhub_login(username, password, current_user, registry)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error logging into DockerHub with username {username}: {e}")
+        logger.error(f"Error logging into {registry or 'DockerHub'} with username {username}: {e}")
         raise HTTPException(status_code=500, detail="Error logging into DockerHub")
 
+@image_router.post(Endpoints.DOCKER_REGISTRY_LOGOUT)
+async def registry_logout_service(registry: Optional[str] = None, current_user: TokenData = Depends(get_current_user)):
+    logger.info(f"User '{current_user.username}' is logging out of {registry or 'DockerHub'}")
+    return await registry_logout(current_user, registry)
+
+@image_router.get(Endpoints.DOCKER_REGISTRY_LOGINS)
+async def list_registry_logins_service(current_user: TokenData = Depends(get_current_user)):
+    return await list_registry_logins(current_user)
+
 @image_router.post(Endpoints.IMAGE_PUSH)
-def push_image_service(local_tag: str, remote_repo: str, current_user: TokenData = Depends(get_current_user)):
+async def push_image_service(local_tag: str, remote_repo: str, current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"User '{current_user.username}' is attempting to push image with tag: {local_tag} to remote repository: {remote_repo}")
-        return push_image(local_tag, remote_repo, current_user.access_token)
+        return await push_image(local_tag, remote_repo, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error pushing image with tag {local_tag} to repository {remote_repo}: {e}")
         raise HTTPException(status_code=500, detail="Error pushing image")
 
+@image_router.post(Endpoints.IMAGE_PUSH_STREAM)
+async def push_image_stream_service(
+    data: ImagePushBatchRequest,
+    format: str = Query("ndjson", enum=list(STREAM_FORMATS), description="ndjson or sse"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    events = await open_push_progress(data, current_user)
+    return stream_response(events, format, event_field="type")
+
 @image_router.post(Endpoints.IMAGE_PULL)
-def pull_image_service(repository: str, local_tag: str = None, current_user: TokenData = Depends(get_current_user)):
+async def pull_image_service(repository: str, local_tag: str = None, current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"User '{current_user.username}' is attempting to pull image from repository: {repository}")
-        return pull_image(repository, local_tag, current_user.access_token)
+        return await pull_image(repository, current_user, local_tag)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error pulling image from repository {repository}: {e}")
         raise HTTPException(status_code=500, detail="Error pulling image")
 
+@image_router.post(Endpoints.IMAGE_PULL_STREAM)
+async def pull_image_stream_service(
+    repository: str,
+    format: str = Query("ndjson", enum=list(STREAM_FORMATS), description="ndjson or sse"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    events = await open_pull_progress(repository, current_user)
+    return stream_response(events, format, event_field="type")
+
 @image_router.delete(Endpoints.IMAGE_DELETE)
-def remove_image_service(image_name: str, params: ImageRemoveRequest, current_user: TokenData = Depends(get_current_user)):
+async def remove_image_service(image_name: str, params: ImageRemoveRequest, current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"User '{current_user.username}' is attempting to remove image with name: {image_name}")
-        return remove_image(image_name, params, current_user.access_token)
+        return await remove_image(image_name, params, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error removing image with name {image_name}: {e}")
         raise HTTPException(status_code=500, detail="Error removing image")
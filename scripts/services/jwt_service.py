@@ -23,12 +23,12 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
 
 
 @auth_router.post("/signup")
-def signup_user(data: UserSignupRequest) -> Token:
+async def signup_user(data: UserSignupRequest) -> Token:
     logger.info(f"User '{data.username}' is signing up with role: {data.role}")
-    return signup_user_handler(data)
+    return await signup_user_handler(data)
 
 @auth_router.post("/login")
-def login_user(data: OAuth2PasswordRequestForm = Depends()):
+async def login_user(data: OAuth2PasswordRequestForm = Depends()):
     logger.info(f"User '{data.username}' is attempting to log in.")
-    return login_user_handler(data)
+    return await login_user_handler(data)
 
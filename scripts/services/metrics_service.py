@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException, Response
+from scripts.constants.api_endpoints import Endpoints
+from scripts.handlers.metrics_handler import get_metrics
+from scripts.logging.logger import logger
+from scripts.utils.metrics_utils import CONTENT_TYPE
+
+metrics_router = APIRouter()
+
+@metrics_router.get(Endpoints.METRICS, include_in_schema=False)
+async def metrics_view():
+    try:
+        return Response(content=await get_metrics(), media_type=CONTENT_TYPE)
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        raise HTTPException(status_code=500, detail="Error rendering metrics")
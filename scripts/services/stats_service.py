@@ -0,0 +1,60 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from scripts.constants.api_endpoints import Endpoints
+from scripts.handlers.stats_handler import (
+    get_current_user,
+    get_container_stats,
+    get_user_stats,
+    get_host_stats
+)
+from scripts.logging.logger import logger
+from scripts.models.jwt_model import TokenData
+
+stats_router = APIRouter()
+
+@stats_router.get(Endpoints.CONTAINER_STATS)
+async def container_stats_view(
+    name: str = Path(..., alias="container_name"),
+    since: Optional[float] = Query(None, description="Only samples after this UNIX timestamp"),
+    limit: Optional[int] = Query(None, ge=0, description="At most this many of the newest samples"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    try:
+        logger.info(f"User '{current_user.username}' fetching stats for container '{name}'")
+        return await get_container_stats(name, current_user, since, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching stats for container '{name}': {e}")
+        raise HTTPException(status_code=500, detail="Error fetching container stats")
+
+@stats_router.get(Endpoints.USER_STATS)
+async def user_stats_view(
+    username: str,
+    since: Optional[float] = Query(None, description="Only samples after this UNIX timestamp"),
+    limit: Optional[int] = Query(None, ge=0, description="At most this many of the newest samples"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    try:
+        logger.info(f"User '{current_user.username}' fetching container stats of user '{username}'")
+        return await get_user_stats(username, current_user, since, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching stats for user '{username}': {e}")
+        raise HTTPException(status_code=500, detail="Error fetching user stats")
+
+@stats_router.get(Endpoints.HOST_STATS)
+async def host_stats_view(
+    since: Optional[float] = Query(None, description="Only samples after this UNIX timestamp"),
+    limit: Optional[int] = Query(None, ge=0, description="At most this many of the newest samples"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    try:
+        logger.info(f"User '{current_user.username}' fetching host stats")
+        return await get_host_stats(current_user, since, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching host stats: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching host stats")
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, status, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, status, Depends, HTTPException, Path, Query
 from scripts.constants.api_endpoints import Endpoints
 from scripts.handlers.vol_handler import (
     create_volume_with_params,
-    remove_volume_with_params
+    remove_volume_with_params,
+    list_volumes_with_filters,
+    get_disk_usage
 )
 from scripts.models.volume_model import VolumeCreateRequest, VolumeRemoveRequest
 from scripts.logging.logger import logger
-from scripts.utils.jwt_utils import get_current_user_from_token
+from scripts.utils.jwt_utils import decode_access_token
 from scripts.models.jwt_model import TokenData
 from fastapi.security import OAuth2PasswordBearer
 from scripts.constants.api_endpoints import Endpoints
@@ -16,25 +19,56 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=Endpoints.AUTH_LOGIN)
 volume_router = APIRouter()
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
-    user = get_current_user_from_token(token)
+    user = decode_access_token(token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return user
 
+@volume_router.get(Endpoints.VOLUME_LIST)
+async def list_volumes_view(
+    name: Optional[str] = None,
+    driver: Optional[str] = None,
+    label: Optional[List[str]] = Query(None, description="label key or key=value; repeat to require several"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    try:
+        logger.info(f"Authenticated user '{current_user.username}' is listing volumes")
+        return await list_volumes_with_filters(current_user, name, driver, label)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing volumes: {e}")
+        raise HTTPException(status_code=500, detail="Error listing volumes")
+
 @volume_router.post(Endpoints.VOLUME_CREATE, status_code=status.HTTP_201_CREATED)
-def create_volume_view(data: VolumeCreateRequest, current_user: TokenData = Depends(get_current_user)):
+async def create_volume_view(data: VolumeCreateRequest, current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"Authenticated user '{current_user.username}' is requesting to create a volume with data: {data}")
-        return create_volume_with_params(data, current_user)
+        return await create_volume_with_params(data, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating volume: {e}")
         raise HTTPException(status_code=500, detail="Error creating volume")
 
 @volume_router.delete(Endpoints.VOLUME_DELETE, status_code=status.HTTP_200_OK)
-def remove_volume_view(name: str, params: VolumeRemoveRequest, current_user: TokenData = Depends(get_current_user)):
+async def remove_volume_view(params: VolumeRemoveRequest, name: str = Path(..., alias="volume_name"), current_user: TokenData = Depends(get_current_user)):
     try:
         logger.info(f"Authenticated user '{current_user.username}' is requesting to remove volume '{name}' with parameters: {params}")
-        return remove_volume_with_params(name, params, current_user)
+        return await remove_volume_with_params(name, params, current_user)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error removing volume '{name}': {e}")
         raise HTTPException(status_code=500, detail="Error removing volume")
+
+@volume_router.get(Endpoints.DISK_USAGE)
+async def disk_usage_view(current_user: TokenData = Depends(get_current_user)):
+    try:
+        logger.info(f"Authenticated user '{current_user.username}' is viewing Docker disk usage")
+        return await get_disk_usage(current_user)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting Docker disk usage: {e}")
+        raise HTTPException(status_code=500, detail="Error getting Docker disk usage")
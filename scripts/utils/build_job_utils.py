@@ -0,0 +1,303 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+from fastapi import HTTPException
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import BUILD_QUEUE_FULL
+from scripts.utils.docker_utils import build_image_id, get_docker_client
+from scripts.utils.stream_utils import EventLog
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.registry_auth_utils import registry_credentials
+from scripts.utils.shared_store_utils import shared_store, SharedStoreError
+from scripts.logging.logger import logger
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Shared store keys, used when several workers serve the API.
+JOB_KEY = "build:job:{job_id}"
+EVENTS_KEY = "build:events:{job_id}"
+
+
+class BuildJob:
+    """One submitted image build and the tail of its progress stream."""
+
+    def __init__(self, owner: str, tag: Optional[str], source: str):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.tag = tag
+        self.source = source
+        self.state = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.image_id: Optional[str] = None
+        self.tags: List[str] = []
+        self.error: Optional[str] = None
+        self.metadata: Dict[str, Any] = {}
+        self.log = EventLog(settings.BUILD_JOB_MAX_EVENTS)
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    async def add_event(self, event: Dict[str, Any]):
+        self.image_id = build_image_id(event, self.image_id)
+        await self.log.append(event)
+        if shared_store.enabled:
+            await self._mirror(shared_store.log_append(
+                EVENTS_KEY.format(job_id=self.id), event, settings.BUILD_JOB_MAX_EVENTS, self._mirror_ttl
+            ))
+
+    async def set_state(self, state: str, error: Optional[str] = None):
+        self.state = state
+        self.error = error
+        if state == RUNNING:
+            self.started = time.time()
+        elif state in FINISHED_STATES:
+            self.finished = time.time()
+            await self.log.close()
+        await self.publish()
+
+    @property
+    def _mirror_ttl(self) -> float:
+        # Running jobs are refreshed on every state change; finished ones expire with the retention.
+        return settings.BUILD_JOB_RETENTION_SECONDS + (0 if self.done else 24 * 3600)
+
+    async def _mirror(self, call: Awaitable[Any]):
+        try:
+            await call
+        except (SharedStoreError, OSError) as e:
+            logger.warning(f"Could not mirror build job {self.id} to the shared store: {e}")
+
+    async def publish(self):
+        """Copy the status to the shared store, where the other workers read it."""
+        if shared_store.enabled:
+            await self._mirror(shared_store.set(JOB_KEY.format(job_id=self.id), self.status(), self._mirror_ttl))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "owner": self.owner,
+            "source": self.source,
+            "tag": self.tag,
+            "status": self.state,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "image_id": self.image_id if self.state == SUCCEEDED else None,
+            "tags": self.tags,
+            "error": self.error,
+            "metadata": self.metadata,
+            "events": self.log.count,
+        }
+
+    async def progress(self, since: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield buffered and live progress events from sequence number ``since``.
+
+        Events that fell out of the buffer are skipped. The stream ends with a
+        ``done`` item carrying the final status once the build finishes.
+        """
+        async for seq, event in self.log.follow(since):
+            yield {"type": "progress", "seq": seq, "event": event}
+        yield {"type": "done", "seq": self.log.count, **self.status()}
+
+
+class RemoteBuildJob:
+    """A build job running in another worker, read through the shared store."""
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, status: Dict[str, Any]):
+        self._status = status
+
+    def __getattr__(self, name: str) -> Any:
+        fields = {"id": "job_id", "state": "status"}
+        try:
+            return self._status[fields.get(name, name)]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def status(self) -> Dict[str, Any]:
+        return self._status
+
+    async def _refresh(self):
+        self._status = await shared_store.get(JOB_KEY.format(job_id=self.id)) or self._status
+
+    async def progress(self, since: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        cursor = max(since, 0)
+        while True:
+            finished = self.done
+            page = await shared_store.log_read(EVENTS_KEY.format(job_id=self.id), cursor)
+            for seq, event in enumerate(page["items"], start=page["first"]):
+                yield {"type": "progress", "seq": seq, "event": event}
+            cursor = page["count"]
+            if finished:
+                break
+            await asyncio.sleep(self.POLL_INTERVAL)
+            await self._refresh()
+        yield {"type": "done", "seq": cursor, **self.status()}
+
+
+class BuildJobManager:
+    """Runs image builds as background jobs.
+
+    Builds are admitted with a per-user cap on queued-plus-running jobs, then wait
+    for a per-user slot before taking one of the global ``BUILD_MAX_CONCURRENT``
+    slots, so one user's backlog never holds the shared pool. Finished jobs are
+    kept for ``BUILD_JOB_RETENTION_SECONDS``.
+
+    With the shared store enabled the caps and slots are counted across all
+    workers, and job status and events are mirrored there so any worker can
+    answer for a job (``find``/``list_all``); the build itself runs in the worker
+    that accepted it.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, BuildJob] = {}
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        self._user_slots: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def global_slots(self) -> asyncio.Semaphore:
+        if self._global_slots is None:
+            self._global_slots = asyncio.Semaphore(settings.BUILD_MAX_CONCURRENT)
+        return self._global_slots
+
+    def _user_slot(self, owner: str) -> asyncio.Semaphore:
+        if owner not in self._user_slots:
+            self._user_slots[owner] = asyncio.Semaphore(settings.BUILD_MAX_CONCURRENT_PER_USER)
+        return self._user_slots[owner]
+
+    def _prune(self):
+        cutoff = time.time() - settings.BUILD_JOB_RETENTION_SECONDS
+        for job_id in [j.id for j in self.jobs.values() if j.done and j.finished < cutoff]:
+            del self.jobs[job_id]
+
+    def active_jobs(self, owner: str) -> int:
+        return sum(1 for job in self.jobs.values() if job.owner == owner and not job.done)
+
+    async def submit(
+        self,
+        owner: str,
+        tag: Optional[str],
+        source: str,
+        build_args: Dict[str, Any],
+        prepare: Optional[Callable[[BuildJob], Awaitable[Dict[str, Any]]]] = None,
+        cleanup: Optional[Callable[[BuildJob], Awaitable[None]]] = None,
+    ) -> BuildJob:
+        """Queue a build and return immediately.
+
+        ``prepare`` may fill in extra build arguments once the job is running (for
+        example after fetching a repository), or return ``None`` after setting
+        ``job.image_id`` to reuse an existing image; ``cleanup`` always runs afterwards.
+        """
+        self._prune()
+        if shared_store.enabled:
+            admitted = await shared_store.try_acquire(f"build-queue:{owner}", settings.BUILD_MAX_QUEUED_PER_USER)
+        else:
+            admitted = self.active_jobs(owner) < settings.BUILD_MAX_QUEUED_PER_USER
+        if not admitted:
+            raise HTTPException(status_code=429, detail=BUILD_QUEUE_FULL)
+
+        job = BuildJob(owner, tag, source)
+        self.jobs[job.id] = job
+        await job.publish()
+        job.task = asyncio.create_task(self._run(job, build_args, prepare, cleanup))
+        logger.info(f"Queued build job {job.id} for user '{owner}' from {source}")
+        return job
+
+    @asynccontextmanager
+    async def _slots(self, owner: str):
+        if shared_store.enabled:
+            async with shared_store.slot(f"build-slots:{owner}", settings.BUILD_MAX_CONCURRENT_PER_USER), \
+                    shared_store.slot("build-slots", settings.BUILD_MAX_CONCURRENT):
+                yield
+        else:
+            async with self._user_slot(owner), self.global_slots:
+                yield
+
+    async def _run(self, job: BuildJob, build_args: Dict[str, Any], prepare, cleanup):
+        try:
+            async with self._slots(job.owner):
+                await job.set_state(RUNNING)
+                prepared = await prepare(job) if prepare is not None else {}
+                client = get_docker_client()
+                if prepared is not None:
+                    # Base images are pulled with the owner's registry logins.
+                    auth_configs = await registry_credentials.auth_configs(job.owner)
+                    async for event in client.build_events(**build_args, **prepared, auth_configs=auth_configs):
+                        await job.add_event(event)
+                if job.image_id is None:
+                    raise RuntimeError("Build finished without producing an image")
+                image = await client.inspect_image(job.image_id)
+                job.image_id = image["Id"]
+                job.tags = image.get("RepoTags") or []
+                inventory.mark_images()
+            await job.set_state(SUCCEEDED)
+            logger.info(f"Build job {job.id} produced image {job.image_id}")
+        except asyncio.CancelledError:
+            await job.set_state(CANCELLED, "Build was cancelled")
+            raise
+        except HTTPException as e:
+            await job.set_state(FAILED, str(e.detail))
+        except Exception as e:
+            logger.error(f"Build job {job.id} for user '{job.owner}' failed: {e}")
+            await job.set_state(FAILED, str(e))
+        finally:
+            if cleanup is not None:
+                try:
+                    await cleanup(job)
+                except Exception as e:
+                    logger.warning(f"Cleanup for build job {job.id} failed: {e}")
+            if shared_store.enabled:
+                await job._mirror(shared_store.release(f"build-queue:{job.owner}"))
+
+    def get(self, job_id: str) -> Optional[BuildJob]:
+        return self.jobs.get(job_id)
+
+    def list(self, owner: Optional[str] = None) -> List[BuildJob]:
+        self._prune()
+        return [job for job in self.jobs.values() if owner is None or job.owner == owner]
+
+    async def find(self, job_id: str) -> Optional[Union[BuildJob, RemoteBuildJob]]:
+        """Like ``get``, but also finds jobs running in other workers."""
+        job = self.get(job_id)
+        if job is None and shared_store.enabled:
+            status = await shared_store.get(JOB_KEY.format(job_id=job_id))
+            job = RemoteBuildJob(status) if status else None
+        return job
+
+    async def list_all(self, owner: Optional[str] = None) -> List[Union[BuildJob, RemoteBuildJob]]:
+        """Like ``list``, but includes jobs from every worker."""
+        jobs = self.list(owner)
+        if shared_store.enabled:
+            local = {job.id for job in jobs}
+            mirrored = await shared_store.mget(JOB_KEY.format(job_id=""))
+            jobs += [
+                RemoteBuildJob(status) for status in mirrored.values()
+                if status["job_id"] not in local and (owner is None or status["owner"] == owner)
+            ]
+        return jobs
+
+    async def shutdown(self):
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+build_jobs = BuildJobManager()
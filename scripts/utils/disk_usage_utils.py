@@ -0,0 +1,212 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from scripts.constants.app_configuration import settings
+from scripts.utils.docker_utils import get_docker_client
+from scripts.utils.shared_store_utils import SharedStoreError, shared_store
+from scripts.logging.logger import logger
+
+
+DISK_USAGE_SNAPSHOT_KEY = "disk-usage:snapshot"
+DISK_USAGE_REFRESH_LOCK = "disk-usage-refresh"
+
+# Events that change what /system/df reports, apart from container write layers growing.
+DF_EVENTS = {
+    "container": ("create", "destroy"),
+    "image": ("pull", "tag", "untag", "delete", "import", "load"),
+    "volume": ("create", "destroy"),
+}
+
+
+def _size(value: Any) -> Optional[int]:
+    # The daemon reports -1 for sizes it has not computed.
+    return value if isinstance(value, int) and value >= 0 else None
+
+
+class DiskUsageCache:
+    """The primary host's last ``/system/df``, so listings can show sizes without calling it.
+
+    df walks every layer and volume, which makes it the slowest call the daemon
+    has. A background task refreshes the snapshot every ``DISK_USAGE_REFRESH_SECONDS``;
+    create and remove events (via the inventory's event stream, or ``invalidate``
+    from handlers) mark it stale and bring the next refresh forward to
+    ``DISK_USAGE_DEBOUNCE_SECONDS`` after the first of them, so a burst of
+    changes costs one call. Readers get the snapshot and its age and only wait for the
+    daemon when there is none yet; concurrent refreshes share one call. With
+    several workers, a snapshot taken by one is reused by the others through the
+    shared store.
+
+    With ``DISK_USAGE_ENABLED`` off there is no background task and a read
+    refreshes a stale or expired snapshot itself.
+    """
+
+    def __init__(self):
+        self.df: Optional[Dict[str, Any]] = None
+        self.taken_at: Optional[float] = None
+        self.images: Dict[str, Dict[str, Any]] = {}
+        self.volumes: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"reads": 0, "refreshes": 0, "shared": 0, "invalidations": 0, "failures": 0, "last_refresh_ms": 0.0}
+        self._invalidated_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if settings.DISK_USAGE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        tasks = [task for task in (self._task, self._refreshing) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = self._refreshing = None
+
+    async def _loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Refreshing the disk usage snapshot failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.DISK_USAGE_REFRESH_SECONDS)
+                await asyncio.sleep(settings.DISK_USAGE_DEBOUNCE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    # Invalidation
+
+    @property
+    def stale(self) -> bool:
+        return self.taken_at is None or self._invalidated_at > self.taken_at
+
+    def age(self) -> Optional[float]:
+        return time.time() - self.taken_at if self.taken_at is not None else None
+
+    def invalidate(self):
+        self._invalidated_at = time.time()
+        self.stats["invalidations"] += 1
+        self._wake.set()
+
+    def handle_event(self, kind: str, action: str):
+        if action in DF_EVENTS.get(kind, ()):
+            self.invalidate()
+
+    # Refresh
+
+    async def refresh(self):
+        """Take a new snapshot; callers arriving while one is being taken wait for it."""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh(self):
+        if shared_store.enabled:
+            try:
+                async with shared_store.slot(DISK_USAGE_REFRESH_LOCK, 1):
+                    shared = await shared_store.get(DISK_USAGE_SNAPSHOT_KEY)
+                    if shared and shared["taken_at"] > self._invalidated_at and time.time() - shared["taken_at"] < settings.DISK_USAGE_REFRESH_SECONDS:
+                        self._store(shared["df"], shared["taken_at"])
+                        self.stats["shared"] += 1
+                        return
+                    taken_at, df = await self._fetch()
+                    await shared_store.set(DISK_USAGE_SNAPSHOT_KEY, {"taken_at": taken_at, "df": df}, ttl=settings.DISK_USAGE_REFRESH_SECONDS)
+                    return
+            except (SharedStoreError, OSError) as e:
+                logger.debug(f"Shared disk usage snapshot unavailable, calling the daemon: {e}")
+        await self._fetch()
+
+    async def _fetch(self):
+        # Stamped with the start of the call: an event during it may or may not be included.
+        taken_at = time.time()
+        try:
+            df = await get_docker_client().system_df()
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        self.stats["refreshes"] += 1
+        self.stats["last_refresh_ms"] = round((time.time() - taken_at) * 1000, 2)
+        self._store(df, taken_at)
+        return taken_at, df
+
+    def _store(self, df: Dict[str, Any], taken_at: float):
+        if self.taken_at is not None and taken_at <= self.taken_at:
+            return
+        self.df, self.taken_at = df, taken_at
+        self.images = {
+            image["Id"]: {"size": _size(image.get("Size")), "shared_size": _size(image.get("SharedSize")), "containers": image.get("Containers", 0)}
+            for image in df.get("Images") or []
+        }
+        self.volumes = {
+            volume["Name"]: {"size": _size((volume.get("UsageData") or {}).get("Size")), "ref_count": (volume.get("UsageData") or {}).get("RefCount")}
+            for volume in df.get("Volumes") or []
+        }
+
+    # Reads
+
+    async def get(self) -> Dict[str, Any]:
+        """The current snapshot, waiting for the daemon only when there is none (or, when disabled, it is out of date)."""
+        self.stats["reads"] += 1
+        expired = self.taken_at is not None and self.age() >= settings.DISK_USAGE_REFRESH_SECONDS
+        if self.df is None or (not settings.DISK_USAGE_ENABLED and (self.stale or expired)):
+            await self.refresh()
+        return self.df
+
+    async def current(self) -> bool:
+        """Make sure a snapshot is loaded for a listing; False (and no sizes) when the daemon cannot provide one."""
+        try:
+            await self.get()
+            return True
+        except Exception as e:
+            logger.warning(f"Disk usage is unavailable: {e}")
+            return False
+
+    def freshness(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            "taken_at": self.taken_at,
+            "age_seconds": round(age, 2) if age is not None else None,
+            "stale": self.stale,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals per kind, with what could be reclaimed by removing unused items, like ``docker system df``."""
+        df = self.df or {}
+        images = df.get("Images") or []
+        volumes = df.get("Volumes") or []
+        cache = df.get("BuildCache") or []
+        containers = df.get("Containers") or []
+        volume_sizes = [(_size((v.get("UsageData") or {}).get("Size")) or 0, (v.get("UsageData") or {}).get("RefCount", 0)) for v in volumes]
+        return {
+            "layers_size": df.get("LayersSize") or 0,
+            "images": {
+                "count": len(images),
+                "active": sum(1 for i in images if i.get("Containers", 0) > 0),
+                "size": df.get("LayersSize") or 0,
+                "reclaimable": sum(
+                    (_size(i.get("Size")) or 0) - (_size(i.get("SharedSize")) or 0) for i in images if i.get("Containers", 0) == 0
+                ),
+            },
+            "containers": {
+                "count": len(containers),
+                "active": sum(1 for c in containers if c.get("State") == "running"),
+                "size": sum(_size(c.get("SizeRw")) or 0 for c in containers),
+                "reclaimable": sum(_size(c.get("SizeRw")) or 0 for c in containers if c.get("State") != "running"),
+            },
+            "volumes": {
+                "count": len(volumes),
+                "active": sum(1 for _, refs in volume_sizes if refs),
+                "size": sum(size for size, _ in volume_sizes),
+                "reclaimable": sum(size for size, refs in volume_sizes if not refs),
+            },
+            "build_cache": {
+                "count": len(cache),
+                "active": sum(1 for entry in cache if entry.get("InUse")),
+                "size": sum(_size(entry.get("Size")) or 0 for entry in cache),
+                "reclaimable": sum(_size(entry.get("Size")) or 0 for entry in cache if not entry.get("InUse") and not entry.get("Shared")),
+            },
+        }
+
+
+disk_usage = DiskUsageCache()
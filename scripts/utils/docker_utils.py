@@ -0,0 +1,746 @@
+import base64
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import shlex
+import struct
+import tarfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from scripts.constants.app_configuration import settings
+from scripts.logging.logger import logger
+from scripts.utils.metrics_utils import docker_operation, observe_docker_call
+
+
+STDOUT = 1
+STDERR = 2
+
+BYTE_UNITS = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+DEFAULT_REGISTRY = "https://index.docker.io/v1/"
+
+
+class DockerAPIError(Exception):
+    def __init__(self, status_code: int, explanation: str):
+        super().__init__(f"{status_code} Docker API error: {explanation}")
+        self.status_code = status_code
+        self.explanation = explanation
+
+
+class DockerNotFound(DockerAPIError):
+    pass
+
+
+def parse_repository_tag(repo_name: str) -> Tuple[str, Optional[str]]:
+    parts = repo_name.rsplit("@", 1)
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    parts = repo_name.rsplit(":", 1)
+    if len(parts) == 2 and "/" not in parts[1]:
+        return parts[0], parts[1]
+    return repo_name, None
+
+
+def image_reference(repository: str, tag: Optional[str] = None) -> str:
+    """``repository:tag`` (or ``repository@digest``), defaulting the tag to ``latest``."""
+    if tag is None:
+        repository, tag = parse_repository_tag(repository)
+    tag = tag or "latest"
+    return f"{repository}{'@' if tag.startswith('sha256:') else ':'}{tag}"
+
+
+def registry_for(repository: str) -> str:
+    first = repository.split("/", 1)[0]
+    if "/" in repository and ("." in first or ":" in first or first == "localhost"):
+        return first
+    return DEFAULT_REGISTRY
+
+
+def parse_bytes(value: Any) -> int:
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = value.strip().lower()
+    if value.endswith("b") and len(value) > 1 and value[-2].isalpha():
+        value = value[:-1]
+    suffix = value[-1]
+    if suffix.isdigit():
+        return int(float(value))
+    if suffix not in BYTE_UNITS:
+        raise ValueError(f"Invalid memory value '{value}', expected one of the b/k/m/g units")
+    return int(float(value[:-1]) * BYTE_UNITS[suffix])
+
+
+def _timestamp(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _port_bindings(ports: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[Dict[str, str]]]]:
+    exposed, bindings = {}, {}
+    for container_port, host in ports.items():
+        key = str(container_port) if "/" in str(container_port) else f"{container_port}/tcp"
+        exposed[key] = {}
+        targets = host if isinstance(host, list) else [host]
+        entries = []
+        for target in targets:
+            if target is None:
+                entries.append({"HostIp": "", "HostPort": ""})
+            elif isinstance(target, (tuple, list)):
+                entries.append({"HostIp": str(target[0]), "HostPort": str(target[1]) if len(target) > 1 else ""})
+            else:
+                entries.append({"HostIp": "", "HostPort": str(target)})
+        bindings[key] = entries
+    return exposed, bindings
+
+
+def build_container_config(image: str, command: Any = None, **kwargs) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Translate docker-py style ``containers.run`` kwargs into an Engine API create payload."""
+    params = {"name": kwargs.get("name"), "platform": kwargs.get("platform")}
+    host_config: Dict[str, Any] = {}
+    body: Dict[str, Any] = {
+        "Image": image,
+        "AttachStdout": kwargs.get("stdout", True),
+        "AttachStderr": kwargs.get("stderr", False),
+        "OpenStdin": kwargs.get("stdin_open", False),
+        "Tty": kwargs.get("tty", False),
+        "HostConfig": host_config,
+    }
+
+    if command is not None:
+        body["Cmd"] = shlex.split(command) if isinstance(command, str) else list(command)
+
+    simple_fields = {
+        "mac_address": "MacAddress",
+        "network_disabled": "NetworkDisabled",
+        "stop_signal": "StopSignal",
+        "user": "User",
+        "working_dir": "WorkingDir",
+    }
+    for key, field in simple_fields.items():
+        if kwargs.get(key) is not None:
+            body[field] = str(kwargs[key]) if key == "user" else kwargs[key]
+
+    host_fields = {
+        "auto_remove": "AutoRemove",
+        "mem_swappiness": "MemorySwappiness",
+        "nano_cpus": "NanoCpus",
+        "oom_kill_disable": "OomKillDisable",
+        "oom_score_adj": "OomScoreAdj",
+        "pid_mode": "PidMode",
+        "pids_limit": "PidsLimit",
+        "privileged": "Privileged",
+        "publish_all_ports": "PublishAllPorts",
+        "read_only": "ReadonlyRootfs",
+        "restart_policy": "RestartPolicy",
+        "runtime": "Runtime",
+        "security_opt": "SecurityOpt",
+        "storage_opt": "StorageOpt",
+        "sysctls": "Sysctls",
+        "tmpfs": "Tmpfs",
+        "userns_mode": "UsernsMode",
+        "uts_mode": "UTSMode",
+        "volume_driver": "VolumeDriver",
+        "volumes_from": "VolumesFrom",
+    }
+    for key, field in host_fields.items():
+        if kwargs.get(key) is not None:
+            host_config[field] = kwargs[key]
+
+    byte_fields = {
+        "mem_limit": "Memory",
+        "mem_reservation": "MemoryReservation",
+        "memswap_limit": "MemorySwap",
+        "shm_size": "ShmSize",
+    }
+    for key, field in byte_fields.items():
+        if kwargs.get(key) is not None:
+            host_config[field] = parse_bytes(kwargs[key])
+
+    labels = kwargs.get("labels")
+    if labels:
+        body["Labels"] = dict.fromkeys(labels, "") if isinstance(labels, list) else dict(labels)
+
+    if kwargs.get("ports"):
+        body["ExposedPorts"], host_config["PortBindings"] = _port_bindings(kwargs["ports"])
+
+    if kwargs.get("volumes"):
+        host_config["Binds"] = [
+            f"{host_path}:{spec.get('bind')}:{spec.get('mode', 'rw')}"
+            for host_path, spec in kwargs["volumes"].items()
+        ]
+
+    network_mode = kwargs.get("network_mode")
+    if kwargs.get("network"):
+        host_config["NetworkMode"] = network_mode or kwargs["network"]
+        body["NetworkingConfig"] = {"EndpointsConfig": {kwargs["network"]: {}}}
+    elif network_mode:
+        host_config["NetworkMode"] = network_mode
+
+    return {k: v for k, v in params.items() if v is not None}, body
+
+
+def _load_dockerignore(path: str) -> List[str]:
+    ignore_file = os.path.join(path, ".dockerignore")
+    if not os.path.exists(ignore_file):
+        return []
+    with open(ignore_file) as f:
+        return [line.strip().rstrip("/") for line in f if line.strip() and not line.startswith("#")]
+
+
+def _is_ignored(rel_path: str, patterns: List[str]) -> bool:
+    ignored = False
+    for pattern in patterns:
+        negate = pattern.startswith("!")
+        pattern = pattern.lstrip("!").lstrip("/")
+        parts = rel_path.split("/")
+        prefixes = ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+        if any(fnmatch.fnmatch(prefix, pattern) for prefix in prefixes):
+            ignored = not negate
+    return ignored
+
+
+def make_build_context(path: str, dockerfile: Optional[str] = None) -> bytes:
+    """Tar a build directory the way ``docker build`` does, honouring ``.dockerignore``."""
+    patterns = [p for p in _load_dockerignore(path) if p.lstrip("!") not in (dockerfile or "Dockerfile", ".dockerignore")]
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for root, dirs, files in os.walk(path):
+            rel_root = os.path.relpath(root, path)
+            for name in sorted(files):
+                rel_path = name if rel_root == "." else f"{rel_root}/{name}".replace(os.sep, "/")
+                if not _is_ignored(rel_path, patterns):
+                    tar.add(os.path.join(root, name), arcname=rel_path, recursive=False)
+            dirs[:] = [d for d in dirs if not _is_ignored(d if rel_root == "." else f"{rel_root}/{d}", patterns)]
+    return buffer.getvalue()
+
+
+def make_dockerfile_context(dockerfile: Any) -> bytes:
+    data = dockerfile.encode("utf-8") if isinstance(dockerfile, str) else bytes(dockerfile)
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        info = tarfile.TarInfo("Dockerfile")
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def encode_auth_header(auth_config: Optional[Dict[str, Any]]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(auth_config or {}).encode("utf-8")).decode("ascii")
+
+
+def auth_scope(auth_config: Optional[Dict[str, Any]]) -> str:
+    """A short, non-reversible name for the identity in ``auth_config``; empty when anonymous."""
+    if not auth_config:
+        return ""
+    return hashlib.sha256(json.dumps(auth_config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def build_image_id(event: Dict[str, Any], current: Optional[str] = None) -> Optional[str]:
+    """Pick the image ID out of a build progress event, keeping ``current`` otherwise."""
+    if event.get("aux", {}).get("ID"):
+        return event["aux"]["ID"]
+    stream = event.get("stream", "").strip()
+    if stream.startswith("sha256:"):
+        return stream
+    return current
+
+
+def split_frames(buffer: bytes) -> Tuple[List[Tuple[int, bytes]], bytes]:
+    """Split complete multiplexed stream frames off ``buffer``, returning them and the leftover bytes."""
+    frames = []
+    while len(buffer) >= 8:
+        stream_type, length = struct.unpack(">BxxxL", buffer[:8])
+        if len(buffer) < 8 + length:
+            break
+        frames.append((stream_type, buffer[8:8 + length]))
+        buffer = buffer[8 + length:]
+    return frames, buffer
+
+
+async def demux_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Split Docker's multiplexed attach/logs stream into ``(stream_type, payload)`` frames."""
+    buffer = b""
+    async for chunk in chunks:
+        frames, buffer = split_frames(buffer + chunk)
+        for frame in frames:
+            yield frame
+
+
+def _base_url_and_socket(docker_host: str) -> Tuple[str, Optional[str]]:
+    if docker_host.startswith("unix://"):
+        path = docker_host[len("unix://"):]
+        return "http://docker", path if path.startswith("/") else f"/{path}"
+    if docker_host.startswith("tcp://"):
+        return f"http://{docker_host[len('tcp://'):]}", None
+    return docker_host, None
+
+
+class DockerEngineClient:
+    """Asyncio client for the Docker Engine API with a pooled connection transport."""
+
+    def __init__(
+        self,
+        docker_host: str = settings.DOCKER_SOCK,
+        timeout: float = settings.DOCKER_CLIENT_TIMEOUT,
+        api_version: str = settings.DOCKER_API_VERSION,
+        max_connections: int = settings.DOCKER_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.DOCKER_MAX_KEEPALIVE_CONNECTIONS,
+    ):
+        self.docker_host = docker_host
+        self.timeout = timeout
+        self.api_version = api_version
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.auth_configs: Dict[str, Dict[str, Any]] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            base_url, socket_path = _base_url_and_socket(self.docker_host)
+            transport = httpx.AsyncHTTPTransport(uds=socket_path, limits=self.limits)
+            self._client = httpx.AsyncClient(
+                base_url=base_url,
+                transport=transport,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _url(self, path: str) -> str:
+        return f"/{self.api_version}{path}" if self.api_version else path
+
+    @staticmethod
+    def _params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {k: v for k, v in (params or {}).items() if v is not None}
+
+    @staticmethod
+    async def _raise_for_status(response: httpx.Response):
+        if response.status_code < 400:
+            return
+        await response.aread()
+        try:
+            explanation = response.json().get("message", response.text)
+        except ValueError:
+            explanation = response.text
+        if response.status_code == 404:
+            raise DockerNotFound(response.status_code, explanation)
+        raise DockerAPIError(response.status_code, explanation)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Any = None,
+        content: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        operation, started, failed = docker_operation(method, path), time.perf_counter(), True
+        try:
+            response = await self.client.request(
+                method,
+                self._url(path),
+                params=self._params(params),
+                json=json_body,
+                content=content,
+                headers=headers,
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+            await self._raise_for_status(response)
+            failed = False
+            return response
+        finally:
+            observe_docker_call(operation, started, failed)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Any = None,
+        content: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Any = httpx.USE_CLIENT_DEFAULT,
+    ):
+        operation, started = docker_operation(method, path), time.perf_counter()
+        try:
+            async with self.client.stream(
+                method,
+                self._url(path),
+                params=self._params(params),
+                json=json_body,
+                content=content,
+                headers=headers,
+                timeout=timeout,
+            ) as response:
+                await self._raise_for_status(response)
+                observe_docker_call(operation, started)
+                started = None
+                yield response
+        finally:
+            if started is not None:
+                observe_docker_call(operation, started, failed=True)
+
+    async def stream_json(self, method: str, path: str, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Yield decoded objects from one of Docker's JSON progress streams, raising on error events."""
+        async with self.stream(method, path, **kwargs) as response:
+            async for line in response.aiter_lines():
+                line = line.strip()
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    raise DockerAPIError(500, event.get("error"))
+                yield event
+
+    async def ping(self) -> bool:
+        response = await self.request("GET", "/_ping", timeout=5.0)
+        return response.text == "OK"
+
+    async def version(self) -> Dict[str, Any]:
+        return (await self.request("GET", "/version")).json()
+
+    async def info(self) -> Dict[str, Any]:
+        return (await self.request("GET", "/info")).json()
+
+    async def system_df(self) -> Dict[str, Any]:
+        """Disk usage of images, containers, volumes and build cache; the daemon may take a while to size them."""
+        return (await self.request("GET", "/system/df")).json()
+
+    async def events(self, since: Optional[float] = None, filters: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Follow the daemon's ``/events`` stream; ``since`` replays events from that UNIX time."""
+        params = {"since": f"{since:.6f}" if since else None, "filters": json.dumps(filters) if filters else None}
+        async for event in self.stream_json("GET", "/events", params=params, timeout=httpx.Timeout(self.timeout, read=None)):
+            yield event
+
+    # Containers
+
+    async def list_containers(
+        self,
+        all: bool = False,
+        before: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = -1,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        params = {
+            "all": all,
+            "before": before,
+            "since": since,
+            "limit": limit if limit and limit > 0 else None,
+            "filters": json.dumps(filters) if filters else None,
+        }
+        return (await self.request("GET", "/containers/json", params=params)).json()
+
+    async def inspect_container(self, container: str) -> Dict[str, Any]:
+        return (await self.request("GET", f"/containers/{container}/json")).json()
+
+    async def create_container(self, image: str, command: Any = None, **kwargs) -> Dict[str, Any]:
+        params, body = build_container_config(image, command, **kwargs)
+        return (await self.request("POST", "/containers/create", params=params, json_body=body)).json()
+
+    async def container_stats(self, container: str) -> Dict[str, Any]:
+        """A single stats sample; ``one-shot`` skips the daemon's second read for ``precpu_stats``."""
+        params = {"stream": False, "one-shot": True}
+        return (await self.request("GET", f"/containers/{container}/stats", params=params)).json()
+
+    async def start_container(self, container: str):
+        await self.request("POST", f"/containers/{container}/start")
+
+    async def stop_container(self, container: str, timeout: Optional[float] = None):
+        request_timeout = self.timeout + timeout if timeout is not None else None
+        params = {"t": int(timeout) if timeout is not None else None}
+        await self.request("POST", f"/containers/{container}/stop", params=params, timeout=request_timeout)
+
+    async def restart_container(self, container: str, timeout: Optional[float] = None):
+        request_timeout = self.timeout + timeout if timeout is not None else None
+        params = {"t": int(timeout) if timeout is not None else None}
+        await self.request("POST", f"/containers/{container}/restart", params=params, timeout=request_timeout)
+
+    async def rename_container(self, container: str, name: str):
+        await self.request("POST", f"/containers/{container}/rename", params={"name": name})
+
+    async def remove_container(self, container: str, v: bool = False, link: bool = False, force: bool = False):
+        await self.request("DELETE", f"/containers/{container}", params={"v": v, "link": link, "force": force})
+
+    async def run_container(self, image: str, command: Any = None, auth_config: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """Create and start a container, pulling ``image`` with ``auth_config`` first if this daemon lacks it."""
+        try:
+            created = await self.create_container(image, command, **kwargs)
+        except DockerNotFound:
+            logger.info(f"Image '{image}' not found on {self.docker_host}; pulling it")
+            await self.pull_image(image, auth_config=auth_config)
+            created = await self.create_container(image, command, **kwargs)
+        await self.start_container(created["Id"])
+        return await self.inspect_container(created["Id"])
+
+    def _logs_params(self, stdout=True, stderr=True, timestamps=False, tail="all", since=None, until=None, follow=False):
+        return {
+            "stdout": stdout,
+            "stderr": stderr,
+            "timestamps": timestamps,
+            "tail": tail,
+            "since": _timestamp(since),
+            "until": _timestamp(until),
+            "follow": follow,
+        }
+
+    async def container_logs(self, container: str, tty: bool = False, **kwargs) -> bytes:
+        response = await self.request("GET", f"/containers/{container}/logs", params=self._logs_params(**kwargs))
+        if tty:
+            return response.content
+        frames, _ = split_frames(response.content)
+        return b"".join(payload for _, payload in frames)
+
+    async def iter_log_lines(self, container: str, tty: bool = False, max_line_bytes: int = 64 * 1024, **kwargs) -> AsyncIterator[Tuple[int, bytes]]:
+        """Yield ``(stream_type, line)`` pairs as the daemon sends them.
+
+        Only the current partial line per stream is buffered (capped at ``max_line_bytes``),
+        and the socket is read only as fast as the caller consumes, so memory stays flat
+        for chatty or followed containers.
+        """
+        params = self._logs_params(**kwargs)
+        timeout = None if params["follow"] else httpx.USE_CLIENT_DEFAULT
+        async with self.stream("GET", f"/containers/{container}/logs", params=params, timeout=timeout) as response:
+            chunks = response.aiter_bytes()
+            if tty:
+                frames = ((STDOUT, chunk) async for chunk in chunks)
+            else:
+                frames = demux_stream(chunks)
+
+            partial = {STDOUT: b"", STDERR: b""}
+            async for stream_type, payload in frames:
+                lines = (partial.get(stream_type, b"") + payload).split(b"\n")
+                partial[stream_type] = lines.pop()
+                for line in lines:
+                    yield stream_type, line
+                if len(partial[stream_type]) >= max_line_bytes:
+                    yield stream_type, partial[stream_type]
+                    partial[stream_type] = b""
+
+            for stream_type, rest in partial.items():
+                if rest:
+                    yield stream_type, rest
+
+    # Images
+
+    async def list_images(self, name: Optional[str] = None, all: bool = False, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        filters = dict(filters or {})
+        if name:
+            filters["reference"] = name
+        params = {"all": all, "filters": json.dumps(filters) if filters else None}
+        return (await self.request("GET", "/images/json", params=params)).json()
+
+    async def inspect_image(self, image: str) -> Dict[str, Any]:
+        return (await self.request("GET", f"/images/{image}/json")).json()
+
+    async def tag_image(self, image: str, repository: str, tag: Optional[str] = None):
+        if tag is None:
+            repository, tag = parse_repository_tag(repository)
+        await self.request("POST", f"/images/{image}/tag", params={"repo": repository, "tag": tag})
+
+    async def remove_image(self, image: str, force: bool = False, noprune: bool = False) -> List[Dict[str, Any]]:
+        return (await self.request("DELETE", f"/images/{image}", params={"force": force, "noprune": noprune})).json()
+
+    def auth_header(self, registry: str, auth_config: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        return {"X-Registry-Auth": encode_auth_header(auth_config or self.auth_configs.get(registry))}
+
+    async def pull_events(self, repository: str, tag: Optional[str] = None, auth_config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Pull an image and yield the per-layer progress events as they arrive."""
+        if tag is None:
+            repository, tag = parse_repository_tag(repository)
+        async for event in self.stream_json(
+            "POST",
+            "/images/create",
+            params={"fromImage": repository, "tag": tag or "latest"},
+            headers=self.auth_header(registry_for(repository), auth_config),
+            timeout=None,
+        ):
+            yield event
+
+    async def pull_image(self, repository: str, tag: Optional[str] = None, auth_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if tag is None:
+            repository, tag = parse_repository_tag(repository)
+        async for _ in self.pull_events(repository, tag, auth_config):
+            pass
+        return await self.inspect_image(image_reference(repository, tag))
+
+    async def push_events(self, repository: str, tag: Optional[str] = None, auth_config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Push an image and yield the per-layer progress events as they arrive."""
+        if tag is None:
+            repository, tag = parse_repository_tag(repository)
+        async for event in self.stream_json(
+            "POST",
+            f"/images/{repository}/push",
+            params={"tag": tag or "latest"},
+            headers=self.auth_header(registry_for(repository), auth_config),
+            timeout=None,
+        ):
+            yield event
+
+    async def push_image(self, repository: str, tag: Optional[str] = None, auth_config: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return [event async for event in self.push_events(repository, tag, auth_config)]
+
+    async def build_events(
+        self,
+        path: Optional[str] = None,
+        fileobj: Any = None,
+        tag: Optional[str] = None,
+        quiet: bool = False,
+        nocache: bool = False,
+        rm: bool = False,
+        timeout: Optional[int] = None,
+        custom_context: bool = False,
+        encoding: Optional[str] = None,
+        pull: bool = False,
+        forcerm: bool = False,
+        dockerfile: Optional[str] = None,
+        buildargs: Optional[Dict[str, Any]] = None,
+        container_limits: Optional[Dict[str, Any]] = None,
+        shmsize: Optional[int] = None,
+        labels: Optional[Dict[str, Any]] = None,
+        cache_from: Optional[List[str]] = None,
+        target: Optional[str] = None,
+        network_mode: Optional[str] = None,
+        squash: Optional[bool] = None,
+        extra_hosts: Any = None,
+        platform: Optional[str] = None,
+        isolation: Optional[str] = None,
+        use_config_proxy: bool = True,
+        auth_configs: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run a build and yield Docker's progress events as they arrive.
+
+        Takes the same arguments as docker-py's ``images.build``. The final
+        ``{"aux": {"ID": ...}}`` event carries the built image ID.
+        """
+        if path:
+            context = await run_in_threadpool(make_build_context, path, dockerfile)
+        elif custom_context:
+            context = fileobj if isinstance(fileobj, bytes) else str(fileobj).encode("utf-8")
+        else:
+            context = await run_in_threadpool(make_dockerfile_context, fileobj)
+
+        if isinstance(extra_hosts, dict):
+            extra_hosts = [f"{host}:{ip}" for host, ip in extra_hosts.items()]
+        limits = container_limits or {}
+        params = {
+            "t": tag,
+            "q": quiet,
+            "nocache": nocache,
+            "rm": rm,
+            "forcerm": forcerm,
+            "pull": pull,
+            "dockerfile": dockerfile,
+            "buildargs": json.dumps(buildargs) if buildargs else None,
+            "labels": json.dumps(labels) if labels else None,
+            "cachefrom": json.dumps(cache_from) if cache_from else None,
+            "shmsize": shmsize,
+            "target": target,
+            "networkmode": network_mode,
+            "squash": squash,
+            "extrahosts": ",".join(extra_hosts) if extra_hosts else None,
+            "platform": platform,
+            "isolation": isolation,
+            "memory": limits.get("memory"),
+            "memswap": limits.get("memswap"),
+            "cpushares": limits.get("cpushares"),
+            "cpusetcpus": limits.get("cpusetcpus"),
+        }
+        headers = {"Content-Type": "application/x-tar"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if auth_configs or self.auth_configs:
+            headers["X-Registry-Config"] = encode_auth_header(auth_configs or self.auth_configs)
+
+        async for event in self.stream_json("POST", "/build", params=params, content=context, headers=headers, timeout=timeout or self.timeout):
+            yield event
+
+    async def build_image(self, **kwargs) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        events, image_id = [], None
+        async for event in self.build_events(**kwargs):
+            events.append(event)
+            image_id = build_image_id(event, image_id)
+        if image_id is None:
+            raise DockerAPIError(500, "Build finished without producing an image")
+        return await self.inspect_image(image_id), events
+
+    async def check_auth(self, auth_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate credentials with the registry through the daemon, without keeping them on this client."""
+        return (await self.request("POST", "/auth", json_body=auth_config)).json()
+
+    async def login(self, username: str, password: str, registry: Optional[str] = None, email: Optional[str] = None) -> Dict[str, Any]:
+        auth_config = {"username": username, "password": password, "email": email, "serveraddress": registry}
+        auth_config = {k: v for k, v in auth_config.items() if v is not None}
+        response = await self.check_auth(auth_config)
+        if response.get("IdentityToken"):
+            auth_config = {"identitytoken": response["IdentityToken"], "serveraddress": registry}
+        self.auth_configs[registry or DEFAULT_REGISTRY] = auth_config
+        return response
+
+    # Volumes
+
+    async def list_volumes(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        params = {"filters": json.dumps(filters) if filters else None}
+        return (await self.request("GET", "/volumes", params=params)).json().get("Volumes") or []
+
+    async def inspect_volume(self, name: str) -> Dict[str, Any]:
+        return (await self.request("GET", f"/volumes/{name}")).json()
+
+    async def create_volume(
+        self,
+        name: Optional[str] = None,
+        driver: Optional[str] = None,
+        driver_opts: Optional[Dict[str, Any]] = None,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        body = {"Name": name, "Driver": driver, "DriverOpts": driver_opts, "Labels": labels}
+        body = {k: v for k, v in body.items() if v is not None}
+        return (await self.request("POST", "/volumes/create", json_body=body)).json()
+
+    async def remove_volume(self, name: str, force: bool = False):
+        await self.request("DELETE", f"/volumes/{name}", params={"force": force})
+
+
+_docker_client: Optional[DockerEngineClient] = None
+
+
+def get_docker_client() -> DockerEngineClient:
+    global _docker_client
+    if _docker_client is None:
+        _docker_client = DockerEngineClient()
+        logger.info(f"Docker Engine client configured for {settings.DOCKER_SOCK}")
+    return _docker_client
+
+
+def set_docker_client(client: DockerEngineClient):
+    """Swap the process-wide backend, e.g. for a fake daemon in benchmarks."""
+    global _docker_client
+    _docker_client = client
+
+
+async def close_docker_client():
+    global _docker_client
+    if _docker_client is not None:
+        await _docker_client.close()
+        _docker_client = None
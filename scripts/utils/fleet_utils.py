@@ -0,0 +1,324 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from cachetools import LRUCache
+from fastapi import HTTPException
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import CONTAINER_COLLECTION, NO_DOCKER_HOST_AVAILABLE
+from scripts.utils.docker_utils import DockerEngineClient, DockerNotFound, get_docker_client, parse_bytes
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.stream_utils import bounded_as_completed
+from scripts.logging.logger import logger
+
+
+STRATEGIES = ("balanced", "memory", "cpu", "containers")
+
+# Reservation of one container: (memory bytes, CPUs).
+Reservation = Tuple[int, float]
+
+
+def parse_hosts(value: str) -> Dict[str, str]:
+    """``DOCKER_EXTRA_HOSTS``: comma-separated ``name=url`` pairs, e.g. ``b=tcp://10.0.0.2:2375``."""
+    hosts = {}
+    for entry in filter(None, (e.strip() for e in value.split(","))):
+        name, sep, url = entry.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"Invalid DOCKER_EXTRA_HOSTS entry '{entry}', expected name=url")
+        hosts[name.strip()] = url.strip()
+    return hosts
+
+
+def container_reservation(host_config: Optional[Dict[str, Any]]) -> Reservation:
+    """Memory and CPUs a container may use; unlimited containers count as the placement defaults."""
+    host_config = host_config or {}
+    memory = host_config.get("Memory") or settings.PLACEMENT_DEFAULT_MEMORY_BYTES
+    if host_config.get("NanoCpus"):
+        cpus = host_config["NanoCpus"] / 1e9
+    elif host_config.get("CpuQuota") and host_config.get("CpuPeriod"):
+        cpus = host_config["CpuQuota"] / host_config["CpuPeriod"]
+    else:
+        cpus = settings.PLACEMENT_DEFAULT_CPUS
+    return memory, cpus
+
+
+def requested_reservation(kwargs: Dict[str, Any]) -> Reservation:
+    """The reservation of a container about to be created from ``run_container`` kwargs."""
+    memory = parse_bytes(kwargs["mem_limit"]) if kwargs.get("mem_limit") is not None else None
+    return container_reservation({"Memory": memory, "NanoCpus": kwargs.get("nano_cpus")})
+
+
+class DockerHost:
+    """One Docker endpoint: its client pool, health and what is reserved on it.
+
+    Capacity comes from ``/info``, and each running container reserves its memory
+    and CPU limits (read once per container). Placements that are still being
+    created are counted as pending so concurrent requests see them.
+    """
+
+    def __init__(self, name: str, client: Optional[DockerEngineClient] = None):
+        self.name = name
+        self._client = client
+        self.healthy = False
+        self.error: Optional[str] = None
+        self.last_check: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.cpus = 0.0
+        self.memory = 0
+        self.containers: Dict[str, Reservation] = {}
+        self.pending: Dict[int, Reservation] = {}
+        self._recorded: Dict[str, float] = {}
+
+    @property
+    def client(self) -> DockerEngineClient:
+        # The primary host follows the process-wide client, so set_docker_client() swaps it too.
+        return self._client or get_docker_client()
+
+    def _reserved(self) -> Reservation:
+        entries = [*self.containers.values(), *self.pending.values()]
+        return sum(m for m, _ in entries), sum(c for _, c in entries)
+
+    @property
+    def free_memory(self) -> int:
+        return self.memory - self._reserved()[0]
+
+    @property
+    def free_cpus(self) -> float:
+        return self.cpus - self._reserved()[1]
+
+    def record(self, container_id: str, reservation: Reservation):
+        self.containers[container_id] = reservation
+        self._recorded[container_id] = time.monotonic()
+
+    async def _inspect(self, container_id: str) -> Tuple[str, Optional[Reservation]]:
+        try:
+            container = await self.client.inspect_container(container_id)
+        except DockerNotFound:
+            return container_id, None
+        except Exception as e:
+            logger.debug(f"Inspecting container {container_id[:12]} on host '{self.name}' failed: {e}")
+            return container_id, container_reservation(None)
+        return container_id, container_reservation(container.get("HostConfig"))
+
+    async def refresh(self):
+        started = time.monotonic()
+        try:
+            info, running = await asyncio.wait_for(
+                asyncio.gather(self.client.info(), self.client.list_containers()),
+                timeout=settings.READINESS_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            if self.healthy or self.last_check is None:
+                logger.warning(f"Docker host '{self.name}' is unhealthy: {e}")
+            self.healthy, self.error = False, str(e) or type(e).__name__
+            self.last_check = time.time()
+            return
+
+        self.latency_ms = round((time.monotonic() - started) * 1000, 2)
+        self.cpus = float(info.get("NCPU") or 0)
+        self.memory = int(info.get("MemTotal") or 0)
+        known = dict(self.containers)
+        new = [c["Id"] for c in running if c["Id"] not in known]
+        async for container_id, reservation in bounded_as_completed(new, self._inspect, settings.STATS_MAX_CONCURRENCY):
+            if reservation is not None:
+                known[container_id] = reservation
+
+        # Containers recorded while the list was in flight are kept until the next round sees them.
+        recent = {cid for cid, at in self._recorded.items() if at >= started}
+        self.containers = {cid: known[cid] for cid in {c["Id"] for c in running} | recent if cid in known}
+        self._recorded = {cid: self._recorded[cid] for cid in recent}
+        if not self.healthy:
+            logger.info(f"Docker host '{self.name}' is healthy ({self.cpus:g} CPUs, {self.memory // 2 ** 20} MiB)")
+        self.healthy, self.error, self.last_check = True, None, time.time()
+
+    def score(self, strategy: str, reservation: Reservation) -> Tuple[float, ...]:
+        """Higher is better."""
+        free_memory, free_cpus = self.free_memory - reservation[0], self.free_cpus - reservation[1]
+        load = len(self.containers) + len(self.pending)
+        if strategy == "memory":
+            return free_memory, -load
+        if strategy == "cpu":
+            return free_cpus, -load
+        if strategy == "containers":
+            return -load, free_memory
+        # balanced: headroom of whichever resource is scarcer on this host.
+        memory_share = free_memory / self.memory if self.memory else 0.0
+        cpu_share = free_cpus / self.cpus if self.cpus else 0.0
+        return min(memory_share, cpu_share), -load
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "docker_host": self.client.docker_host,
+            "healthy": self.healthy,
+            "error": self.error,
+            "last_check": self.last_check,
+            "latency_ms": self.latency_ms,
+            "cpus": self.cpus,
+            "memory": self.memory,
+            "free_cpus": round(self.free_cpus, 3),
+            "free_memory": self.free_memory,
+            "containers": len(self.containers),
+            "pending": len(self.pending),
+        }
+
+
+class DockerFleet:
+    """The Docker hosts containers are placed on.
+
+    The primary host is ``DOCKER_SOCK``; ``DOCKER_EXTRA_HOSTS`` adds more, each with
+    its own client pool. With more than one host, every host is health-checked
+    once before the app reports started and then each
+    ``DOCKER_HEALTH_INTERVAL_SECONDS``, and new containers go to a healthy host
+    that already has the image (when any does) and has room for the container's
+    limits, ranked by ``PLACEMENT_STRATEGY``. The chosen host is stored with the container
+    in ``user_containers`` and later calls are sent there. With a single host all of
+    this is skipped.
+    """
+
+    def __init__(self):
+        self.hosts: Dict[str, DockerHost] = {settings.DOCKER_HOST_NAME: DockerHost(settings.DOCKER_HOST_NAME)}
+        for name, url in parse_hosts(settings.DOCKER_EXTRA_HOSTS).items():
+            self.add_host(name, DockerEngineClient(docker_host=url))
+        self.stats = {"placements": 0, "unhealthy_skips": 0, "location_hits": 0, "location_lookups": 0, "probes": 0}
+        self._locations: LRUCache = LRUCache(maxsize=settings.CONTAINER_HOST_CACHE_SIZE)
+        self._pending_ids = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def primary(self) -> DockerHost:
+        return self.hosts[settings.DOCKER_HOST_NAME]
+
+    @property
+    def multi_host(self) -> bool:
+        return len(self.hosts) > 1
+
+    def add_host(self, name: str, client: DockerEngineClient) -> DockerHost:
+        if name in self.hosts:
+            raise ValueError(f"Docker host '{name}' is already registered")
+        host = self.hosts[name] = DockerHost(name, client)
+        return host
+
+    # Health checks
+
+    async def start(self):
+        """Check every host once, so placements right after startup have healthy hosts to choose from."""
+        if self.multi_host and self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for host in self.hosts.values():
+            if host._client is not None:
+                await host._client.close()
+
+    async def check(self):
+        await asyncio.gather(*(host.refresh() for host in self.hosts.values()))
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(settings.DOCKER_HEALTH_INTERVAL_SECONDS)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Docker host health check failed: {e}")
+
+    # Placement
+
+    @staticmethod
+    async def _has_image(host: DockerHost, image: str) -> bool:
+        try:
+            await host.client.inspect_image(image)
+            return True
+        except Exception:
+            return False
+
+    async def choose(self, image: str, reservation: Reservation) -> DockerHost:
+        if not self.multi_host:
+            return self.primary
+        candidates = [host for host in self.hosts.values() if host.healthy]
+        self.stats["unhealthy_skips"] += len(self.hosts) - len(candidates)
+        if not candidates:
+            raise HTTPException(status_code=503, detail=NO_DOCKER_HOST_AVAILABLE)
+
+        # Hosts without the image could not create the container without a pull first.
+        local = [h for h, present in zip(candidates, await asyncio.gather(*(self._has_image(h, image) for h in candidates))) if present]
+        candidates = local or candidates
+        fitting = [h for h in candidates if h.free_memory >= reservation[0] and h.free_cpus >= reservation[1]]
+        return max(fitting or candidates, key=lambda h: h.score(settings.PLACEMENT_STRATEGY, reservation))
+
+    @asynccontextmanager
+    async def placement(self, image: str, reservation: Reservation) -> AsyncIterator[DockerHost]:
+        """Choose a host and hold the reservation there until the caller has created the container."""
+        host = await self.choose(image, reservation)
+        key = next(self._pending_ids)
+        host.pending[key] = reservation
+        self.stats["placements"] += 1
+        try:
+            yield host
+        finally:
+            host.pending.pop(key, None)
+
+    # Routing
+
+    def remember(self, ref: str, host: DockerHost):
+        self._locations[ref] = host.name
+
+    def forget(self, ref: str):
+        self._locations.pop(ref, None)
+
+    async def _lookup(self, ref: str) -> Optional[str]:
+        self.stats["location_lookups"] += 1
+        collection = mongo.get_async_collection(CONTAINER_COLLECTION)
+        records = await collection.find(
+            {"$or": [{"container_name": ref}, {"container_id": ref}]}, {"host": 1}, sort=[("created_time", -1)], limit=1
+        ).to_list(1)
+        return records[0].get("host") if records else None
+
+    async def _probe(self, ref: str) -> Optional[str]:
+        self.stats["probes"] += 1
+
+        async def probe(host: DockerHost) -> Optional[str]:
+            try:
+                await host.client.inspect_container(ref)
+                return host.name
+            except Exception:
+                return None
+
+        found = await asyncio.gather(*(probe(h) for h in self.hosts.values() if h.healthy or h is self.primary))
+        return next((name for name in found if name), None)
+
+    async def locate(self, ref: str) -> DockerHost:
+        """The host a container (name or ID) lives on.
+
+        Looked up in memory, then in ``user_containers``, then by asking every host;
+        containers found nowhere go to the primary, which answers 404 as before.
+        """
+        if not self.multi_host:
+            return self.primary
+        name = self._locations.get(ref)
+        if name in self.hosts:
+            self.stats["location_hits"] += 1
+            return self.hosts[name]
+        try:
+            name = await self._lookup(ref)
+        except Exception as e:
+            logger.warning(f"Looking up the host of container '{ref}' failed: {e}")
+            name = None
+        if name not in self.hosts:
+            name = await self._probe(ref)
+        if name is None:
+            return self.primary
+        self._locations[ref] = name
+        return self.hosts[name]
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [host.status() for host in self.hosts.values()]
+
+
+fleet = DockerFleet()
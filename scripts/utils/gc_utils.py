@@ -0,0 +1,294 @@
+import asyncio
+import fnmatch
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import CONTAINER_COLLECTION
+from scripts.utils.disk_usage_utils import disk_usage
+from scripts.utils.docker_utils import DockerAPIError, DockerNotFound
+from scripts.utils.fleet_utils import DockerHost, fleet
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.shared_store_utils import shared_store
+from scripts.utils.warm_pool_utils import warm_pool
+from scripts.logging.logger import logger
+
+
+GC_LEADER_LOCK = "docker-gc-leader"
+GC_LAST_RUN_KEY = "docker-gc:last-run"
+
+# Latest use of each image ID among recorded container creates; served by the image_id_created_time index.
+IMAGE_HISTORY_PIPELINE = [
+    {"$match": {"image_id": {"$exists": True}}},
+    {"$sort": {"image_id": 1, "created_time": -1}},
+    {"$group": {"_id": "$image_id", "last_used": {"$first": "$created_time"}}},
+]
+
+
+def _timestamp(value: Any) -> float:
+    """Seconds since the epoch from a Mongo datetime (naive UTC), an RFC 3339 string or a number."""
+    if value is None or value == "":
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    try:
+        text = value.replace("Z", "+00:00")
+        # Docker reports nanoseconds; fromisoformat takes at most microseconds.
+        if "." in text:
+            head, _, rest = text.partition(".")
+            digits = len(rest) - len(rest.lstrip("0123456789"))
+            text = f"{head}.{rest[:min(digits, 6)]}{rest[digits:]}"
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return 0.0
+
+
+async def image_history() -> Dict[str, float]:
+    collection = mongo.get_async_collection(CONTAINER_COLLECTION)
+    rows = await (await collection.aggregate(IMAGE_HISTORY_PIPELINE)).to_list(None)
+    return {row["_id"]: _timestamp(row["last_used"]) for row in rows}
+
+
+class DockerGarbageCollector:
+    """Removes the least recently used images (and, opt-in, volumes) when a host's disk fills up.
+
+    Each ``GC_INTERVAL_SECONDS`` every host's usage is compared with
+    ``GC_HIGH_WATERMARK``; above it, unprotected items are removed oldest use
+    first until usage would be back under ``GC_LOW_WATERMARK``. An image was last
+    used when a container was last created from it (``user_containers``), or
+    when it was built, pulled or tagged; images of existing containers, warm pool
+    profiles and ``GC_KEEP_IMAGES`` are never removed. A volume was last used when
+    it was last seen attached, or else when it was created.
+
+    Usage is the filesystem of the daemon's data root when it is visible here
+    (``GC_DISK_PATH``, or ``DockerRootDir`` from the primary host's ``/info``),
+    otherwise the daemon's ``/system/df`` total against ``GC_DISK_CAPACITY_BYTES``.
+    With neither, nothing is removed and only the report is available. Removals
+    are plain Docker API calls made one at a time, so request handling is never
+    held up; a conflict (the image got a container meanwhile) just skips it.
+    """
+
+    def __init__(self):
+        self.stats = {"runs": 0, "removed_images": 0, "removed_volumes": 0, "freed_bytes": 0, "failures": 0, "last_run_ms": 0.0}
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.usage: Dict[str, float] = {}
+        self._volumes_attached: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._leader_generation: Optional[int] = None
+
+    def start(self):
+        if settings.GC_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.GC_INTERVAL_SECONDS)
+            try:
+                await self.collect()
+            except Exception as e:
+                logger.warning(f"Docker garbage collection failed: {e}")
+
+    async def _lead(self) -> bool:
+        if self._leader_generation != shared_store.generation:
+            self._leader_generation = None
+            if await shared_store.try_acquire(GC_LEADER_LOCK, 1, restore=False):
+                self._leader_generation = shared_store.generation
+                logger.info(f"Worker {os.getpid()} is now running Docker garbage collection")
+        return self._leader_generation is not None
+
+    @staticmethod
+    def _hosts() -> List[DockerHost]:
+        return [host for host in fleet.hosts.values() if host.healthy or not fleet.multi_host]
+
+    # Planning
+
+    async def _usage(self, host: DockerHost, df: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        path = settings.GC_DISK_PATH
+        if host is fleet.primary and not path:
+            path = (await host.client.info()).get("DockerRootDir", "")
+        if host is fleet.primary and path and os.path.isdir(path):
+            disk = await asyncio.to_thread(shutil.disk_usage, path)
+            return {"source": path, "used": disk.used, "capacity": disk.total}
+        if settings.GC_DISK_CAPACITY_BYTES:
+            volumes = sum(max((v.get("UsageData") or {}).get("Size", 0), 0) for v in df.get("Volumes") or [])
+            cache = sum(max(entry.get("Size", 0), 0) for entry in df.get("BuildCache") or [])
+            used = (df.get("LayersSize") or 0) + volumes + cache
+            return {"source": "system/df", "used": used, "capacity": settings.GC_DISK_CAPACITY_BYTES}
+        return None
+
+    @staticmethod
+    def _kept(tags: List[str]) -> bool:
+        patterns = [p.strip() for p in settings.GC_KEEP_IMAGES.split(",") if p.strip()]
+        patterns += [profile["image"] for profile in warm_pool.profiles.values()]
+        return any(fnmatch.fnmatch(tag, pattern) or tag == f"{pattern}:latest" for tag in tags for pattern in patterns)
+
+    def _candidates(self, host: DockerHost, df: Dict[str, Any], history: Dict[str, float], now: float) -> Dict[str, Any]:
+        in_use = {c.get("ImageID") for c in df.get("Containers") or []}
+        protected = {"in_use": 0, "kept": 0, "recent": 0, "attached": 0}
+        candidates = []
+        for image in df.get("Images") or []:
+            tags = [tag for tag in image.get("RepoTags") or [] if tag != "<none>:<none>"]
+            if image["Id"] in in_use or image.get("Containers", 0) > 0:
+                protected["in_use"] += 1
+                continue
+            if self._kept(tags):
+                protected["kept"] += 1
+                continue
+            last_used = max(history.get(image["Id"], 0.0), _timestamp(image.get("Created")))
+            shared = image.get("SharedSize", -1)
+            candidates.append({
+                "kind": "image",
+                "id": image["Id"],
+                "tags": tags,
+                "size": image.get("Size", 0) - (shared if shared > 0 else 0),
+                "last_used": last_used,
+            })
+
+        if settings.GC_VOLUMES_ENABLED:
+            for volume in df.get("Volumes") or []:
+                usage = volume.get("UsageData") or {}
+                key = f"{host.name}/{volume['Name']}"
+                if usage.get("RefCount", 0) != 0:
+                    self._volumes_attached[key] = now
+                    protected["attached"] += 1
+                    continue
+                candidates.append({
+                    "kind": "volume",
+                    "id": volume["Name"],
+                    "size": max(usage.get("Size", 0), 0),
+                    "last_used": max(self._volumes_attached.get(key, 0.0), _timestamp(volume.get("CreatedAt"))),
+                })
+
+        fresh = [c for c in candidates if now - c["last_used"] < settings.GC_MIN_AGE_SECONDS]
+        protected["recent"] += len(fresh)
+        candidates = [c for c in candidates if now - c["last_used"] >= settings.GC_MIN_AGE_SECONDS]
+        candidates.sort(key=lambda c: (c["last_used"], -c["size"]))
+        return {"candidates": candidates, "protected": protected}
+
+    async def _last_tagged(self, host: DockerHost, candidate: Dict[str, Any]) -> float:
+        """When the image was last pulled or tagged; only asked for images about to be evicted."""
+        try:
+            image = await host.client.inspect_image(candidate["id"])
+        except Exception:
+            return 0.0
+        return _timestamp((image.get("Metadata") or {}).get("LastTagTime"))
+
+    async def plan(self, host: DockerHost, history: Dict[str, float]) -> Dict[str, Any]:
+        df = await host.client.system_df()
+        now = time.time()
+        usage = await self._usage(host, df)
+        found = self._candidates(host, df, history, now)
+        plan = {
+            "host": host.name,
+            "usage": usage,
+            "high_watermark": settings.GC_HIGH_WATERMARK,
+            "low_watermark": settings.GC_LOW_WATERMARK,
+            "protected": found["protected"],
+            "candidates": len(found["candidates"]),
+            "to_free": 0,
+            "evict": [],
+        }
+        if usage is None:
+            plan["lru"] = found["candidates"][: settings.GC_REPORT_LIMIT]
+            return plan
+
+        ratio = usage["used"] / usage["capacity"] if usage["capacity"] else 0.0
+        usage["ratio"] = round(ratio, 4)
+        self.usage[host.name] = ratio
+        if ratio >= settings.GC_HIGH_WATERMARK:
+            plan["to_free"] = int(usage["used"] - settings.GC_LOW_WATERMARK * usage["capacity"])
+        freed = 0
+        for candidate in found["candidates"]:
+            if freed >= plan["to_free"]:
+                break
+            if candidate["kind"] == "image":
+                tagged = await self._last_tagged(host, candidate)
+                if now - tagged < settings.GC_MIN_AGE_SECONDS:
+                    plan["protected"]["recent"] += 1
+                    continue
+                candidate["last_used"] = max(candidate["last_used"], tagged)
+            plan["evict"].append(candidate)
+            freed += candidate["size"]
+        plan["would_free"] = freed
+        evicted = {(c["kind"], c["id"]) for c in plan["evict"]}
+        plan["lru"] = [c for c in found["candidates"] if (c["kind"], c["id"]) not in evicted][: settings.GC_REPORT_LIMIT]
+        return plan
+
+    async def report(self) -> Dict[str, Any]:
+        """What a collection would remove right now, without removing anything."""
+        history = await image_history()
+        plans = []
+        for host in self._hosts():
+            try:
+                plans.append(await self.plan(host, history))
+            except Exception as e:
+                plans.append({"host": host.name, "error": str(e) or type(e).__name__})
+        last_run = await shared_store.get(GC_LAST_RUN_KEY) if shared_store.enabled else self.last_run
+        return {"enabled": settings.GC_ENABLED, "dry_run": True, "hosts": plans, "last_run": last_run, "stats": dict(self.stats)}
+
+    # Collection
+
+    async def collect(self):
+        if shared_store.enabled and not await self._lead():
+            return
+        started = time.monotonic()
+        # Without the history, recently used images would look unused, so the round is skipped.
+        history = await image_history()
+        summary = {"time": time.time(), "hosts": {}}
+        for host in self._hosts():
+            try:
+                plan = await self.plan(host, history)
+            except Exception as e:
+                logger.warning(f"Planning garbage collection on Docker host '{host.name}' failed: {e}")
+                continue
+            removed, freed = [], 0
+            for candidate in plan["evict"]:
+                if await self._remove(host, candidate):
+                    removed.append(candidate["tags"][0] if candidate.get("tags") else candidate["id"])
+                    freed += candidate["size"]
+            if removed:
+                disk_usage.invalidate()
+                logger.info(f"Garbage collection on Docker host '{host.name}' removed {len(removed)} items, about {freed // 2 ** 20} MiB")
+            summary["hosts"][host.name] = {"usage": plan["usage"], "removed": removed, "freed_bytes": freed}
+        self.stats["runs"] += 1
+        self.stats["last_run_ms"] = round((time.monotonic() - started) * 1000, 2)
+        self.last_run = summary
+        if shared_store.enabled:
+            await shared_store.set(GC_LAST_RUN_KEY, summary)
+
+    async def _remove(self, host: DockerHost, candidate: Dict[str, Any]) -> bool:
+        client = host.client
+        try:
+            if candidate["kind"] == "volume":
+                await client.remove_volume(candidate["id"])
+                inventory.mark_volumes(candidate["id"])
+                self.stats["removed_volumes"] += 1
+            else:
+                # Untag one reference at a time; removing the last one deletes the image. By ID when untagged.
+                for reference in candidate["tags"] or [candidate["id"]]:
+                    await client.remove_image(reference)
+                inventory.mark_images()
+                self.stats["removed_images"] += 1
+        except DockerNotFound:
+            return False
+        except DockerAPIError as e:
+            # Typically a 409: a container started using it after the plan was made.
+            logger.info(f"Garbage collection skipped {candidate['kind']} {candidate['id'][:24]} on '{host.name}': {e.explanation}")
+            self.stats["failures"] += 1
+            return False
+        self.stats["freed_bytes"] += candidate["size"]
+        return True
+
+
+docker_gc = DockerGarbageCollector()
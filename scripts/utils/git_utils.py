@@ -0,0 +1,227 @@
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from scripts.constants.app_configuration import settings
+from scripts.logging.logger import logger
+
+
+SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+# Branch, tag or commit names; never something git could read as an option.
+REF_PATTERN = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9._/-]*$")
+
+
+def is_allowed_remote(url: str) -> bool:
+    """Only ``GIT_ALLOWED_SCHEMES`` (and ``GIT_ALLOWED_HOSTS``, when set) may be cloned."""
+    if not url or url.startswith("-") or any(c.isspace() for c in url):
+        return False
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    schemes = [s.strip() for s in settings.GIT_ALLOWED_SCHEMES.split(",") if s.strip()]
+    hosts = [h.strip().lower() for h in settings.GIT_ALLOWED_HOSTS.split(",") if h.strip()]
+    if parts.scheme not in schemes:
+        return False
+    if parts.scheme == "file":
+        return not hosts
+    return bool(parts.hostname) and (not hosts or parts.hostname.lower() in hosts)
+
+
+def is_valid_ref(ref: Optional[str]) -> bool:
+    return ref is None or (bool(REF_PATTERN.match(ref)) and ".." not in ref)
+
+
+class GitError(Exception):
+    pass
+
+
+class GitMirrorCache:
+    """Local bare mirrors of remote repositories, keyed by URL.
+
+    The first build of a repository clones a ``--mirror``; later builds only run an
+    incremental ``fetch`` (skipped entirely when the requested commit is already
+    present or the mirror was fetched within ``GIT_MIRROR_FETCH_INTERVAL_SECONDS``).
+    Build contexts are exported with ``git archive``, so no working tree or history
+    is ever checked out.
+
+    Clones and fetches hold an ``flock`` on the mirror, so workers sharing
+    ``GIT_MIRROR_DIR`` never write the same mirror at once. Mirrors unused for
+    ``GIT_MIRROR_MAX_AGE_SECONDS``, then the least recently used ones beyond
+    ``GIT_MIRROR_MAX_BYTES``, are removed after a clone and at most once per
+    ``GIT_MIRROR_PRUNE_INTERVAL_SECONDS``.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._fetched: Dict[str, float] = {}
+        self._pruned_at = 0.0
+
+    @property
+    def root(self) -> str:
+        return self._root or settings.GIT_MIRROR_DIR
+
+    def mirror_path(self, url: str) -> str:
+        normalized = url.strip().rstrip("/")
+        if normalized.endswith(".git"):
+            normalized = normalized[:-4]
+        name = re.sub(r"[^A-Za-z0-9._-]", "-", normalized.split("/")[-1]) or "repo"
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, f"{name}-{digest}.git")
+
+    @staticmethod
+    async def git(*args: str, timeout: Optional[float] = None) -> bytes:
+        process = await asyncio.create_subprocess_exec(
+            "git", *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout or settings.GIT_COMMAND_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise GitError(f"git {args[0]} timed out")
+        if process.returncode != 0:
+            raise GitError(stderr.decode("utf-8", "replace").strip() or f"git {args[0]} failed")
+        return stdout
+
+    @contextlib.asynccontextmanager
+    async def _file_lock(self, path: str):
+        fd = os.open(f"{path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    async def _has_commit(self, path: str, ref: str) -> bool:
+        try:
+            await self.git("-C", path, "cat-file", "-e", "--end-of-options", f"{ref}^{{commit}}")
+            return True
+        except GitError:
+            return False
+
+    async def update(self, url: str, ref: Optional[str] = None) -> str:
+        """Create or refresh the mirror for ``url`` and return its path."""
+        if not is_allowed_remote(url):
+            raise GitError(f"Repository URL not allowed: {url}")
+        if not is_valid_ref(ref):
+            raise GitError(f"Invalid ref '{ref}'")
+        path = self.mirror_path(url)
+        cloned = False
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            os.makedirs(self.root, exist_ok=True)
+            if os.path.isdir(path) and ref and SHA_PATTERN.match(ref) and await self._has_commit(path, ref):
+                self._touch(path)
+                return path
+            async with self._file_lock(path):
+                if not os.path.isdir(path):
+                    # Another worker may have cloned it while this one waited for the lock.
+                    started = time.monotonic()
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    try:
+                        await self.git("clone", "--mirror", "--quiet", "--", url, tmp_path)
+                        os.replace(tmp_path, path)
+                    finally:
+                        if os.path.isdir(tmp_path):
+                            await asyncio.to_thread(shutil.rmtree, tmp_path, True)
+                    logger.info(f"Mirrored {url} in {time.monotonic() - started:.1f}s")
+                    self._fetched[path] = time.monotonic()
+                    cloned = True
+                elif time.monotonic() - self._fetched.get(path, 0) >= settings.GIT_MIRROR_FETCH_INTERVAL_SECONDS:
+                    started = time.monotonic()
+                    await self.git("-C", path, "fetch", "--prune", "--quiet", "origin")
+                    logger.info(f"Fetched {url} in {time.monotonic() - started:.1f}s")
+                    self._fetched[path] = time.monotonic()
+            self._touch(path)
+        if cloned or time.monotonic() - self._pruned_at >= settings.GIT_MIRROR_PRUNE_INTERVAL_SECONDS:
+            self._pruned_at = time.monotonic()
+            await self.prune(keep=path)
+        return path
+
+    @staticmethod
+    def _touch(path: str):
+        # The mirror's mtime is its last use, for pruning.
+        with contextlib.suppress(OSError):
+            os.utime(path)
+
+    @staticmethod
+    def _du(path: str) -> int:
+        total = 0
+        for directory, _, files in os.walk(path):
+            for name in files:
+                with contextlib.suppress(OSError):
+                    total += os.lstat(os.path.join(directory, name)).st_size
+        return total
+
+    def _prune(self, keep: str) -> List[str]:
+        now = time.time()
+        mirrors = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".git") and entry.is_dir(follow_symlinks=False) and entry.path != keep:
+                mirrors.append((entry.stat().st_mtime, entry.path, self._du(entry.path)))
+        total = self._du(keep) + sum(size for _, _, size in mirrors)
+        removed = []
+        for used_at, path, size in sorted(mirrors):
+            idle = now - used_at
+            # A mirror touched within the command timeout may still be archived from.
+            if idle < settings.GIT_COMMAND_TIMEOUT_SECONDS:
+                break
+            if idle < settings.GIT_MIRROR_MAX_AGE_SECONDS and total <= settings.GIT_MIRROR_MAX_BYTES:
+                break
+            fd = os.open(f"{path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            else:
+                shutil.rmtree(path, True)
+                total -= size
+                removed.append(path)
+            finally:
+                os.close(fd)
+        return removed
+
+    async def prune(self, keep: str = "") -> List[str]:
+        """Remove idle mirrors beyond the age and size limits; returns their paths."""
+        try:
+            removed = await asyncio.to_thread(self._prune, keep)
+        except OSError as e:
+            logger.warning(f"Pruning git mirrors failed: {e}")
+            return []
+        for path in removed:
+            self._fetched.pop(path, None)
+            self._locks.pop(path, None)
+            logger.info(f"Removed idle git mirror {path}")
+        return removed
+
+    async def resolve(self, url: str, ref: Optional[str], dockerfile: str) -> Tuple[str, str, str]:
+        """Return ``(mirror path, commit SHA, Dockerfile blob SHA)`` for ``ref`` (default HEAD)."""
+        path = await self.update(url, ref)
+        try:
+            commit = (await self.git("-C", path, "rev-parse", "--verify", "--end-of-options", f"{ref or 'HEAD'}^{{commit}}")).decode().strip()
+        except GitError:
+            raise GitError(f"Unknown ref '{ref}' in {url}")
+        try:
+            blob = (await self.git("-C", path, "rev-parse", "--verify", "--end-of-options", f"{commit}:{dockerfile}")).decode().strip()
+        except GitError:
+            raise FileNotFoundError(f"Dockerfile not found at {dockerfile}")
+        return path, commit, blob
+
+    async def archive(self, path: str, commit: str) -> bytes:
+        """The tree at ``commit`` as a tar stream, ready to send as a build context."""
+        self._touch(path)
+        return await self.git("-C", path, "archive", "--format=tar", "--end-of-options", commit)
+
+
+git_mirrors = GitMirrorCache()
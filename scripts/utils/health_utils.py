@@ -0,0 +1,115 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from scripts.constants.app_configuration import settings
+from scripts.logging.logger import logger
+from scripts.utils.docker_utils import get_docker_client
+from scripts.utils.fleet_utils import fleet
+from scripts.utils.index_utils import ensure_indexes
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.shared_store_utils import shared_store
+
+
+class AppHealth:
+    """Startup timings and dependency state behind ``/healthz`` and ``/readyz``.
+
+    Nothing external is contacted while the app starts: Mongo is connected and its
+    indexes bootstrapped by a background task that retries until it succeeds, and
+    the Docker client is created on first use. Readiness is checked on demand with
+    short timeouts, so an unreachable dependency makes ``/readyz`` fail instead of
+    crashing or stalling a worker.
+    """
+
+    def __init__(self):
+        self.created = time.time()
+        self.startup_ms: Dict[str, float] = {}
+        self.started = False
+        self.mongo_bootstrapped = False
+        self._bootstrap_task: Optional[asyncio.Task] = None
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def mark_started(self):
+        self.started = True
+        total = sum(self.startup_ms.values())
+        steps = ", ".join(f"{name}: {ms:.1f}ms" for name, ms in self.startup_ms.items())
+        logger.info(f"Startup finished in {total:.1f}ms ({steps})")
+
+    # Mongo bootstrap
+
+    def start(self):
+        if self._bootstrap_task is None:
+            self._bootstrap_task = asyncio.create_task(self._bootstrap_mongo())
+
+    async def stop(self):
+        if self._bootstrap_task is not None:
+            self._bootstrap_task.cancel()
+            await asyncio.gather(self._bootstrap_task, return_exceptions=True)
+            self._bootstrap_task = None
+        self.started = False
+
+    async def _bootstrap_mongo(self):
+        backoff = 1.0
+        started = time.perf_counter()
+        while not await mongo.connect():
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+        if settings.MONGODB_CREATE_INDEXES:
+            try:
+                await ensure_indexes()
+            except Exception as e:
+                logger.error(f"Index bootstrap failed: {e}")
+        self.mongo_bootstrapped = True
+        self.startup_ms["mongo_bootstrap"] = round((time.perf_counter() - started) * 1000, 2)
+
+    # Probes
+
+    @staticmethod
+    async def _check(probe) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            outcome = await asyncio.wait_for(probe(), timeout=settings.READINESS_TIMEOUT_SECONDS)
+            result = {"ok": outcome is not False}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def liveness(self) -> Dict[str, Any]:
+        return {"status": "ok", "uptime_seconds": round(time.time() - self.created, 1)}
+
+    async def readiness(self) -> Dict[str, Any]:
+        mongo_check, docker_check = await asyncio.gather(
+            self._check(lambda: mongo.async_db.command("ping")),
+            self._check(get_docker_client().ping),
+        )
+        mongo_check["indexes_bootstrapped"] = self.mongo_bootstrapped
+        checks = {
+            "mongo": mongo_check,
+            "docker": docker_check,
+            # Lists fall back to the daemon until the inventory is loaded, so it does not gate readiness.
+            "inventory": {"ok": inventory.ready or not settings.INVENTORY_ENABLED, "enabled": settings.INVENTORY_ENABLED},
+        }
+        ready = self.started and mongo_check["ok"] and docker_check["ok"]
+        if fleet.multi_host:
+            # Extra hosts only narrow placement, so they are reported without gating readiness.
+            checks["docker_hosts"] = {host.name: {"ok": host.healthy, "error": host.error} for host in fleet.hosts.values()}
+        if shared_store.enabled:
+            checks["shared_store"] = await self._check(shared_store.ping)
+            ready = ready and checks["shared_store"]["ok"]
+        return {
+            "status": "ready" if ready else "not ready",
+            "checks": checks,
+            "startup": {"complete": self.started, "steps_ms": dict(self.startup_ms)},
+        }
+
+
+app_health = AppHealth()
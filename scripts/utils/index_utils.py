@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+from scripts.utils.mongo_utils import mongo
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import (
+    USER_COLLECTION,
+    CONTAINER_COLLECTION,
+    RATE_LIMIT_COLLECTION,
+    RATE_LIMIT_COUNTER_COLLECTION,
+    REGISTRY_CREDENTIAL_COLLECTION
+)
+from scripts.logging.logger import logger
+
+
+INDEX_OPTIONS_CONFLICT = 85
+
+PROBE = "__index_probe__"
+
+
+def index_specs() -> Dict[str, List[IndexModel]]:
+    container_indexes = [
+        IndexModel([("user_id", ASCENDING), ("created_time", ASCENDING), ("_id", ASCENDING)], name="user_id_created_time_id"),
+        IndexModel([("created_time", ASCENDING), ("_id", ASCENDING)], name="created_time_id"),
+        IndexModel([("container_name", ASCENDING), ("created_time", DESCENDING)], name="container_name_created_time"),
+        IndexModel([("container_id", ASCENDING)], name="container_id", sparse=True),
+        IndexModel([("image_id", ASCENDING), ("created_time", DESCENDING)], name="image_id_created_time", sparse=True),
+    ]
+    if settings.CONTAINER_HISTORY_TTL_SECONDS:
+        container_indexes.append(IndexModel(
+            [("created_time", ASCENDING)],
+            name="created_time_ttl",
+            expireAfterSeconds=settings.CONTAINER_HISTORY_TTL_SECONDS,
+        ))
+
+    return {
+        USER_COLLECTION: [
+            IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+            IndexModel([("role", ASCENDING), ("_id", ASCENDING)], name="role_id"),
+        ],
+        CONTAINER_COLLECTION: container_indexes,
+        RATE_LIMIT_COLLECTION: [
+            IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        ],
+        RATE_LIMIT_COUNTER_COLLECTION: [
+            IndexModel(
+                [("user_id", ASCENDING), ("window", ASCENDING), ("window_start", ASCENDING)],
+                name="user_id_window_unique",
+                unique=True,
+            ),
+            IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        ],
+        REGISTRY_CREDENTIAL_COLLECTION: [
+            IndexModel([("user_id", ASCENDING), ("registry", ASCENDING)], name="user_id_registry_unique", unique=True),
+            IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        ],
+    }
+
+
+def hot_queries() -> Dict[str, Dict[str, Any]]:
+    """The filters the request paths actually run, used to check their query plans."""
+    since = datetime.utcnow() - timedelta(hours=1)
+    return {
+        USER_COLLECTION: {"username": PROBE},
+        CONTAINER_COLLECTION: {"user_id": PROBE, "created_time": {"$gte": since}},
+        RATE_LIMIT_COLLECTION: {"user_id": PROBE},
+        RATE_LIMIT_COUNTER_COLLECTION: {"user_id": PROBE, "window": 3600, "window_start": 0},
+        REGISTRY_CREDENTIAL_COLLECTION: {"user_id": PROBE, "registry": PROBE},
+    }
+
+
+async def _create_index(collection, model: IndexModel) -> str:
+    document = model.document
+    try:
+        await collection.create_indexes([model])
+        return "ok"
+    except OperationFailure as e:
+        if e.code == INDEX_OPTIONS_CONFLICT and "expireAfterSeconds" in document:
+            await mongo.async_db.command({
+                "collMod": collection.name,
+                "index": {"name": document["name"], "expireAfterSeconds": document["expireAfterSeconds"]},
+            })
+            return "ttl updated"
+        logger.error(f"Failed to create index '{document['name']}' on '{collection.name}': {e}")
+        return f"error: {e}"
+
+
+def _matches(existing: Dict[str, Any], document: Dict[str, Any]) -> bool:
+    return (
+        existing is not None
+        and list(existing["key"]) == list(document["key"].items())
+        and existing.get("unique", False) == document.get("unique", False)
+        and existing.get("expireAfterSeconds") == document.get("expireAfterSeconds")
+    )
+
+
+async def ensure_indexes() -> Dict[str, Dict[str, str]]:
+    """Create the indexes from ``index_specs`` and verify they exist with the expected options."""
+    report = {}
+    for collection_name, models in index_specs().items():
+        collection = mongo.get_async_collection(collection_name)
+        report[collection_name] = {}
+        for model in models:
+            document = model.document
+            status = await _create_index(collection, model)
+            if status.startswith("error"):
+                report[collection_name][document["name"]] = status
+                continue
+            existing = (await collection.index_information()).get(document["name"])
+            report[collection_name][document["name"]] = status if _matches(existing, document) else "mismatch"
+
+    problems = {f"{c}.{i}": s for c, indexes in report.items() for i, s in indexes.items() if s not in ("ok", "ttl updated")}
+    if problems:
+        logger.warning(f"Index bootstrap finished with problems: {problems}")
+    else:
+        logger.info("Index bootstrap verified all indexes.")
+    return report
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    stages = [{"stage": plan.get("stage"), "index": plan.get("indexName")}]
+    children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+    for child in children:
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    winning_plan = winning_plan.get("queryPlan", winning_plan)
+    stages = _plan_stages(winning_plan)
+    stats = explain.get("executionStats", {})
+    return {
+        "stages": [s["stage"] for s in stages],
+        "indexes": [s["index"] for s in stages if s["index"]],
+        "collection_scan": any(s["stage"] == "COLLSCAN" for s in stages),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "execution_time_ms": stats.get("executionTimeMillis"),
+    }
+
+
+async def index_report() -> Dict[str, Any]:
+    """Indexes, ``$indexStats`` usage counters and hot-query plans for each managed collection."""
+    report = {}
+    queries = hot_queries()
+    for collection_name in index_specs():
+        collection = mongo.get_async_collection(collection_name)
+        entry: Dict[str, Any] = {}
+        try:
+            entry["indexes"] = {
+                name: {k: v for k, v in info.items() if k in ("key", "unique", "expireAfterSeconds")}
+                for name, info in (await collection.index_information()).items()
+            }
+            usage = await (await collection.aggregate([{"$indexStats": {}}])).to_list(None)
+            entry["usage"] = {
+                u["name"]: {"ops": u["accesses"]["ops"], "since": u["accesses"]["since"]} for u in usage
+            }
+            explain = await mongo.async_db.command(
+                "explain",
+                {"find": collection_name, "filter": queries[collection_name]},
+                verbosity="executionStats",
+            )
+            entry["query"] = {k: str(v) for k, v in queries[collection_name].items()}
+            entry["plan"] = summarize_explain(explain)
+        except PyMongoError as e:
+            entry["error"] = str(e)
+        report[collection_name] = entry
+    return report
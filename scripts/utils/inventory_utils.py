@@ -0,0 +1,369 @@
+import asyncio
+import fnmatch
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+from scripts.constants.app_configuration import settings
+from scripts.utils.docker_utils import get_docker_client, DockerNotFound
+from scripts.utils.disk_usage_utils import disk_usage
+from scripts.utils.fleet_utils import fleet, DockerHost
+from scripts.logging.logger import logger
+
+
+CONTAINER_FILTERS = {"id", "name", "label", "status", "ancestor"}
+IMAGE_FILTERS = {"reference", "label", "dangling"}
+VOLUME_FILTERS = {"name", "label", "driver"}
+
+# Container events that do not change what the list endpoints return.
+IGNORED_CONTAINER_ACTIONS = ("exec_", "attach", "resize", "top", "archive-path", "extract-to-dir", "export", "copy", "commit")
+
+
+def _filter_values(value: Any) -> List[str]:
+    if isinstance(value, dict):
+        return [k for k, enabled in value.items() if enabled]
+    if isinstance(value, (list, tuple, set)):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def _has_label(labels: Optional[Dict[str, str]], wanted: str) -> bool:
+    key, sep, value = wanted.partition("=")
+    labels = labels or {}
+    return key in labels and (not sep or labels[key] == value)
+
+
+def _name_matches(pattern: str, names: Iterable[str]) -> bool:
+    try:
+        return any(re.search(pattern, n.lstrip("/")) for n in names)
+    except re.error:
+        return any(pattern in n for n in names)
+
+
+def _matches(item_filters: Dict[str, List[str]], checks: Dict[str, Any]) -> bool:
+    """Docker filter semantics: values of one key are OR-ed, except labels, which must all match."""
+    for key, values in item_filters.items():
+        check = checks[key]
+        if key == "label":
+            if not all(check(v) for v in values):
+                return False
+        elif not any(check(v) for v in values):
+            return False
+    return True
+
+
+class DockerInventory:
+    """In-memory copy of the fleet's containers and the primary host's images and volumes.
+
+    Loaded once, then kept current from each host's ``/events``: container and volume
+    events mark single objects for refresh, image events mark the image list, and dirty
+    entries are refreshed in batches before the next read. A full resync runs every
+    ``INVENTORY_RESYNC_SECONDS`` and after every reconnect to recover from missed
+    events. Until the first load succeeds, or while an event stream is down, the
+    list methods fall through to the daemons so results are never stale.
+
+    Containers are listed from every host in the fleet and carry the name of their
+    host under ``Host``. Images and volumes are those of the primary host, which is
+    the one the image and volume endpoints act on.
+    """
+
+    def __init__(self):
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.images: Dict[str, Dict[str, Any]] = {}
+        self.volumes: Dict[str, Dict[str, Any]] = {}
+        # Hosts whose event stream is followed, so their part of the inventory is current.
+        self.live: Set[str] = set()
+        self.last_resync: Optional[float] = None
+        self.stats = {"events": 0, "resyncs": 0, "memory_reads": 0, "daemon_reads": 0}
+        self._dirty_containers: Set[str] = set()
+        self._dirty_volumes: Set[str] = set()
+        self._images_dirty = False
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # Lifecycle
+
+    @property
+    def ready(self) -> bool:
+        return fleet.primary.name in self.live
+
+    def _expected(self) -> List[DockerHost]:
+        """Hosts whose containers a read must include: the primary and every healthy extra host."""
+        return [host for host in fleet.hosts.values() if host is fleet.primary or host.healthy]
+
+    def start(self):
+        if settings.INVENTORY_ENABLED and not self._tasks:
+            self._tasks = [asyncio.create_task(self._watch(host)) for host in fleet.hosts.values()]
+            self._tasks.append(asyncio.create_task(self._periodic_resync()))
+
+    async def stop(self):
+        tasks = self._tasks + ([self._flush_task] if self._flush_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks, self._flush_task = [], None
+        self.live.clear()
+
+    async def resync(self, host: Optional[DockerHost] = None):
+        """Reload everything from ``host``, or from every host whose stream is followed."""
+        if host is None:
+            await asyncio.gather(*(self.resync(h) for h in fleet.hosts.values() if h.name in self.live))
+            return
+        client = host.client
+        started = time.monotonic()
+        primary = host is fleet.primary
+        calls = [client.list_containers(all=True)] + ([client.list_images(), client.list_volumes()] if primary else [])
+        containers, *rest = await asyncio.gather(*calls)
+        images, volumes = rest or ([], [])
+        for container in containers:
+            container["Host"] = host.name
+        self.containers = {
+            **{cid: c for cid, c in self.containers.items() if c.get("Host") != host.name},
+            **{c["Id"]: c for c in containers},
+        }
+        if primary:
+            self.images = {i["Id"]: i for i in images}
+            self.volumes = {v["Name"]: v for v in volumes}
+            self.last_resync = time.time()
+        self.stats["resyncs"] += 1
+        logger.info(
+            f"Inventory resynced {len(containers)} containers, {len(images)} images and "
+            f"{len(volumes)} volumes from host '{host.name}' in {(time.monotonic() - started) * 1000:.0f}ms"
+        )
+
+    async def _watch(self, host: DockerHost):
+        primary = host is fleet.primary
+        backoff = 1.0
+        while True:
+            since = time.time()
+            try:
+                await self.resync(host)
+                self.live.add(host.name)
+                backoff = 1.0
+                types = ["container", "image", "volume"] if primary else ["container"]
+                async for event in host.client.events(since=since, filters={"type": types}):
+                    self.handle_event(event, host)
+                logger.warning(f"Docker event stream of host '{host.name}' ended; resyncing inventory")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Docker inventory watch of host '{host.name}' failed, retrying in {backoff:.0f}s: {e}")
+                self.live.discard(host.name)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def _periodic_resync(self):
+        while True:
+            await asyncio.sleep(settings.INVENTORY_RESYNC_SECONDS)
+            if not self.ready:
+                continue
+            try:
+                await self.resync()
+            except Exception as e:
+                logger.warning(f"Periodic inventory resync failed: {e}")
+
+    # Change tracking
+
+    def handle_event(self, event: Dict[str, Any], host: Optional[DockerHost] = None):
+        self.stats["events"] += 1
+        kind, action = event.get("Type"), event.get("Action", "")
+        actor = event.get("Actor", {}).get("ID") or event.get("id")
+        if host is None or host is fleet.primary:
+            disk_usage.handle_event(kind, action)
+        if kind == "container" and actor and not action.startswith(IGNORED_CONTAINER_ACTIONS):
+            if action == "destroy":
+                self.containers.pop(actor, None)
+                self._dirty_containers.discard(actor)
+            else:
+                self.mark_containers(actor)
+        elif kind == "image" and action != "push":
+            self.mark_images()
+        elif kind == "volume" and actor and action in ("create", "destroy"):
+            self.mark_volumes(actor)
+
+    def _schedule_flush(self):
+        if self.ready and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    def mark_containers(self, *ids: str):
+        self._dirty_containers.update(ids)
+        self._schedule_flush()
+
+    def mark_container(self, ref: str):
+        """Mark a container by name or ID after changing it, so the next read sees the change."""
+        container = self.find_container(ref)
+        if container is not None:
+            self.mark_containers(container["Id"])
+
+    def mark_images(self):
+        self._images_dirty = True
+        self._schedule_flush()
+
+    def mark_volumes(self, *names: str):
+        self._dirty_volumes.update(names)
+        self._schedule_flush()
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty_containers or self._images_dirty or self._dirty_volumes)
+
+    async def flush(self):
+        """Refresh everything marked dirty; concurrent callers share one refresh."""
+        async with self._flush_lock:
+            try:
+                while self.dirty:
+                    await self._flush()
+            except Exception as e:
+                logger.warning(f"Inventory refresh failed: {e}")
+
+    async def _list_containers_on(self, hosts: List[DockerHost], strict: bool, **kwargs) -> List[Dict[str, Any]]:
+        """``list_containers`` on each of ``hosts``, tagged with the host name.
+
+        With ``strict`` any failing host fails the call; otherwise hosts that fail are
+        skipped, unless all of them do.
+        """
+        results = await asyncio.gather(*(host.client.list_containers(**kwargs) for host in hosts), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors and (strict or len(errors) == len(results)):
+            raise errors[0]
+        containers = []
+        for host, result in zip(hosts, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Listing containers on host '{host.name}' failed: {result}")
+                continue
+            for container in result:
+                container["Host"] = host.name
+            containers.extend(result)
+        return containers
+
+    async def _flush(self):
+        client = get_docker_client()
+        ids, self._dirty_containers = self._dirty_containers, set()
+        images_dirty, self._images_dirty = self._images_dirty, False
+        names, self._dirty_volumes = self._dirty_volumes, set()
+        try:
+            if ids:
+                hosts = [host for host in fleet.hosts.values() if host.name in self.live]
+                listed = await self._list_containers_on(hosts, True, all=True, filters={"id": list(ids)})
+                found = {c["Id"]: c for c in listed}
+                for container_id in ids:
+                    if container_id in found:
+                        self.containers[container_id] = found[container_id]
+                    else:
+                        self.containers.pop(container_id, None)
+                ids = set()
+            if images_dirty:
+                self.images = {i["Id"]: i for i in await client.list_images()}
+                images_dirty = False
+            while names:
+                name = next(iter(names))
+                try:
+                    self.volumes[name] = await client.inspect_volume(name)
+                except DockerNotFound:
+                    self.volumes.pop(name, None)
+                names.discard(name)
+        finally:
+            # Anything not refreshed stays dirty, so reads keep going to the daemon.
+            self._dirty_containers |= ids
+            self._images_dirty = self._images_dirty or images_dirty
+            self._dirty_volumes |= names
+
+    async def _serve_from_memory(self, filters: Optional[Dict[str, Any]], supported: Set[str], every_host: bool = False) -> bool:
+        live = all(host.name in self.live for host in self._expected()) if every_host else self.ready
+        if not live or (filters and not set(filters) <= supported):
+            self.stats["daemon_reads"] += 1
+            return False
+        if self.dirty:
+            await self.flush()
+            if self.dirty:
+                self.stats["daemon_reads"] += 1
+                return False
+        self.stats["memory_reads"] += 1
+        return True
+
+    # Reads (same signatures as DockerEngineClient)
+
+    def find_container(self, ref: str) -> Optional[Dict[str, Any]]:
+        for container in self.containers.values():
+            if container["Id"].startswith(ref) or f"/{ref}" in (container.get("Names") or []):
+                return container
+        return None
+
+    async def list_containers(
+        self,
+        all: bool = False,
+        before: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = -1,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        if not await self._serve_from_memory(filters, CONTAINER_FILTERS, every_host=True):
+            hosts = self._expected()
+            result = await self._list_containers_on(hosts, False, all=all, before=before, filters=filters, limit=limit, since=since)
+            if len(hosts) > 1:
+                result.sort(key=lambda c: c.get("Created", 0), reverse=True)
+            return result[:limit] if limit and limit > 0 else result
+
+        wanted = {k: _filter_values(v) for k, v in (filters or {}).items()}
+        checks = {
+            "id": lambda c: lambda v: c["Id"].startswith(v),
+            "name": lambda c: lambda v: _name_matches(v, c.get("Names") or []),
+            "label": lambda c: lambda v: _has_label(c.get("Labels"), v),
+            "status": lambda c: lambda v: c.get("State") == v,
+            "ancestor": lambda c: lambda v: c.get("Image") in (v, f"{v}:latest") or c.get("ImageID", "").startswith(v),
+        }
+        before_ref = self.find_container(before) if before else None
+        since_ref = self.find_container(since) if since else None
+        result = []
+        for container in self.containers.values():
+            if container.get("Host") not in self.live:
+                continue
+            if not all and container.get("State") != "running" and not (before or since):
+                continue
+            if before_ref and container.get("Created", 0) >= before_ref.get("Created", 0):
+                continue
+            if since_ref and container.get("Created", 0) <= since_ref.get("Created", 0):
+                continue
+            if wanted and not _matches(wanted, {k: checks[k](container) for k in wanted}):
+                continue
+            result.append(container)
+        result.sort(key=lambda c: c.get("Created", 0), reverse=True)
+        return result[:limit] if limit and limit > 0 else result
+
+    async def list_images(self, name: Optional[str] = None, all: bool = False, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        if all or not await self._serve_from_memory(filters, IMAGE_FILTERS):
+            return await get_docker_client().list_images(name=name, all=all, filters=filters)
+
+        wanted = {k: _filter_values(v) for k, v in (filters or {}).items()}
+        if name:
+            wanted.setdefault("reference", []).append(name)
+
+        def reference(image):
+            tags = [t for t in image.get("RepoTags") or [] if t != "<none>:<none>"]
+            return lambda v: any(
+                fnmatch.fnmatchcase(t, v) or fnmatch.fnmatchcase(t.rsplit(":", 1)[0], v) for t in tags
+            )
+
+        checks = {
+            "reference": reference,
+            "label": lambda i: lambda v: _has_label(i.get("Labels"), v),
+            "dangling": lambda i: lambda v: (v.lower() in ("true", "1")) == (not [t for t in i.get("RepoTags") or [] if t != "<none>:<none>"]),
+        }
+        result = [i for i in self.images.values() if not wanted or _matches(wanted, {k: checks[k](i) for k in wanted})]
+        result.sort(key=lambda i: i.get("Created", 0), reverse=True)
+        return result
+
+    async def list_volumes(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        if not await self._serve_from_memory(filters, VOLUME_FILTERS):
+            return await get_docker_client().list_volumes(filters=filters)
+
+        wanted = {k: _filter_values(v) for k, v in (filters or {}).items()}
+        checks = {
+            "name": lambda vol: lambda v: v in vol["Name"],
+            "label": lambda vol: lambda v: _has_label(vol.get("Labels"), v),
+            "driver": lambda vol: lambda v: vol.get("Driver") == v,
+        }
+        return [v for v in self.volumes.values() if not wanted or _matches(wanted, {k: checks[k](v) for k in wanted})]
+
+
+inventory = DockerInventory()
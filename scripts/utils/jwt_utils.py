@@ -1,21 +1,41 @@
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional
+from cachetools import TLRUCache
 from jose import jwt, JWTError, ExpiredSignatureError
 from fastapi import HTTPException, Request, status
 from scripts.constants.app_configuration import settings
 from scripts.constants.app_constants import *
 from scripts.models.jwt_model import TokenData
+from scripts.utils.shared_store_utils import shared_store
 
 
 SECRET_KEY = settings.JWT_SECRET
 ALGORITHM = settings.JWT_ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Verified tokens keyed by SHA-256 digest -> (TokenData, exp, iat). Entries live for
+# TOKEN_CACHE_TTL_SECONDS but never past the token's own expiry.
+_token_cache = TLRUCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    ttu=lambda key, value, now: min(now + settings.TOKEN_CACHE_TTL_SECONDS, value[1]),
+    timer=time.time,
+)
+_token_cache_lock = threading.Lock()
+_token_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_revoked_users = {}
+# Carries {"username", "revoked_at"} so every worker rejects a deleted user's tokens.
+TOKEN_REVOCATION_CHANNEL = "token-revocations"
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    # Sub-second, like the revocation times it is compared with; a whole-second iat would
+    # reject a token issued in the same second just after a revocation.
+    to_encode.update({"exp": expire, "iat": time.time()})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def create_user_token(username: str, role: str) -> str:
@@ -25,7 +45,12 @@ def create_user_token(username: str, role: str) -> str:
     }
     return create_access_token(payload)
 
-def decode_access_token(token: str) -> TokenData:
+def _is_revoked(username: str, issued_at: float) -> bool:
+    revoked_at = _revoked_users.get(username)
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+def _verify_access_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
@@ -34,12 +59,55 @@ def decode_access_token(token: str) -> TokenData:
         if username is None or role is None:
             raise JWTError("Missing username or role in token.")
 
-        return TokenData(username=username, role=role)
+        return TokenData(username=username, role=role), payload["exp"], payload.get("iat", 0)
 
     except ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=TOKEN_EXPIRED)
-    except JWTError:
+    except (JWTError, KeyError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=INVALID_TOKEN)
+
+
+def decode_access_token(token: str) -> TokenData:
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+        _token_cache_stats["hits" if cached else "misses"] += 1
+
+    if cached is None:
+        cached = _verify_access_token(token)
+        with _token_cache_lock:
+            _token_cache[key] = cached
+
+    token_data, _, issued_at = cached
+    if _is_revoked(token_data.username, issued_at):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=INVALID_TOKEN)
+    return token_data
+
+
+def invalidate_user_tokens(username: str, revoked_at: Optional[float] = None) -> int:
+    """Drop cached tokens for ``username`` and reject any token issued to them until ``revoked_at`` (now by default)."""
+    now = time.time()
+    revoked_at = revoked_at or now
+    with _token_cache_lock:
+        _revoked_users[username] = max(revoked_at, _revoked_users.get(username, 0))
+        for user, at in list(_revoked_users.items()):
+            if at < now - ACCESS_TOKEN_EXPIRE_MINUTES * 60:
+                del _revoked_users[user]
+
+        stale = [key for key, value in _token_cache.items() if value[0].username == username]
+        for key in stale:
+            del _token_cache[key]
+        _token_cache_stats["invalidations"] += len(stale)
+    return len(stale)
+
+
+def token_cache_stats() -> dict:
+    with _token_cache_lock:
+        stats = dict(_token_cache_stats, size=len(_token_cache), max_size=_token_cache.maxsize)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
 
 
 def get_current_user_from_token(request: Request) -> TokenData:
@@ -50,3 +118,10 @@ def get_current_user_from_token(request: Request) -> TokenData:
         return decode_access_token(token)
 
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=UNAUTHORIZED)
+
+
+def _apply_revocation(message: dict):
+    invalidate_user_tokens(message["username"], message["revoked_at"])
+
+
+shared_store.subscribe(TOKEN_REVOCATION_CHANNEL, _apply_revocation)
@@ -0,0 +1,509 @@
+import asyncio
+import bisect
+import math
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from pymongo import monitoring
+from starlette.routing import Match
+from scripts.constants.app_configuration import settings
+from scripts.logging.logger import logger
+from scripts.utils.shared_store_utils import SharedStoreError, shared_store, worker_id
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+        return f"{name}{{{rendered}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+class Metric:
+    """A named family of samples with a fixed set of label names.
+
+    Values are kept per label combination. Passing ``function`` instead makes the
+    metric read its values at scrape time: it returns a number, or a mapping of
+    label-value tuples to numbers, which suits counters that already live elsewhere.
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], Any]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _add(self, amount: float, labels: Dict[str, Any]):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        if self.function is None:
+            with self._lock:
+                values = dict(self._values)
+        else:
+            values = self.function()
+            if not isinstance(values, dict):
+                values = {(): values}
+        for key, value in values.items():
+            yield self.name, dict(zip(self.labelnames, key)), float(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(_format_sample(*sample) for sample in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._add(amount, labels)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self._add(-amount, labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: per-bucket (non-cumulative) counts, then sum.
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            series = {key: (list(counts), total[0]) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in series.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (), function=None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), function=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Every metric's samples in a JSON-friendly form, to be merged with other workers'."""
+        return {
+            metric.name: {"kind": metric.kind, "help": metric.documentation, "samples": list(metric.samples())}
+            for metric in self._metrics.values()
+        }
+
+
+def render_workers(snapshots: Dict[str, Dict[str, Dict[str, Any]]]) -> str:
+    """Render ``collect`` output from several workers as one exposition, labelling each sample with its worker."""
+    families: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+    for worker, snapshot in sorted(snapshots.items()):
+        for name, family in snapshot.items():
+            lines = families.setdefault(name, (family, []))[1]
+            lines.extend(_format_sample(sample, {**labels, "worker": worker}, value) for sample, labels, value in family["samples"])
+    output = []
+    for name, (family, lines) in families.items():
+        output.extend([f"# HELP {name} {family['help']}", f"# TYPE {name} {family['kind']}", *lines])
+    return "\n".join(output) + "\n"
+
+
+class WorkerMetrics:
+    """Shares each worker's metrics through the shared store so any worker can serve all of them.
+
+    Every worker pushes a snapshot each ``METRICS_PUSH_INTERVAL_SECONDS``; the
+    worker handling a scrape pushes a fresh one of its own and merges the rest.
+    Snapshots of workers that stopped expire after a few intervals.
+    """
+
+    KEY = "metrics:{worker}"
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if shared_store.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def push(self):
+        ttl = settings.METRICS_PUSH_INTERVAL_SECONDS * 3
+        await shared_store.set(self.KEY.format(worker=worker_id()), registry.collect(), ttl)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.push()
+            except (SharedStoreError, OSError) as e:
+                logger.warning(f"Could not push metrics to the shared store: {e}")
+            await asyncio.sleep(settings.METRICS_PUSH_INTERVAL_SECONDS)
+
+    async def render(self) -> str:
+        if not shared_store.enabled:
+            return registry.render()
+        await self.push()
+        prefix = self.KEY.format(worker="")
+        snapshots = await shared_store.mget(prefix)
+        return render_workers({key[len(prefix):]: snapshot for key, snapshot in snapshots.items()})
+
+
+registry = MetricsRegistry()
+worker_metrics = WorkerMetrics()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template, method and status code.", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time from receiving a request until its response body is sent.", ("method", "route")
+)
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled, by route template.", ("method", "route")
+)
+docker_duration = registry.histogram(
+    "docker_request_duration_seconds",
+    "Docker Engine API calls by operation; streaming calls are timed until the response headers arrive.",
+    ("operation",),
+)
+docker_errors = registry.counter(
+    "docker_request_errors_total", "Docker Engine API calls that failed or returned an error status.", ("operation",)
+)
+mongo_duration = registry.histogram(
+    "mongo_command_duration_seconds", "MongoDB commands by command name and collection.", ("command", "collection")
+)
+mongo_errors = registry.counter(
+    "mongo_command_failures_total", "MongoDB commands that failed, by command name and collection.", ("command", "collection")
+)
+container_create_duration = registry.histogram(
+    "container_create_duration_seconds", "Container create-and-start in the create route, by warm_pool claim or cold create.", ("source",)
+)
+
+
+# --- HTTP ---------------------------------------------------------------------
+
+def route_template(app, scope: Dict[str, Any]) -> str:
+    """The path template of the route that will handle ``scope``, so IDs do not explode label cardinality."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Counts and times every HTTP request by route template and tracks requests in flight.
+
+    The duration runs until the app has sent the whole response, so streamed
+    responses are measured end to end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"], scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc(method=method, route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=status_code)
+            http_in_flight.dec(method=method, route=route)
+
+
+# --- Docker -------------------------------------------------------------------
+
+_DOCKER_COLLECTION_ACTIONS = {"json", "create", "prune", "load", "search", "df"}
+_DOCKER_OBJECT_ACTIONS = {
+    "json", "start", "stop", "restart", "kill", "pause", "unpause", "wait", "logs", "stats", "top", "attach",
+    "rename", "update", "export", "archive", "changes", "resize", "tag", "push", "history", "get",
+}
+_API_VERSION = re.compile(r"^/v\d+(\.\d+)?(?=/)")
+
+
+def docker_operation(method: str, path: str) -> str:
+    """``GET /containers/{id}/json`` for ``GET /v1.43/containers/abc123/json`` and the like.
+
+    Image names may contain slashes, so everything between the resource and a
+    known trailing action is treated as the object ID.
+    """
+    segments = _API_VERSION.sub("", path).strip("/").split("/")
+    resource = segments[0]
+    if len(segments) == 1:
+        template = f"/{resource}"
+    elif len(segments) == 2 and segments[1] in _DOCKER_COLLECTION_ACTIONS:
+        template = f"/{resource}/{segments[1]}"
+    elif len(segments) > 2 and segments[-1] in _DOCKER_OBJECT_ACTIONS:
+        template = f"/{resource}/{{id}}/{segments[-1]}"
+    else:
+        template = f"/{resource}/{{id}}"
+    return f"{method} {template}"
+
+
+def observe_docker_call(operation: str, started: float, failed: bool = False):
+    docker_duration.observe(time.perf_counter() - started, operation=operation)
+    if failed:
+        docker_errors.inc(operation=operation)
+
+
+# --- Mongo --------------------------------------------------------------------
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command the Mongo clients send, labelled by command name and collection.
+
+    The collection is only known from the started event, so it is remembered by
+    request ID until the command finishes.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        target = event.command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+
+    def _finish(self, event) -> Tuple[str, str]:
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_duration.observe(event.duration_micros / 1_000_000, command=event.command_name, collection=collection)
+        return event.command_name, collection
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        command, collection = self._finish(event)
+        mongo_errors.inc(command=command, collection=collection)
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+# --- Scrape-time gauges ---------------------------------------------------------
+
+def _threadpool() -> Dict[Tuple[str, ...], float]:
+    from anyio import to_thread
+
+    try:
+        limiter = to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        # Only defined inside the event loop.
+        return {}
+    return {
+        ("capacity",): limiter.total_tokens,
+        ("busy",): limiter.borrowed_tokens,
+        ("queued",): limiter.statistics().tasks_waiting,
+    }
+
+
+def _cache_counts() -> Dict[str, Tuple[int, int]]:
+    """``(hits, misses)`` per in-process cache."""
+    from scripts.utils.inventory_utils import inventory
+    from scripts.utils.jwt_utils import token_cache_stats
+    from scripts.utils.pull_utils import image_pulls
+    from scripts.utils.rate_limit_utils import rate_limiter
+    from scripts.utils.registry_auth_utils import registry_credentials
+    from scripts.utils.warm_pool_utils import warm_pool
+
+    tokens = token_cache_stats()
+    return {
+        "access_tokens": (tokens["hits"], tokens["misses"]),
+        "rate_limit_policies": (rate_limiter.stats["policy_hits"], rate_limiter.stats["policy_misses"]),
+        "inventory": (inventory.stats["memory_reads"], inventory.stats["daemon_reads"]),
+        "image_pulls": (image_pulls.stats["cached"] + image_pulls.stats["joined"], image_pulls.stats["pulls"]),
+        "warm_pool": (warm_pool.stats["hits"], warm_pool.stats["misses"]),
+        "registry_auth": (registry_credentials.stats["hits"], registry_credentials.stats["misses"]),
+    }
+
+
+def _cache_ratio() -> Dict[Tuple[str, ...], float]:
+    return {(name,): hits / (hits + misses) if hits + misses else 0.0 for name, (hits, misses) in _cache_counts().items()}
+
+
+def _password_hash_pending() -> int:
+    from scripts.utils.password_utils import password_hasher
+
+    return password_hasher.pending
+
+
+registry.gauge("threadpool_tokens", "AnyIO worker threads used by sync routes, by state.", ("state",), function=_threadpool)
+registry.counter(
+    "cache_hits_total", "Lookups answered from an in-process cache.", ("cache",),
+    function=lambda: {(name,): hits for name, (hits, _) in _cache_counts().items()},
+)
+registry.counter(
+    "cache_misses_total", "Lookups that had to go to Mongo or the Docker daemon.", ("cache",),
+    function=lambda: {(name,): misses for name, (_, misses) in _cache_counts().items()},
+)
+registry.gauge("cache_hit_ratio", "Hits over all lookups since start, per cache.", ("cache",), function=_cache_ratio)
+registry.gauge("password_hash_pending", "Password hash/verify calls running or queued in the hashing pool.", function=_password_hash_pending)
+
+
+def _docker_hosts(field: str) -> Dict[Tuple[str, ...], float]:
+    from scripts.utils.fleet_utils import fleet
+
+    return {(host.name,): float(getattr(host, field)) for host in fleet.hosts.values()}
+
+
+registry.gauge("docker_host_up", "Whether the last health check of each Docker host succeeded.", ("host",), function=lambda: _docker_hosts("healthy"))
+registry.gauge("docker_host_free_memory_bytes", "Memory not reserved by running containers, per Docker host.", ("host",), function=lambda: _docker_hosts("free_memory"))
+registry.gauge("docker_host_free_cpus", "CPUs not reserved by running containers, per Docker host.", ("host",), function=lambda: _docker_hosts("free_cpus"))
+
+
+def _warm_pool_ready() -> Dict[Tuple[str, ...], float]:
+    from scripts.utils.warm_pool_utils import warm_pool
+
+    return {(profile["image"], profile_id): len(warm_pool.ready[profile_id]) for profile_id, profile in warm_pool.profiles.items()}
+
+
+registry.gauge("warm_pool_ready", "Pooled containers ready to be claimed, per profile.", ("image", "profile"), function=_warm_pool_ready)
+
+
+def _gc_stats() -> Dict[str, float]:
+    from scripts.utils.gc_utils import docker_gc
+
+    return docker_gc.stats
+
+
+def _gc_usage() -> Dict[Tuple[str, ...], float]:
+    from scripts.utils.gc_utils import docker_gc
+
+    return {(host,): ratio for host, ratio in docker_gc.usage.items()}
+
+
+registry.counter(
+    "docker_gc_removed_total", "Images and volumes removed by the garbage collector.", ("kind",),
+    function=lambda: {("image",): _gc_stats()["removed_images"], ("volume",): _gc_stats()["removed_volumes"]},
+)
+registry.counter("docker_gc_freed_bytes_total", "Estimated bytes freed by the garbage collector.", function=lambda: _gc_stats()["freed_bytes"])
+registry.gauge("docker_disk_usage_ratio", "Disk usage seen by the last garbage collection plan, per Docker host.", ("host",), function=_gc_usage)
+
+
+def _push_layers() -> Dict[Tuple[str, ...], float]:
+    from scripts.utils.push_utils import image_pushes
+
+    return {("pushed",): image_pushes.stats["layers_pushed"], ("skipped",): image_pushes.stats["layers_skipped"]}
+
+
+registry.counter("image_push_layers_total", "Layers uploaded by image pushes, or skipped because the registry had them.", ("result",), function=_push_layers)
+
+
+def _disk_usage_refreshes() -> int:
+    from scripts.utils.disk_usage_utils import disk_usage
+
+    return disk_usage.stats["refreshes"]
+
+
+def _disk_usage_age() -> float:
+    from scripts.utils.disk_usage_utils import disk_usage
+
+    return disk_usage.age() or 0.0
+
+
+registry.counter("docker_df_calls_total", "System df calls made for the disk usage snapshot.", function=_disk_usage_refreshes)
+registry.gauge("docker_disk_usage_snapshot_age_seconds", "Age of the disk usage snapshot served to listings.", function=_disk_usage_age)
+
+
+def _log_records_dropped() -> int:
+    from scripts.logging.logger import queue_handler
+
+    return queue_handler.dropped
+
+
+registry.counter("log_records_dropped_total", "Log records dropped because the logging queue was full.", function=_log_records_dropped)
@@ -1,18 +1,96 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import threading
+from typing import Any, Dict, Optional
+from pymongo import MongoClient, AsyncMongoClient
+from pymongo.errors import PyMongoError
 from scripts.constants.app_configuration import settings
 from scripts.logging.logger import logger
+from scripts.utils.metrics_utils import mongo_command_metrics
+
+
+def client_options() -> Dict[str, Any]:
+    write_concern = settings.MONGODB_WRITE_CONCERN
+    if write_concern is not None and write_concern.isdigit():
+        write_concern = int(write_concern)
+
+    options = {
+        "tls": settings.MONGODB_TLS,
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "w": write_concern,
+        "journal": settings.MONGODB_WRITE_CONCERN_JOURNAL,
+        "readConcernLevel": settings.MONGODB_READ_CONCERN,
+        "readPreference": settings.MONGODB_READ_PREFERENCE,
+    }
+    if settings.METRICS_ENABLED:
+        options["event_listeners"] = [mongo_command_metrics]
+    return {k: v for k, v in options.items() if v is not None}
+
 
 class MongoDBConnection:
+    """Process-wide MongoDB access.
+
+    The sync and async clients are created on first use and share the pool settings
+    from ``Settings``; use the module-level ``mongo`` instance rather than creating
+    new connections.
+    """
+
     def __init__(self):
+        self._client: Optional[MongoClient] = None
+        self._async_client: Optional[AsyncMongoClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> MongoClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(settings.MONGODB_URL, connect=False, **client_options())
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncMongoClient:
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = AsyncMongoClient(settings.MONGODB_URL, connect=False, **client_options())
+        return self._async_client
+
+    @property
+    def db(self):
+        return self.client[settings.MONGODB_DATABASE]
+
+    @property
+    def async_db(self):
+        return self.async_client[settings.MONGODB_DATABASE]
+
+    def get_collection(self, collection_name: str):
+        return self.db[collection_name]
+
+    def get_async_collection(self, collection_name: str):
+        return self.async_db[collection_name]
+
+    async def connect(self) -> bool:
         try:
-            self.client = MongoClient(settings.MONGODB_URL, tls=True)
-            self.db = self.client[settings.MONGODB_DATABASE]
-            self.client.admin.command('ping')
+            await self.async_client.admin.command("ping")
             logger.info("Connected successfully to MongoDB Atlas.")
-        except ConnectionFailure as e:
+            return True
+        except PyMongoError as e:
             logger.error(f"Failed to connect to MongoDB Atlas: {e}")
-            raise
+            return False
 
-    def get_collection(self, collection_name: str):
-        return self.db[collection_name]
+    async def close(self):
+        with self._lock:
+            client, async_client = self._client, self._async_client
+            self._client, self._async_client = None, None
+        if async_client is not None:
+            await async_client.close()
+        if client is not None:
+            client.close()
+
+
+mongo = MongoDBConnection()
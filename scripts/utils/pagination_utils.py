@@ -0,0 +1,131 @@
+import base64
+import binascii
+import re
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+from scripts.constants.app_constants import INVALID_CURSOR, INVALID_FIELDS
+
+
+def encode_cursor(document: Dict[str, Any], sort_fields: Sequence[str]) -> str:
+    """An opaque cursor holding the sort-key values of the last document on a page."""
+    values = json_util.dumps([document.get(field) for field in sort_fields])
+    return base64.urlsafe_b64encode(values.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_fields: Sequence[str]) -> List[Any]:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail=INVALID_CURSOR)
+    if not isinstance(values, list) or len(values) != len(sort_fields):
+        raise HTTPException(status_code=400, detail=INVALID_CURSOR)
+    return values
+
+
+def keyset_filter(sort_fields: Sequence[str], values: Sequence[Any], descending: bool) -> Dict[str, Any]:
+    """Match documents strictly after ``values`` in ``sort_fields`` order.
+
+    For ``(created_time, _id)`` descending this is
+    ``created_time < t OR (created_time == t AND _id < id)``, which an index on the
+    same keys answers with a single range scan from the cursor position.
+    """
+    op = "$lt" if descending else "$gt"
+    clauses = []
+    for i, field in enumerate(sort_fields):
+        clause = {sort_fields[j]: values[j] for j in range(i)}
+        clause[field] = {op: values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def time_range(created_after: Optional[datetime], created_before: Optional[datetime]) -> Dict[str, datetime]:
+    bounds = {}
+    if created_after is not None:
+        bounds["$gte"] = created_after
+    if created_before is not None:
+        bounds["$lt"] = created_before
+    return bounds
+
+
+def object_id_range(created_after: Optional[datetime], created_before: Optional[datetime]) -> Dict[str, ObjectId]:
+    """A creation-time range on ``_id`` for collections that have no timestamp field."""
+    return {op: ObjectId.from_datetime(value) for op, value in time_range(created_after, created_before).items()}
+
+
+def prefix_pattern(prefix: str) -> Dict[str, str]:
+    """An anchored regex, which Mongo answers with an index range scan."""
+    return {"$regex": f"^{re.escape(prefix)}"}
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(wanted) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"{INVALID_FIELDS}: {', '.join(unknown)}")
+    return wanted
+
+
+class KeysetQuery:
+    """A filtered, projected query over ``collection`` ordered by ``sort_fields``.
+
+    Pages are fetched with a range filter from the previous page's last document
+    instead of ``skip``, so every page costs the same however deep it is, and
+    ``iterate`` walks the whole result in batches for exports.
+    """
+
+    def __init__(
+        self,
+        collection,
+        query: Dict[str, Any],
+        sort_fields: Sequence[str],
+        fields: Optional[List[str]],
+        default_fields: Sequence[str],
+        descending: bool = True,
+        cursor: Optional[str] = None,
+    ):
+        self.collection = collection
+        self.sort_fields = list(sort_fields)
+        self.descending = descending
+        self.fields = fields or list(default_fields)
+        self.query = dict(query)
+        if cursor:
+            after = keyset_filter(self.sort_fields, decode_cursor(cursor, self.sort_fields), descending)
+            self.query = {"$and": [self.query, after]} if self.query else after
+
+    @property
+    def sort(self) -> List[Tuple[str, int]]:
+        direction = DESCENDING if self.descending else ASCENDING
+        return [(field, direction) for field in self.sort_fields]
+
+    @property
+    def projection(self) -> Dict[str, int]:
+        # Sort keys are always fetched so the next cursor can be built.
+        projection = {field: 1 for field in [*self.fields, *self.sort_fields]}
+        if "_id" not in projection:
+            projection["_id"] = 0
+        return projection
+
+    def serialize(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        item = {field: document.get(field) for field in self.fields if field in document}
+        if isinstance(item.get("_id"), ObjectId):
+            item["_id"] = str(item["_id"])
+        return item
+
+    async def page(self, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of ``limit`` items and the cursor for the next page (``None`` on the last one)."""
+        documents = await self.collection.find(self.query, self.projection, sort=self.sort, limit=limit + 1).to_list(None)
+        next_cursor = encode_cursor(documents[limit - 1], self.sort_fields) if len(documents) > limit else None
+        return [self.serialize(d) for d in documents[:limit]], next_cursor
+
+    async def iterate(self, batch_size: int, limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self.collection.find(self.query, self.projection, sort=self.sort, batch_size=batch_size, limit=limit or 0)
+        try:
+            async for document in cursor:
+                yield self.serialize(document)
+        finally:
+            await cursor.close()
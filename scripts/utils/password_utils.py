@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import PASSWORD_HASHER_BUSY
+from scripts.logging.logger import logger
+
+
+_contexts = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    # Built once per worker process and cost setting.
+    if rounds not in _contexts:
+        _contexts[rounds] = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    return _contexts[rounds]
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def verify_password(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """Check ``password`` and, when the stored hash uses other settings, return a fresh hash too."""
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool so it never competes with request handling.
+
+    At most ``PASSWORD_HASH_MAX_PENDING`` hash/verify calls may be running or queued;
+    beyond that callers get a 503 with ``Retry-After`` instead of queueing without
+    bound. With ``PASSWORD_HASH_WORKERS=0`` the work runs in the default threadpool.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.stats = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+
+    @property
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and settings.PASSWORD_HASH_WORKERS > 0:
+            # "spawn" so workers never inherit the event loop or open sockets of this process.
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started password hashing pool with {settings.PASSWORD_HASH_WORKERS} workers")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=PASSWORD_HASHER_BUSY,
+                headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(hash_password, password, settings.BCRYPT_ROUNDS)
+        self.stats["hashed"] += 1
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored hash should be replaced."""
+        valid, new_hash = await self._run(verify_password, password, hashed, settings.BCRYPT_ROUNDS)
+        self.stats["verified"] += 1
+        if new_hash:
+            self.stats["rehashed"] += 1
+        return valid, new_hash
+
+    async def shutdown(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from cachetools import TTLCache
+from scripts.constants.app_configuration import settings
+from scripts.utils.docker_utils import get_docker_client, auth_scope, image_reference, parse_repository_tag, DockerNotFound
+from scripts.utils.stream_utils import EventLog
+from scripts.logging.logger import logger
+
+
+class PullOperation:
+    """One in-flight pull shared by every caller that asked for the same reference."""
+
+    def __init__(self, reference: str, scope: str = ""):
+        self.reference = reference
+        self.scope = scope
+        self.started = time.time()
+        self.waiters = 0
+        self.log = EventLog(settings.IMAGE_PULL_MAX_EVENTS)
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+
+
+class PullCoordinator:
+    """Single-flight image pulls.
+
+    Concurrent pulls of the same reference join the pull already running instead of
+    starting another one, and all of them see the same layer progress and result.
+    The pull itself runs as its own task, so a caller going away does not cancel it
+    for the others. Resolved image IDs are cached for ``IMAGE_PULL_RESULT_CACHE_SECONDS``
+    so an immediate repeat only inspects the local image.
+
+    Pulls are shared per reference and registry identity: a caller only joins, or
+    reuses the result of, a pull made with the same credentials (or anonymously
+    when it has none), so nobody gets through a registry check on someone else's login.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, str], PullOperation] = {}
+        self._results = TTLCache(maxsize=settings.IMAGE_PULL_RESULT_CACHE_SIZE, ttl=settings.IMAGE_PULL_RESULT_CACHE_SECONDS)
+        self.stats = {"pulls": 0, "joined": 0, "cached": 0}
+
+    async def _cached(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        image_id = self._results.get(key)
+        if image_id is None:
+            return None
+        try:
+            return await get_docker_client().inspect_image(image_id)
+        except DockerNotFound:
+            self._results.pop(key, None)
+            return None
+
+    def invalidate(self, reference: Optional[str] = None):
+        if reference is None:
+            self._results.clear()
+            return
+        reference = image_reference(reference)
+        for key in [key for key in self._results if key[0] == reference]:
+            self._results.pop(key, None)
+
+    async def _run(self, operation: PullOperation, auth_config: Optional[Dict[str, Any]]):
+        client = get_docker_client()
+        repository, tag = parse_repository_tag(operation.reference)
+        try:
+            async for event in client.pull_events(repository, tag, auth_config):
+                await operation.log.append(event)
+            image = await client.inspect_image(operation.reference)
+            self._results[(operation.reference, operation.scope)] = image["Id"]
+            operation.result.set_result(image)
+            logger.info(f"Pulled {operation.reference} for {operation.waiters} waiter(s) in {time.time() - operation.started:.2f}s")
+        except asyncio.CancelledError:
+            operation.result.cancel()
+            raise
+        except Exception as e:
+            operation.result.set_exception(e)
+        finally:
+            self._inflight.pop((operation.reference, operation.scope), None)
+            await operation.log.close()
+
+    def start(self, repository: str, auth_config: Optional[Dict[str, Any]] = None) -> Tuple[PullOperation, bool]:
+        """Join the running pull for ``repository`` or start one. Returns ``(operation, joined)``."""
+        key = (image_reference(repository), auth_scope(auth_config))
+        operation = self._inflight.get(key)
+        if operation is not None:
+            operation.waiters += 1
+            self.stats["joined"] += 1
+            return operation, True
+
+        operation = PullOperation(*key)
+        operation.waiters = 1
+        self._inflight[key] = operation
+        self.stats["pulls"] += 1
+        operation.task = asyncio.create_task(self._run(operation, auth_config))
+        # Retrieve the exception even if every waiter went away, so it is not reported as unhandled.
+        operation.result.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return operation, False
+
+    async def pull(self, repository: str, auth_config: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], str]:
+        """Pull ``repository`` and return ``(image, how)`` where ``how`` is ``pulled``, ``joined`` or ``cached``."""
+        cached = await self._cached((image_reference(repository), auth_scope(auth_config)))
+        if cached is not None:
+            self.stats["cached"] += 1
+            return cached, "cached"
+        operation, joined = self.start(repository, auth_config)
+        image = await asyncio.shield(operation.result)
+        return image, "joined" if joined else "pulled"
+
+    async def progress(self, repository: str, auth_config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the shared layer progress for a pull, ending with a ``done`` or ``error`` item."""
+        reference = image_reference(repository)
+        cached = await self._cached((reference, auth_scope(auth_config)))
+        if cached is not None:
+            self.stats["cached"] += 1
+            yield {"type": "done", "reference": reference, "id": cached["Id"], "tags": cached.get("RepoTags") or [], "source": "cached"}
+            return
+
+        operation, joined = self.start(repository, auth_config)
+        async for seq, event in operation.log.follow():
+            yield {"type": "progress", "seq": seq, "event": event}
+        try:
+            image = await asyncio.shield(operation.result)
+        except Exception as e:
+            yield {"type": "error", "reference": reference, "error": str(e)}
+            return
+        yield {"type": "done", "reference": reference, "id": image["Id"], "tags": image.get("RepoTags") or [], "source": "joined" if joined else "pulled"}
+
+    async def shutdown(self):
+        tasks = [op.task for op in self._inflight.values() if op.task and not op.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+image_pulls = PullCoordinator()
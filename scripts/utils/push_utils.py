@@ -0,0 +1,211 @@
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from cachetools import TTLCache
+from scripts.constants.app_configuration import settings
+from scripts.utils.docker_utils import get_docker_client, auth_scope, image_reference, parse_repository_tag, registry_for
+from scripts.utils.inventory_utils import inventory
+from scripts.logging.logger import logger
+
+
+# Docker's per-layer statuses, normalised; the registry already had the layer for the last two.
+LAYER_STATUSES = {
+    "Preparing": "preparing",
+    "Waiting": "waiting",
+    "Pushing": "pushing",
+    "Pushed": "pushed",
+    "Layer already exists": "exists",
+}
+SKIPPED_STATUSES = ("exists", "mounted")
+DIGEST_LINE = re.compile(r"^(?P<tag>\S+): digest: (?P<digest>sha256:[0-9a-f]+) size: (?P<size>\d+)")
+
+
+class PushTarget:
+    __slots__ = ("local_tag", "reference", "repository")
+
+    def __init__(self, local_tag: str, remote_repo: str):
+        self.local_tag = local_tag
+        self.reference = image_reference(remote_repo)
+        self.repository = parse_repository_tag(self.reference)[0]
+
+
+class LayerProgress:
+    """Decodes one push's progress stream into per-layer events, coalescing byte progress."""
+
+    def __init__(self, target: PushTarget):
+        self.target = target
+        self.layers: Dict[str, str] = {}
+        self.bytes: Dict[str, int] = {}
+        self.digest: Optional[str] = None
+        self.size: Optional[int] = None
+        self._emitted: Dict[str, float] = {}
+
+    def decode(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        status = event.get("status") or ""
+        layer = event.get("id")
+        if event.get("aux"):
+            self.digest = event["aux"].get("Digest") or self.digest
+            self.size = event["aux"].get("Size") or self.size
+            return None
+        if not layer:
+            match = DIGEST_LINE.match(status)
+            if match:
+                self.digest, self.size = match.group("digest"), int(match.group("size"))
+                return None
+            return {"type": "status", "target": self.target.reference, "message": status}
+
+        state = "mounted" if status.startswith("Mounted from") else LAYER_STATUSES.get(status, status.lower())
+        previous = self.layers.get(layer)
+        self.layers[layer] = state
+        detail = event.get("progressDetail") or {}
+        if state == "pushing":
+            self.bytes[layer] = detail.get("total") or detail.get("current", 0)
+            now = time.monotonic()
+            # Byte progress arrives many times a second per layer; pass on one per interval.
+            if previous == "pushing" and now - self._emitted.get(layer, 0.0) < settings.IMAGE_PUSH_PROGRESS_INTERVAL_SECONDS:
+                return None
+            self._emitted[layer] = now
+        decoded = {"type": "layer", "target": self.target.reference, "layer": layer, "status": state}
+        if state in SKIPPED_STATUSES:
+            decoded["skipped"] = True
+        if detail.get("total"):
+            decoded.update(current=detail.get("current", 0), total=detail["total"])
+        return decoded
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "pushed": sum(1 for state in self.layers.values() if state == "pushed"),
+            "skipped": sum(1 for state in self.layers.values() if state in SKIPPED_STATUSES),
+        }
+
+
+class PushCoordinator:
+    """Pushes one or more images, streaming decoded per-layer progress.
+
+    Targets are grouped by remote repository. Each repository's tags are pushed
+    one after another, so after the first every layer is answered with "Layer
+    already exists" instead of being uploaded again; different repositories are
+    pushed in parallel, at most ``IMAGE_PUSH_MAX_CONCURRENT`` across all requests.
+    Layers the registry already has, or mounts from another repository on the
+    same registry, are reported as skipped. A reference pushed from the same
+    image ID with the same credentials within ``IMAGE_PUSH_RESULT_CACHE_SECONDS``
+    is not pushed again unless forced.
+    """
+
+    def __init__(self):
+        self._results = TTLCache(maxsize=settings.IMAGE_PUSH_RESULT_CACHE_SIZE, ttl=settings.IMAGE_PUSH_RESULT_CACHE_SECONDS)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.stats = {"pushes": 0, "cached": 0, "failures": 0, "layers_pushed": 0, "layers_skipped": 0}
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.IMAGE_PUSH_MAX_CONCURRENT)
+        return self._slots
+
+    async def push_one(
+        self,
+        target: PushTarget,
+        emit: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        auth_config: Optional[Dict[str, Any]] = None,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        """Tag and push one target, passing decoded events to ``emit``; returns its ``done`` event."""
+        client = get_docker_client()
+        started = time.monotonic()
+        image_id = (await client.inspect_image(target.local_tag))["Id"]
+        key = (target.reference, auth_scope(auth_config))
+        cached = self._results.get(key)
+        if not force and cached is not None and cached[0] == image_id:
+            self.stats["cached"] += 1
+            return {
+                "type": "done", "target": target.reference, "id": image_id, "digest": cached[1], "size": cached[2], "source": "cached",
+                "layers": {"pushed": 0, "skipped": 0}, "bytes_pushed": 0, "seconds": 0.0,
+            }
+
+        if image_reference(target.local_tag) != target.reference:
+            await client.tag_image(target.local_tag, target.reference)
+            inventory.mark_images()
+        progress = LayerProgress(target)
+        async with self.slots:
+            self.stats["pushes"] += 1
+            async for event in client.push_events(target.reference, auth_config=auth_config):
+                decoded = progress.decode(event)
+                if decoded is not None and emit is not None:
+                    await emit(decoded)
+        counts = progress.counts()
+        self.stats["layers_pushed"] += counts["pushed"]
+        self.stats["layers_skipped"] += counts["skipped"]
+        self._results[key] = (image_id, progress.digest, progress.size)
+        return {
+            "type": "done",
+            "target": target.reference,
+            "id": image_id,
+            "digest": progress.digest,
+            "size": progress.size,
+            "source": "pushed",
+            "layers": counts,
+            "bytes_pushed": sum(progress.bytes.get(layer, 0) for layer, state in progress.layers.items() if state == "pushed"),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    async def push(
+        self,
+        targets: List[PushTarget],
+        auth_configs: Optional[Dict[str, Dict[str, Any]]] = None,
+        parallel: Optional[int] = None,
+        force: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream progress for every target, one ``done`` or ``error`` item each, then a ``summary``.
+
+        ``auth_configs`` maps registries to the credentials to push with; others are pushed anonymously.
+        """
+        started = time.monotonic()
+        lanes: Dict[str, List[PushTarget]] = {}
+        for target in {t.reference: t for t in targets}.values():
+            lanes.setdefault(target.repository, []).append(target)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.IMAGE_PUSH_MAX_BUFFERED_EVENTS)
+        lane_slots = asyncio.Semaphore(max(1, min(parallel or len(lanes), len(lanes))))
+        results: List[Dict[str, Any]] = []
+
+        async def run_lane(lane: List[PushTarget]):
+            async with lane_slots:
+                for target in lane:
+                    try:
+                        auth_config = (auth_configs or {}).get(registry_for(target.repository))
+                        result = await self.push_one(target, queue.put, auth_config, force)
+                    except Exception as e:
+                        self.stats["failures"] += 1
+                        logger.warning(f"Pushing '{target.reference}' failed: {e}")
+                        result = {"type": "error", "target": target.reference, "error": str(e) or type(e).__name__}
+                    results.append(result)
+                    await queue.put(result)
+
+        async def run_all():
+            try:
+                await asyncio.gather(*(run_lane(lane) for lane in lanes.values()))
+            finally:
+                await queue.put(None)
+
+        task = asyncio.create_task(run_all())
+        try:
+            while (item := await queue.get()) is not None:
+                yield item
+        finally:
+            # A client that goes away cancels the pushes it started.
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        done = [r for r in results if r["type"] == "done"]
+        yield {
+            "type": "summary",
+            "targets": len(results),
+            "succeeded": len(done),
+            "failed": len(results) - len(done),
+            "layers_pushed": sum(r["layers"]["pushed"] for r in done),
+            "layers_skipped": sum(r["layers"]["skipped"] for r in done),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+
+image_pushes = PushCoordinator()
@@ -1,36 +1,203 @@
-from fastapi import HTTPException
+import math
+import time
 from datetime import datetime, timedelta
-from scripts.utils.mongo_utils import MongoDBConnection
+from typing import Dict, Tuple
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from scripts.utils.mongo_utils import mongo
 from scripts.constants.app_configuration import settings
-from scripts.constants.app_constants import RATE_LIMIT_EXCEEDED
+from scripts.constants.app_constants import (
+    RATE_LIMIT_EXCEEDED,
+    RATE_LIMIT_COLLECTION,
+    RATE_LIMIT_COUNTER_COLLECTION
+)
+from scripts.models.rate_limit_model import RateLimitStatus
 from scripts.logging.logger import logger
+from scripts.utils.shared_store_utils import shared_store
 
-mongo = MongoDBConnection()
 
 MAX_CONTAINERS_PER_HOUR = settings.DEFAULT_MAX_CONTAINERS_PER_HOUR
+# Carries user IDs whose policy or counters changed, so other workers drop their copies.
+RATE_LIMIT_CHANNEL = "rate-limit"
 
-def check_rate_limit(user_id: str) -> bool:
 
-    try:
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-        containers_collection = mongo.get_collection("user_containers")
+class _WindowState:
+    __slots__ = ("limit", "window", "window_start", "current", "previous")
+
+    def __init__(self, limit: int, window: int, window_start: int, current: int = 0, previous: int = 0):
+        self.limit = limit
+        self.window = window
+        self.window_start = window_start
+        self.current = current
+        self.previous = previous
+
+    def roll(self, window_start: int):
+        if window_start == self.window_start:
+            return
+        self.previous = self.current if window_start - self.window_start == self.window else 0
+        self.current = 0
+        self.window_start = window_start
+
+    def estimate(self, now: float) -> float:
+        weight = 1 - (now - self.window_start) / self.window
+        return self.previous * max(weight, 0.0) + self.current
+
+    def retry_after(self, now: float) -> int:
+        # The next request fits once previous * weight + current + 1 <= limit.
+        if self.current + 1 > self.limit or not self.previous:
+            wait = self.window_start + self.window - now
+        else:
+            wait = self.window_start + self.window * (1 - (self.limit - self.current - 1) / self.previous) - now
+        return max(1, math.ceil(wait))
+
+    def status(self, now: float, allowed: bool) -> RateLimitStatus:
+        return RateLimitStatus(
+            allowed=allowed,
+            limit=self.limit,
+            remaining=max(0, math.floor(self.limit - self.estimate(now))),
+            reset=self.window_start + self.window,
+            retry_after=None if allowed else self.retry_after(now),
+            window_start=self.window_start if allowed else None,
+        )
+
+
+class SlidingWindowRateLimiter:
+    """Sliding-window counter limiter for container creation.
+
+    Each user has a fixed-window counter document in ``rate_limit_counters`` that is
+    bumped with an atomic ``findOneAndUpdate``/``$inc``; the previous window is
+    weighted by how much of it still overlaps the sliding window. Counts are mirrored
+    in memory so requests that are already over the limit are rejected without a
+    round-trip, and policies from ``rate_limits`` are cached for
+    ``RATE_LIMIT_POLICY_CACHE_SECONDS``.
+    """
+
+    def __init__(self):
+        self._policies: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._windows: Dict[str, _WindowState] = {}
+        self.stats = {"policy_hits": 0, "policy_misses": 0}
+
+    @property
+    def counters(self):
+        return mongo.get_async_collection(RATE_LIMIT_COUNTER_COLLECTION)
+
+    async def get_policy(self, user_id: str) -> Tuple[int, int]:
+        cached = self._policies.get(user_id)
+        if cached and cached[1] > time.monotonic():
+            self.stats["policy_hits"] += 1
+            return cached[0]
+        self.stats["policy_misses"] += 1
+
+        doc = await mongo.get_async_collection(RATE_LIMIT_COLLECTION).find_one(
+            {"user_id": user_id}, {"_id": 0, "limit": 1, "time_window": 1}
+        )
+        if doc and doc.get("limit") is not None and doc.get("time_window"):
+            policy = (int(doc["limit"]), int(doc["time_window"]))
+        else:
+            policy = (MAX_CONTAINERS_PER_HOUR, settings.RATE_LIMIT_DEFAULT_WINDOW_SECONDS)
+
+        self._policies[user_id] = (policy, time.monotonic() + settings.RATE_LIMIT_POLICY_CACHE_SECONDS)
+        return policy
 
-        container_count = containers_collection.count_documents({
-            "user_id": user_id,
-            "created_time": {"$gte": one_hour_ago}
-        })
+    def invalidate_policy(self, user_id: str):
+        self._policies.pop(user_id, None)
+        self._windows.pop(user_id, None)
 
-        logger.debug(f"User {user_id} has created {container_count} containers in the last hour.")
+    async def _load_state(self, user_id: str, limit: int, window: int, window_start: int) -> _WindowState:
+        state = self._windows.get(user_id)
+        if state is not None and state.limit == limit and state.window == window and (
+            state.window_start == window_start or not shared_store.enabled
+        ):
+            # With several workers only Mongo knows the closed window's total, so a roll reloads it.
+            state.roll(window_start)
+            return state
 
-        if container_count >= MAX_CONTAINERS_PER_HOUR:
-            logger.warning(f"Rate limit exceeded for user {user_id}. Limit: {MAX_CONTAINERS_PER_HOUR} per hour.")
-            raise HTTPException(
-                status_code=429,
-                detail=RATE_LIMIT_EXCEEDED.format(limit=MAX_CONTAINERS_PER_HOUR)
-            )
+        counts = {}
+        async for doc in self.counters.find(
+            {"user_id": user_id, "window": window, "window_start": {"$in": [window_start - window, window_start]}},
+            {"_id": 0, "window_start": 1, "count": 1}
+        ):
+            counts[doc["window_start"]] = doc["count"]
 
-        return True
+        state = _WindowState(limit, window, window_start, counts.get(window_start, 0), counts.get(window_start - window, 0))
+        self._windows[user_id] = state
+        return state
 
+    async def _increment(self, user_id: str, state: _WindowState, amount: int) -> int:
+        doc = await self.counters.find_one_and_update(
+            {"user_id": user_id, "window": state.window, "window_start": state.window_start},
+            {
+                "$inc": {"count": amount},
+                "$setOnInsert": {
+                    "expires_at": datetime.utcfromtimestamp(state.window_start) + timedelta(seconds=2 * state.window)
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["count"]
+
+    async def acquire(self, user_id: str) -> RateLimitStatus:
+        limit, window = await self.get_policy(user_id)
+        now = time.time()
+        window_start = int(now // window * window)
+        state = await self._load_state(user_id, limit, window, window_start)
+
+        if state.estimate(now) + 1 > limit:
+            return state.status(now, allowed=False)
+
+        state.current = await self._increment(user_id, state, 1)
+        if state.estimate(now) > limit:
+            state.current = await self._increment(user_id, state, -1)
+            return state.status(now, allowed=False)
+
+        return state.status(now, allowed=True)
+
+    async def release(self, user_id: str, rate_status: RateLimitStatus):
+        """Give back the slot ``acquire`` charged for ``rate_status`` when the guarded operation failed.
+
+        The slot is returned to the window it was taken from, even if a new window has started since.
+        """
+        if not rate_status.allowed or rate_status.window_start is None:
+            return
+        window = rate_status.reset - rate_status.window_start
+        doc = await self.counters.find_one_and_update(
+            {"user_id": user_id, "window": window, "window_start": rate_status.window_start, "count": {"$gt": 0}},
+            {"$inc": {"count": -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            return
+        state = self._windows.get(user_id)
+        if state is not None and state.window == window:
+            if state.window_start == rate_status.window_start:
+                state.current = doc["count"]
+            elif state.window_start - window == rate_status.window_start:
+                state.previous = doc["count"]
+        # Other workers may be rejecting on a count that no longer holds.
+        await shared_store.publish(RATE_LIMIT_CHANNEL, user_id)
+
+
+rate_limiter = SlidingWindowRateLimiter()
+shared_store.subscribe(RATE_LIMIT_CHANNEL, rate_limiter.invalidate_policy)
+
+
+async def check_rate_limit(user_id: str) -> RateLimitStatus:
+
+    try:
+        rate_status = await rate_limiter.acquire(user_id)
     except Exception as e:
         logger.error(f"Error checking rate limit for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    logger.debug(f"User {user_id} has {rate_status.remaining} of {rate_status.limit} container creations left.")
+
+    if not rate_status.allowed:
+        logger.warning(f"Rate limit exceeded for user {user_id}. Limit: {rate_status.limit}.")
+        raise HTTPException(
+            status_code=429,
+            detail=RATE_LIMIT_EXCEEDED,
+            headers=rate_status.headers()
+        )
+
+    return rate_status
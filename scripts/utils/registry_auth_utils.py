@@ -0,0 +1,148 @@
+import base64
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import REGISTRY_CREDENTIAL_COLLECTION
+from scripts.utils.docker_utils import DEFAULT_REGISTRY, get_docker_client
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.shared_store_utils import shared_store
+from scripts.logging.logger import logger
+
+
+# Carries the (user, registry) pairs whose credentials changed, so other workers drop their copies.
+REGISTRY_AUTH_CHANNEL = "registry-auth"
+
+# Cached "this user has no credentials for this registry", so anonymous pulls skip Mongo too.
+_ANONYMOUS: Dict[str, Any] = {}
+
+
+def _fernet() -> MultiFernet:
+    """``REGISTRY_CREDENTIALS_KEY`` is a comma-separated list of Fernet keys; the first encrypts, all decrypt.
+
+    Without one, a key is derived from ``JWT_SECRET`` so stored credentials still never sit in Mongo in clear.
+    """
+    keys = [key.strip() for key in settings.REGISTRY_CREDENTIALS_KEY.split(",") if key.strip()]
+    if not keys:
+        keys = [base64.urlsafe_b64encode(hashlib.sha256(f"registry-credentials:{settings.JWT_SECRET}".encode()).digest()).decode()]
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def normalize_registry(registry: Optional[str]) -> str:
+    if not registry or registry in ("docker.io", "index.docker.io", "registry-1.docker.io"):
+        return DEFAULT_REGISTRY
+    return registry
+
+
+class RegistryCredentialStore:
+    """Registry logins per user, so pulls and pushes run as the user who asked for them.
+
+    A login is checked against the registry once (the daemon's ``/auth``), then
+    the resulting auth config (an identity token when the registry hands one
+    out, otherwise the username and password) is stored encrypted in
+    ``registry_credentials``, keyed by user and registry, until
+    ``REGISTRY_SESSION_SECONDS`` after the login. Pulls, pushes and builds pass
+    the caller's auth config with the request instead of relying on a login on
+    the shared Docker client. Decrypted configs are cached in memory for
+    ``REGISTRY_AUTH_CACHE_SECONDS`` and dropped on every worker at login and logout.
+    """
+
+    def __init__(self):
+        self._fernet: Optional[MultiFernet] = None
+        self._cache = TTLCache(maxsize=settings.REGISTRY_AUTH_CACHE_SIZE, ttl=settings.REGISTRY_AUTH_CACHE_SECONDS)
+        self.stats = {"logins": 0, "hits": 0, "misses": 0}
+
+    @property
+    def collection(self):
+        return mongo.get_async_collection(REGISTRY_CREDENTIAL_COLLECTION)
+
+    @property
+    def fernet(self) -> MultiFernet:
+        if self._fernet is None:
+            self._fernet = _fernet()
+        return self._fernet
+
+    def evict(self, message: Dict[str, str]):
+        self._cache.pop((message["user"], message["registry"]), None)
+
+    async def login(self, user_id: str, username: str, password: str, registry: Optional[str] = None) -> Dict[str, Any]:
+        """Check the credentials with the registry and store them for ``user_id``; raises on rejection."""
+        registry = normalize_registry(registry)
+        auth_config = {"username": username, "password": password, "serveraddress": registry}
+        response = await get_docker_client().check_auth(auth_config)
+        if response.get("IdentityToken"):
+            auth_config = {"identitytoken": response["IdentityToken"], "serveraddress": registry}
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.REGISTRY_SESSION_SECONDS)
+        await self.collection.update_one(
+            {"user_id": user_id, "registry": registry},
+            {
+                "$set": {
+                    "username": username,
+                    "secret": self.fernet.encrypt(json.dumps(auth_config).encode()).decode(),
+                    "updated_time": now,
+                    "expires_at": expires_at,
+                },
+                "$setOnInsert": {"created_time": now},
+            },
+            upsert=True,
+        )
+        self.stats["logins"] += 1
+        self._cache[(user_id, registry)] = (auth_config, time.time() + settings.REGISTRY_SESSION_SECONDS)
+        await shared_store.publish(REGISTRY_AUTH_CHANNEL, {"user": user_id, "registry": registry})
+        return {"registry": registry, "username": username, "expires_at": expires_at, "status": response.get("Status")}
+
+    async def logout(self, user_id: str, registry: Optional[str] = None) -> bool:
+        registry = normalize_registry(registry)
+        result = await self.collection.delete_one({"user_id": user_id, "registry": registry})
+        self._cache.pop((user_id, registry), None)
+        await shared_store.publish(REGISTRY_AUTH_CHANNEL, {"user": user_id, "registry": registry})
+        return result.deleted_count > 0
+
+    async def list_logins(self, user_id: str) -> List[Dict[str, Any]]:
+        """The user's stored logins, without their secrets."""
+        return [
+            doc async for doc in self.collection.find(
+                {"user_id": user_id, "expires_at": {"$gt": datetime.utcnow()}},
+                {"_id": 0, "registry": 1, "username": 1, "updated_time": 1, "expires_at": 1},
+            )
+        ]
+
+    def _decrypt(self, doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self.fernet.decrypt(doc["secret"].encode()))
+        except (InvalidToken, ValueError) as e:
+            # A rotated-out key or a corrupt record; the user has to log in again.
+            logger.warning(f"Stored credentials of '{doc.get('user_id')}' for '{doc.get('registry')}' cannot be decrypted: {e}")
+            return None
+
+    async def auth_config(self, user_id: str, registry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The auth config to send for ``user_id`` on ``registry``, or None to go anonymous."""
+        key = (user_id, normalize_registry(registry))
+        cached: Optional[Tuple[Dict[str, Any], float]] = self._cache.get(key)
+        if cached is not None and cached[1] > time.time():
+            self.stats["hits"] += 1
+            return cached[0] or None
+        self.stats["misses"] += 1
+        doc = await self.collection.find_one({"user_id": key[0], "registry": key[1], "expires_at": {"$gt": datetime.utcnow()}})
+        auth_config = self._decrypt(doc) if doc else None
+        expires = doc["expires_at"].replace(tzinfo=timezone.utc).timestamp() if auth_config else time.time() + settings.REGISTRY_AUTH_CACHE_SECONDS
+        self._cache[key] = (auth_config or _ANONYMOUS, expires)
+        return auth_config
+
+    async def auth_configs(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Every registry the user is logged in to, as a build's ``X-Registry-Config``."""
+        configs = {}
+        async for doc in self.collection.find({"user_id": user_id, "expires_at": {"$gt": datetime.utcnow()}}):
+            auth_config = self._decrypt(doc)
+            if auth_config is not None:
+                configs[doc["registry"]] = auth_config
+        return configs
+
+
+registry_credentials = RegistryCredentialStore()
+shared_store.subscribe(REGISTRY_AUTH_CHANNEL, registry_credentials.evict)
@@ -0,0 +1,408 @@
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from anyio import from_thread
+from scripts.constants.app_configuration import settings
+from scripts.logging.logger import logger
+
+
+WORKER_ID_ENV = "APP_WORKER_ID"
+
+
+class SharedStoreError(Exception):
+    pass
+
+
+def worker_id() -> str:
+    """This worker's index under the supervisor, or the PID when running on its own."""
+    return os.environ.get(WORKER_ID_ENV) or str(os.getpid())
+
+
+class StoreState:
+    """The data behind the shared store: expiring values, bounded logs and counted locks.
+
+    Locks are held per connection, so whatever a worker held is released when its
+    connection closes, including when the worker crashes.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self.logs: Dict[str, Tuple[Deque[Any], List[int], Optional[float]]] = {}
+        self.locks: Dict[str, Counter] = {}
+
+    def _alive(self, expires: Optional[float]) -> bool:
+        return expires is None or expires > time.monotonic()
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    def sweep(self):
+        for key in [k for k, (_, expires) in self.values.items() if not self._alive(expires)]:
+            del self.values[key]
+        for key in [k for k, (_, _, expires) in self.logs.items() if not self._alive(expires)]:
+            del self.logs[key]
+
+    # Values
+
+    def get(self, key: str) -> Any:
+        value, expires = self.values.get(key, (None, None))
+        return value if self._alive(expires) else None
+
+    def mget(self, prefix: str) -> Dict[str, Any]:
+        return {k: v for k, (v, expires) in self.values.items() if k.startswith(prefix) and self._alive(expires)}
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        self.values[key] = (value, self._expiry(ttl))
+        return True
+
+    def delete(self, key: str) -> bool:
+        return self.values.pop(key, None) is not None
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        value = (self.get(key) or 0) + amount
+        self.values[key] = (value, self._expiry(ttl) if ttl else self.values.get(key, (None, None))[1])
+        return value
+
+    # Logs
+
+    def log_append(self, key: str, item: Any, maxlen: int, ttl: Optional[float] = None) -> int:
+        entry = self.logs.get(key)
+        if entry is None or not self._alive(entry[2]):
+            entry = (deque(maxlen=maxlen), [0], None)
+        items, count, _ = entry
+        items.append(item)
+        count[0] += 1
+        self.logs[key] = (items, count, self._expiry(ttl))
+        return count[0]
+
+    def log_read(self, key: str, since: int = 0) -> Dict[str, Any]:
+        """Items from sequence number ``since`` on, with the total count so readers can resume."""
+        items, count, expires = self.logs.get(key, (deque(), [0], None))
+        if not self._alive(expires):
+            items, count = deque(), [0]
+        first = count[0] - len(items)
+        start = max(since, first)
+        return {"first": start, "count": count[0], "items": list(items)[start - first:]}
+
+    # Locks
+
+    def try_acquire(self, name: str, limit: int, holder: int) -> bool:
+        holders = self.locks.setdefault(name, Counter())
+        if sum(holders.values()) >= limit:
+            return False
+        holders[holder] += 1
+        return True
+
+    def restore(self, name: str, count: int, holder: int) -> bool:
+        """Re-register slots a client held before reconnecting, even past ``limit``: it still holds them."""
+        self.locks.setdefault(name, Counter())[holder] += count
+        return True
+
+    def release(self, name: str, holder: int) -> bool:
+        holders = self.locks.get(name)
+        if not holders or holders[holder] <= 0:
+            return False
+        holders[holder] -= 1
+        if holders[holder] == 0:
+            del holders[holder]
+        if not holders:
+            del self.locks[name]
+        return True
+
+    def release_all(self, holder: int):
+        for name in list(self.locks):
+            self.locks[name].pop(holder, None)
+            if not self.locks[name]:
+                del self.locks[name]
+
+
+class SharedStoreServer:
+    """Serves a ``StoreState`` over a unix socket, one JSON message per line.
+
+    Requests are ``{"id", "op", "args"}`` and get ``{"id", "result"}`` or
+    ``{"id", "error"}`` back. A connection that sends ``subscribe`` then receives
+    ``{"channel", "message"}`` pushes for everything published on its channels.
+    This is the on-host stand-in for a Redis-style sidecar; ``main.py`` runs it in
+    its own process when serving with several workers.
+    """
+
+    OPS = ("get", "mget", "set", "delete", "incr", "log_append", "log_read", "try_acquire", "restore", "release")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state = StoreState()
+        self.subscribers: Dict[str, List[asyncio.StreamWriter]] = {}
+        self._ids = itertools.count(1)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        holder = next(self._ids)
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                reply = {"id": request.get("id")}
+                try:
+                    reply["result"] = self._dispatch(request["op"], request.get("args", []), holder, writer)
+                except Exception as e:
+                    reply["error"] = f"{type(e).__name__}: {e}"
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.state.release_all(holder)
+            for writers in self.subscribers.values():
+                if writer in writers:
+                    writers.remove(writer)
+            writer.close()
+
+    def _dispatch(self, op: str, args: List[Any], holder: int, writer: asyncio.StreamWriter) -> Any:
+        if op == "ping":
+            return True
+        if op == "subscribe":
+            for channel in args:
+                self.subscribers.setdefault(channel, []).append(writer)
+            return True
+        if op == "publish":
+            channel, message = args
+            frame = json.dumps({"channel": channel, "message": message}).encode() + b"\n"
+            for subscriber in list(self.subscribers.get(channel, [])):
+                subscriber.write(frame)
+            return len(self.subscribers.get(channel, []))
+        if op in ("try_acquire", "restore", "release"):
+            return getattr(self.state, op)(*args, holder)
+        if op in self.OPS:
+            return getattr(self.state, op)(*args)
+        raise SharedStoreError(f"Unknown operation {op}")
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(5)
+            self.state.sweep()
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, path=self.path, limit=2 ** 24)
+        sweeper = asyncio.create_task(self._sweep())
+        logger.info(f"Shared store listening on {self.path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+
+
+def serve(path: str):
+    """Process entry point for the store sidecar."""
+    try:
+        asyncio.run(SharedStoreServer(path).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+class SharedStore:
+    """Client for the store sidecar, shared by everything in one worker process.
+
+    Disabled unless ``SHARED_STORE_SOCKET`` is set (which ``main.py`` does when it
+    runs several workers): callers check ``enabled`` and keep their in-process
+    state otherwise, and ``publish`` is a no-op. Requests are multiplexed over one
+    connection; subscriptions use a second one that reconnects on its own.
+
+    The store drops a connection's slots when it closes, and a restarted store
+    has lost everything. On reconnecting, the client re-registers the slots it
+    still holds (``try_acquire`` with ``restore=False`` opts out, for leader locks
+    that re-acquire per ``generation`` themselves). Values and logs written
+    before a store restart are gone; their owners rebuild them or treat them as
+    missing.
+    """
+
+    def __init__(self):
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, List[Callable[[Any], Any]]] = {}
+        self._held: Counter = Counter()
+        # Bumped on every new connection; locks taken on an older one are gone.
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.SHARED_STORE_SOCKET)
+
+    async def _connect(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        reconnected = False
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                self._reader, self._writer = await asyncio.open_unix_connection(settings.SHARED_STORE_SOCKET, limit=2 ** 24)
+                self.generation += 1
+                reconnected = self.generation > 1
+                self._reader_task = asyncio.create_task(self._read_replies(self._reader))
+        if reconnected:
+            await self._restore()
+
+    async def _restore(self):
+        held = {name: count for name, count in self._held.items() if count > 0}
+        for name, count in held.items():
+            await self._request("restore", name, count)
+        logger.warning(
+            f"Reconnected to the shared store (generation {self.generation}); restored {sum(held.values())} held slot(s). "
+            "Values and logs written before a store restart are lost"
+        )
+
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        try:
+            while line := await reader.readline():
+                reply = json.loads(line)
+                future = self._pending.pop(reply["id"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    future.set_exception(SharedStoreError(reply["error"]))
+                else:
+                    future.set_result(reply.get("result"))
+        finally:
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(SharedStoreError("Shared store connection closed"))
+            self._pending.clear()
+
+    async def _request(self, op: str, *args) -> Any:
+        if self._writer is None or self._writer.is_closing():
+            await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(json.dumps({"id": request_id, "op": op, "args": args}, default=str).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def ping(self) -> bool:
+        return await self._request("ping")
+
+    async def get(self, key: str) -> Any:
+        return await self._request("get", key)
+
+    async def mget(self, prefix: str) -> Dict[str, Any]:
+        return await self._request("mget", prefix)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return await self._request("set", key, value, ttl)
+
+    async def delete(self, key: str) -> bool:
+        return await self._request("delete", key)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return await self._request("incr", key, amount, ttl)
+
+    async def log_append(self, key: str, item: Any, maxlen: int, ttl: Optional[float] = None) -> int:
+        return await self._request("log_append", key, item, maxlen, ttl)
+
+    async def log_read(self, key: str, since: int = 0) -> Dict[str, Any]:
+        return await self._request("log_read", key, since)
+
+    async def try_acquire(self, name: str, limit: int, restore: bool = True) -> bool:
+        acquired = await self._request("try_acquire", name, limit)
+        if acquired and restore:
+            self._held[name] += 1
+        return acquired
+
+    async def release(self, name: str) -> bool:
+        if self._held[name] > 0:
+            self._held[name] -= 1
+        if not self._held[name]:
+            del self._held[name]
+        return await self._request("release", name)
+
+    @asynccontextmanager
+    async def slot(self, name: str, limit: int, poll_interval: float = 0.25):
+        """Hold one of ``limit`` slots named ``name`` across all workers, waiting for a free one."""
+        while not await self.try_acquire(name, limit):
+            await asyncio.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            try:
+                await asyncio.shield(self.release(name))
+            except SharedStoreError:
+                pass
+
+    async def publish(self, channel: str, message: Any):
+        if not self.enabled:
+            return
+        try:
+            await self._request("publish", channel, message)
+        except (SharedStoreError, OSError) as e:
+            logger.warning(f"Could not publish to '{channel}': {e}")
+
+    def publish_from_thread(self, channel: str, message: Any):
+        """``publish`` for sync handlers, which run on AnyIO worker threads."""
+        if self.enabled:
+            from_thread.run(self.publish, channel, message)
+
+    def subscribe(self, channel: str, handler: Callable[[Any], Optional[Awaitable[None]]]):
+        """Call ``handler`` with every message published on ``channel``, by any worker (this one included)."""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def _listen(self):
+        backoff = 0.5
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_unix_connection(settings.SHARED_STORE_SOCKET, limit=2 ** 24)
+                writer.write(json.dumps({"id": 0, "op": "subscribe", "args": list(self._handlers)}).encode() + b"\n")
+                await writer.drain()
+                backoff = 0.5
+                while line := await reader.readline():
+                    frame = json.loads(line)
+                    for handler in self._handlers.get(frame.get("channel"), []):
+                        try:
+                            result = handler(frame["message"])
+                            if asyncio.iscoroutine(result):
+                                await result
+                        except Exception as e:
+                            logger.warning(f"Shared store handler for '{frame['channel']}' failed: {e}")
+                logger.warning("Shared store subscription closed; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ValueError) as e:
+                logger.warning(f"Shared store subscription failed, retrying in {backoff:.1f}s: {e}")
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 10.0)
+
+    def start(self):
+        if self.enabled and self._handlers and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        tasks = [t for t in (self._listener_task, self._reader_task) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._listener_task = self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+shared_store = SharedStore()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else settings.SHARED_STORE_SOCKET)
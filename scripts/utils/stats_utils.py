@@ -0,0 +1,314 @@
+import asyncio
+import os
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import CONTAINER_COLLECTION, CONTAINER_OWNER_LABEL
+from scripts.utils.docker_utils import DockerNotFound
+from scripts.utils.fleet_utils import fleet
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.mongo_utils import mongo
+from scripts.utils.stream_utils import bounded_as_completed
+from scripts.utils.shared_store_utils import shared_store
+from scripts.logging.logger import logger
+
+
+FIELDS = (
+    "timestamp",
+    "cpu_percent",
+    "memory_usage",
+    "memory_limit",
+    "network_rx_bps",
+    "network_tx_bps",
+    "block_read_bps",
+    "block_write_bps",
+    "pids",
+)
+
+# Fields that are summed when containers are aggregated per user and for the host.
+SUMMED_FIELDS = FIELDS[1:]
+RATE_FIELDS = ("network_rx_bps", "network_tx_bps", "block_read_bps", "block_write_bps")
+
+STATS_CHANNEL = "stats"
+STATS_LEADER_LOCK = "stats-leader"
+
+# How long after it is first seen running an unlabelled container is looked up again each round, while its record may still be pending.
+OWNER_LOOKUP_WINDOW_SECONDS = 60
+
+
+class RingBuffer:
+    """Fixed-size sample history with one ``array('d')`` per field.
+
+    A sample costs ``len(FIELDS) * 8`` bytes no matter how many containers are
+    tracked, and the oldest sample is overwritten once the buffer is full.
+    """
+
+    __slots__ = ("size", "head", "count", "columns")
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.head = 0
+        self.count = 0
+        self.columns = {field: array("d", bytes(8 * self.size)) for field in FIELDS}
+
+    def append(self, sample: Dict[str, float]):
+        for field, column in self.columns.items():
+            column[self.head] = sample.get(field, 0.0)
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def _row(self, index: int) -> Dict[str, float]:
+        return {field: column[index] for field, column in self.columns.items()}
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        if not self.count:
+            return None
+        return self._row((self.head - 1) % self.size)
+
+    def history(self, since: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, float]]:
+        """Samples oldest first, optionally only those newer than ``since`` and at most the last ``limit``."""
+        start = (self.head - self.count) % self.size
+        rows = [self._row((start + i) % self.size) for i in range(self.count)]
+        if since is not None:
+            rows = [row for row in rows if row["timestamp"] > since]
+        if limit is not None and limit >= 0:
+            rows = rows[-limit:] if limit else []
+        return rows
+
+
+def _cpu_totals(raw: Dict[str, Any]) -> Tuple[float, float, int]:
+    cpu = raw.get("cpu_stats") or {}
+    usage = cpu.get("cpu_usage") or {}
+    online = cpu.get("online_cpus") or len(usage.get("percpu_usage") or []) or 1
+    return float(usage.get("total_usage") or 0), float(cpu.get("system_cpu_usage") or 0), online
+
+
+def _io_totals(raw: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    networks = (raw.get("networks") or {}).values()
+    rx = sum(n.get("rx_bytes", 0) for n in networks)
+    tx = sum(n.get("tx_bytes", 0) for n in networks)
+    block = (raw.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+    read = sum(e.get("value", 0) for e in block if str(e.get("op", "")).lower() == "read")
+    write = sum(e.get("value", 0) for e in block if str(e.get("op", "")).lower() == "write")
+    return float(rx), float(tx), float(read), float(write)
+
+
+def _memory_usage(raw: Dict[str, Any]) -> Tuple[float, float]:
+    memory = raw.get("memory_stats") or {}
+    detail = memory.get("stats") or {}
+    # Same as the docker CLI: page cache is not counted as used memory.
+    cache = detail.get("inactive_file", detail.get("total_inactive_file", detail.get("cache", 0)))
+    return float(max(memory.get("usage", 0) - cache, 0)), float(memory.get("limit", 0))
+
+
+def sample_counters(raw: Dict[str, Any]) -> List[float]:
+    """The raw counters a sample is computed from, kept flat so they travel cheaply between workers."""
+    pids = float((raw.get("pids_stats") or {}).get("current") or 0)
+    return [*_cpu_totals(raw), *_io_totals(raw), *_memory_usage(raw), pids]
+
+
+class ContainerStats:
+    """History for one container plus the raw counters of its previous sample."""
+
+    __slots__ = ("id", "name", "owner", "history", "previous")
+
+    def __init__(self, container_id: str, name: str, owner: Optional[str]):
+        self.id = container_id
+        self.name = name
+        self.owner = owner
+        self.history = RingBuffer(settings.STATS_HISTORY_SIZE)
+        self.previous: Optional[Tuple[float, List[float]]] = None
+
+    def add(self, raw: Dict[str, Any], now: float) -> Dict[str, float]:
+        return self.add_counters(sample_counters(raw), now)
+
+    def add_counters(self, counters: List[float], now: float) -> Dict[str, float]:
+        cpu_total, system_total, online = counters[0:3]
+        io = counters[3:7]
+        memory_usage, memory_limit, pids = counters[7:10]
+        sample = {
+            "timestamp": now,
+            "memory_usage": memory_usage,
+            "memory_limit": memory_limit,
+            "pids": pids,
+        }
+        # One-shot samples carry no precpu_stats, so rates come from our own previous sample.
+        if self.previous is not None:
+            then, before = self.previous
+            elapsed = now - then
+            cpu_delta, system_delta = cpu_total - before[0], system_total - before[1]
+            if cpu_delta >= 0 and system_delta > 0:
+                sample["cpu_percent"] = cpu_delta / system_delta * online * 100.0
+            if elapsed > 0:
+                for field, current, prior in zip(RATE_FIELDS, io, before[3:7]):
+                    sample[field] = max(current - prior, 0.0) / elapsed
+        self.previous = (now, counters)
+        self.history.append(sample)
+        return sample
+
+
+class StatsCollector:
+    """Samples every running container each ``STATS_INTERVAL_SECONDS``.
+
+    Containers come from the inventory, across every host of the fleet, and are
+    sampled on their own host concurrently (at most ``STATS_MAX_CONCURRENCY`` at a time). Each container, each owner and the host
+    keep a ``STATS_HISTORY_SIZE`` ring buffer, so reads are served from memory and
+    never call the daemon. Owners come from the ``CONTAINER_OWNER_LABEL`` label,
+    or for containers without it (claimed from the warm pool, which are created
+    before their owner is known) from their ``user_containers`` record.
+
+    With several workers only one of them, the holder of the ``stats-leader``
+    lock in the shared store, calls the daemon. It publishes each round's raw
+    counters and every worker builds the same history from them.
+    """
+
+    def __init__(self):
+        self.containers: Dict[str, ContainerStats] = {}
+        self.users: Dict[str, RingBuffer] = {}
+        self.host = RingBuffer(settings.STATS_HISTORY_SIZE)
+        self.last_sample: Optional[float] = None
+        self.stats = {"rounds": 0, "samples": 0, "errors": 0, "last_round_ms": 0.0}
+        self._task: Optional[asyncio.Task] = None
+        self._leader_generation: Optional[int] = None
+        # Unlabelled containers' owners and when each was first seen running.
+        self._owners: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def start(self):
+        if settings.STATS_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.sample()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Container stats round failed: {e}")
+            await asyncio.sleep(max(settings.STATS_INTERVAL_SECONDS - (time.monotonic() - started), 0.1))
+
+    async def _fetch(self, container: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        try:
+            host = fleet.hosts.get(container.get("Host")) or fleet.primary
+            return container, await host.client.container_stats(container["Id"])
+        except DockerNotFound:
+            return container, None
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.debug(f"Stats sample for container {container['Id'][:12]} failed: {e}")
+            return container, None
+
+    async def _lead(self) -> bool:
+        """Whether this worker samples for all of them; the lock is held until its store connection closes."""
+        if self._leader_generation != shared_store.generation:
+            self._leader_generation = None
+            if await shared_store.try_acquire(STATS_LEADER_LOCK, 1, restore=False):
+                self._leader_generation = shared_store.generation
+                logger.info(f"Worker {os.getpid()} is now sampling container stats")
+        return self._leader_generation is not None
+
+    async def sample(self):
+        """Take one sample of every running container and update the aggregates."""
+        if shared_store.enabled and not await self._lead():
+            return
+        started = time.monotonic()
+        running = await inventory.list_containers()
+        now = time.time()
+        rows = []
+        owners = await self._owners_of(running, now)
+        async for container, raw in bounded_as_completed(running, self._fetch, settings.STATS_MAX_CONCURRENCY):
+            if raw is None:
+                continue
+            container_id = container["Id"]
+            name = container["Names"][0].lstrip("/") if container.get("Names") else container_id[:12]
+            owner = (container.get("Labels") or {}).get(CONTAINER_OWNER_LABEL) or owners.get(container_id)
+            rows.append([container_id, name, owner, sample_counters(raw)])
+
+        self.ingest(now, rows)
+        self.stats["last_round_ms"] = round((time.monotonic() - started) * 1000, 1)
+        await shared_store.publish(STATS_CHANNEL, {"sender": os.getpid(), "timestamp": now, "containers": rows})
+
+    async def _owners_of(self, running: List[Dict[str, Any]], now: float) -> Dict[str, Optional[str]]:
+        """Owners of the running containers that have no owner label, from ``user_containers``."""
+        unlabelled = [c["Id"] for c in running if not (c.get("Labels") or {}).get(CONTAINER_OWNER_LABEL)]
+        for container_id in set(self._owners) - set(unlabelled):
+            del self._owners[container_id]
+        unknown = [
+            container_id for container_id in unlabelled
+            if container_id not in self._owners
+            or (self._owners[container_id][0] is None and now - self._owners[container_id][1] < OWNER_LOOKUP_WINDOW_SECONDS)
+        ]
+        if unknown:
+            try:
+                found = {
+                    doc["container_id"]: doc["user_id"]
+                    async for doc in mongo.get_async_collection(CONTAINER_COLLECTION).find(
+                        {"container_id": {"$in": unknown}}, {"_id": 0, "container_id": 1, "user_id": 1}
+                    )
+                }
+            except Exception as e:
+                logger.debug(f"Looking up container owners failed: {e}")
+                found = {}
+            for container_id in unknown:
+                first_seen = self._owners[container_id][1] if container_id in self._owners else now
+                self._owners[container_id] = (found.get(container_id), first_seen)
+        return {container_id: owner for container_id, (owner, _) in self._owners.items()}
+
+    def receive(self, message: Dict[str, Any]):
+        if message["sender"] != os.getpid():
+            self.ingest(message["timestamp"], message["containers"])
+
+    def ingest(self, now: float, rows: List[List[Any]]):
+        """Add one round of ``[id, name, owner, counters]`` rows and update the aggregates."""
+        seen = set()
+        host = dict.fromkeys(SUMMED_FIELDS, 0.0)
+        users: Dict[str, Dict[str, float]] = {}
+
+        for container_id, name, owner, counters in rows:
+            entry = self.containers.get(container_id)
+            if entry is None:
+                entry = self.containers[container_id] = ContainerStats(container_id, name, owner)
+            elif entry.owner is None and owner:
+                # Owners are looked up after a short delay, so early rows for a claimed container carry none.
+                entry.owner, entry.name = owner, name
+            sample = entry.add_counters(counters, now)
+            seen.add(container_id)
+            totals = [host] + ([users.setdefault(entry.owner, dict.fromkeys(SUMMED_FIELDS, 0.0))] if entry.owner else [])
+            for total in totals:
+                for field in SUMMED_FIELDS:
+                    total[field] += sample.get(field, 0.0)
+
+        for container_id in set(self.containers) - seen:
+            del self.containers[container_id]
+        for owner in set(self.users) - set(users):
+            del self.users[owner]
+        self.host.append({"timestamp": now, **host})
+        for owner, total in users.items():
+            self.users.setdefault(owner, RingBuffer(settings.STATS_HISTORY_SIZE)).append({"timestamp": now, **total})
+
+        self.last_sample = now
+        self.stats["rounds"] += 1
+        self.stats["samples"] += len(seen)
+
+    # Reads
+
+    def find_container(self, ref: str) -> Optional[ContainerStats]:
+        for entry in self.containers.values():
+            if entry.id.startswith(ref) or entry.name == ref:
+                return entry
+        return None
+
+    def user_containers(self, owner: str) -> List[ContainerStats]:
+        return [entry for entry in self.containers.values() if entry.owner == owner]
+
+
+stats_collector = StatsCollector()
+shared_store.subscribe(STATS_CHANNEL, stats_collector.receive)
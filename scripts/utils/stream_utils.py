@@ -0,0 +1,101 @@
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple, TypeVar
+from fastapi.responses import StreamingResponse
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+STREAM_FORMATS = ("ndjson", "sse")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def ndjson_lines(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for event in events:
+        yield json.dumps(event, default=str).encode("utf-8") + b"\n"
+
+
+async def sse_frames(events: AsyncIterator[Dict[str, Any]], event_field: Optional[str] = None) -> AsyncIterator[bytes]:
+    async for event in events:
+        frame = f"data: {json.dumps(event, default=str)}\n\n"
+        if event_field and event.get(event_field):
+            frame = f"event: {event[event_field]}\n{frame}"
+        yield frame.encode("utf-8")
+
+
+def stream_response(events: AsyncIterator[Dict[str, Any]], format: str = "ndjson", event_field: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """Wrap an async iterator of dict events as an NDJSON or Server-Sent Events response.
+
+    The iterator is pulled only as fast as the client reads, so producers that read
+    lazily from Docker or Mongo keep constant memory per connection.
+    """
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})}
+    if format == "sse":
+        return StreamingResponse(sse_frames(events, event_field), media_type=SSE_MEDIA_TYPE, headers=headers)
+    return StreamingResponse(ndjson_lines(events), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+class EventLog:
+    """A bounded, append-only event buffer that any number of readers can follow.
+
+    Readers get everything still buffered from their starting sequence number and
+    then wait for new events until ``close`` is called.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None):
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self.count = 0
+        self.closed = False
+        self._changed = asyncio.Condition()
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def append(self, event: Dict[str, Any]):
+        self.events.append(event)
+        self.count += 1
+        await self._notify()
+
+    async def close(self):
+        self.closed = True
+        await self._notify()
+
+    async def follow(self, since: int = 0) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield ``(seq, event)`` pairs from ``since``; events already dropped from the buffer are skipped."""
+        cursor = max(since, 0)
+        while True:
+            first = self.count - len(self.events)
+            cursor = max(cursor, first)
+            for event in list(self.events)[cursor - first:]:
+                yield cursor, event
+                cursor += 1
+            if self.closed and cursor >= self.count:
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.count > cursor or self.closed)
+
+
+async def bounded_as_completed(items: Iterable[T], worker: Callable[[T], Awaitable[R]], limit: int) -> AsyncIterator[R]:
+    """Run ``worker`` over ``items`` with at most ``limit`` in flight, yielding results as they finish.
+
+    Closing the iterator early cancels whatever is still queued or running.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await worker(item)
+
+    tasks = [asyncio.create_task(run(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,231 @@
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+from logging.handlers import QueueListener
+from typing import Callable, Dict, Optional
+import uvicorn
+from scripts.constants.app_configuration import settings
+from scripts.logging import logger as logging_setup
+from scripts.logging.logger import logger
+from scripts.utils.shared_store_utils import WORKER_ID_ENV
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Runs ``API_WORKERS`` uvicorn workers on one shared listening socket.
+
+    Workers are forked. With ``API_PRELOAD`` the app is imported and built once here
+    first, so workers start instantly and share its memory copy-on-write.
+    Without it, each worker imports the code itself, so a reload picks up code
+    changes. The supervisor also runs the shared store sidecar, which workers use
+    for state that must agree across them, and owns the log files, which every
+    child writes through a process queue of its own.
+
+    Signals: ``SIGHUP`` replaces the workers one at a time, starting each new
+    worker before the old one is stopped gracefully. ``SIGTERM``/``SIGINT`` stop
+    everything, giving in-flight requests up to ``API_GRACEFUL_TIMEOUT_SECONDS``.
+    A worker that dies unexpectedly is replaced.
+    """
+
+    def __init__(self, load_app: Callable[[], object], workers: int = settings.API_WORKERS, preload: bool = settings.API_PRELOAD):
+        self.load_app = load_app
+        self.workers = workers
+        self.preload = preload
+        self.app = None
+        self.sock: Optional[socket.socket] = None
+        self.children: Dict[int, int] = {}
+        self.store: Optional[multiprocessing.Process] = None
+        self.store_log: Optional[QueueListener] = None
+        self.log_listeners: Dict[int, QueueListener] = {}
+        self.running = True
+        self.reload_requested = False
+
+    # Shared store sidecar
+
+    @staticmethod
+    def _store_main(path: str, log_queue):
+        from scripts.utils.shared_store_utils import serve
+
+        logging_setup.use_child_queue(log_queue)
+        # Stopped by the supervisor once the workers are gone, not by a terminal's Ctrl+C.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        serve(path)
+
+    @staticmethod
+    def _store_listening(path: str) -> bool:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+
+    def start_store(self):
+        # A dead store's socket file would let workers think the new one is up before it listens.
+        try:
+            os.unlink(settings.SHARED_STORE_SOCKET)
+        except FileNotFoundError:
+            pass
+        if self.store_log is not None:
+            logging_setup.stop_listener(self.store_log)
+        log_queue, self.store_log = logging_setup.child_log_queue()
+        self.store = multiprocessing.get_context("fork").Process(
+            target=self._store_main, args=(settings.SHARED_STORE_SOCKET, log_queue), daemon=True
+        )
+        self.store.start()
+        deadline = time.monotonic() + 10
+        while not self._store_listening(settings.SHARED_STORE_SOCKET):
+            if time.monotonic() >= deadline or not self.store.is_alive():
+                logger.error(f"Shared store is not accepting connections on {settings.SHARED_STORE_SOCKET}")
+                break
+            time.sleep(0.05)
+
+    # Workers
+
+    def spawn(self, index: int) -> int:
+        log_queue, log_listener = logging_setup.child_log_queue()
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            self.log_listeners[pid] = log_listener
+            return pid
+
+        status = 0
+        try:
+            logging_setup.use_child_queue(log_queue)
+            os.environ[WORKER_ID_ENV] = str(index)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            app = self.app if self.app is not None else self.load_app()
+            config = uvicorn.Config(
+                app,
+                host=settings.API_HOST,
+                port=settings.API_PORT,
+                timeout_graceful_shutdown=settings.API_GRACEFUL_TIMEOUT_SECONDS,
+            )
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException as e:
+            logger.error(f"Worker {index} crashed: {e}")
+            status = 1
+        finally:
+            logging_setup.flush_logs()
+            os._exit(status)
+
+    def stop_worker(self, pid: int, timeout: float):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+            if done:
+                self._exited(pid)
+                return
+            time.sleep(0.1)
+        logger.warning(f"Worker {pid} did not stop within {timeout}s; killing it")
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        self._exited(pid)
+
+    def _exited(self, pid: int):
+        self.children.pop(pid, None)
+        log_listener = self.log_listeners.pop(pid, None)
+        if log_listener is not None:
+            logging_setup.stop_listener(log_listener)
+
+    def rolling_reload(self):
+        logger.info(f"Reloading {len(self.children)} workers")
+        for pid, index in list(self.children.items()):
+            self.spawn(index)
+            self.stop_worker(pid, settings.API_GRACEFUL_TIMEOUT_SECONDS + 5)
+
+    def reap(self):
+        # Waits on worker PIDs only; the store process is watched through its Process object.
+        for pid, index in list(self.children.items()):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, -1
+            if not done:
+                continue
+            self._exited(pid)
+            if self.running:
+                logger.warning(f"Worker {index} (pid {pid}) exited with status {status}; starting a replacement")
+                self.spawn(index)
+
+    # Main loop
+
+    def _on_stop(self, signum, frame):
+        self.running = False
+
+    def _on_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def run(self):
+        started = time.perf_counter()
+        store_dir = None
+        if not settings.SHARED_STORE_SOCKET:
+            store_dir = tempfile.mkdtemp(prefix="docker-manager-")
+            settings.SHARED_STORE_SOCKET = os.path.join(store_dir, "store.sock")
+        os.environ["SHARED_STORE_SOCKET"] = settings.SHARED_STORE_SOCKET
+
+        self.start_store()
+        self.sock = bind_socket(settings.API_HOST, settings.API_PORT)
+        if self.preload:
+            self.app = self.load_app()
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        for index in range(self.workers):
+            self.spawn(index)
+        logger.info(
+            f"Supervisor {os.getpid()} serving on {settings.API_HOST}:{settings.API_PORT} with {self.workers} workers "
+            f"(preload={self.preload}) after {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+        try:
+            while self.running:
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.rolling_reload()
+                self.reap()
+                if self.store is not None and not self.store.is_alive() and self.running:
+                    logger.warning("Shared store exited; restarting it. Its values and logs are lost; workers restore the slots they hold on reconnecting")
+                    self.start_store()
+                time.sleep(0.2)
+        finally:
+            logger.info("Stopping workers")
+            for pid in list(self.children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in list(self.children):
+                self.stop_worker(pid, settings.API_GRACEFUL_TIMEOUT_SECONDS + 5)
+            if self.store is not None:
+                self.store.terminate()
+                self.store.join(5)
+            self.sock.close()
+            if store_dir is not None:
+                for name in os.listdir(store_dir):
+                    os.unlink(os.path.join(store_dir, name))
+                os.rmdir(store_dir)
+            # Before interpreter exit, where multiprocessing closes the log queue under the writer.
+            logging_setup.flush_logs()
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from scripts.constants.app_configuration import settings
+from scripts.constants.app_constants import CONTAINER_OWNER_LABEL, WARM_POOL_LABEL, WARM_POOL_WORKER_LABEL
+from scripts.models.cont_model import ContainerRunAdvancedRequest
+from scripts.utils.docker_utils import build_container_config
+from scripts.utils.fleet_utils import DockerHost, Reservation, fleet, requested_reservation
+from scripts.utils.inventory_utils import inventory
+from scripts.utils.metrics_utils import container_create_duration
+from scripts.utils.shared_store_utils import WORKER_ID_ENV
+from scripts.logging.logger import logger
+
+
+# Request fields that are applied per claim rather than baked into the pooled container.
+PER_CLAIM_FIELDS = ("name", "labels")
+
+LATENCY_SOURCES = ("warm_pool", "cold")
+
+
+def pool_worker() -> str:
+    """The worker index pooled containers are labelled with; "0" when running on its own, so a restart finds them."""
+    return os.environ.get(WORKER_ID_ENV) or "0"
+
+
+def profile_key(image: str, command: Any, kwargs: Dict[str, Any]) -> str:
+    """The create payload a request would send, minus name and labels; equal keys mean interchangeable containers."""
+    params, body = build_container_config(image, command, **{k: v for k, v in kwargs.items() if k not in PER_CLAIM_FIELDS})
+    params.pop("name", None)
+    body.pop("Labels", None)
+    return json.dumps({"params": params, "body": body}, sort_keys=True, default=str)
+
+
+def parse_profiles(value: str) -> List[Dict[str, Any]]:
+    """``WARM_POOL_PROFILES``: a JSON list of create requests, each with an optional ``size``.
+
+    e.g. ``[{"image": "python:3.11-slim", "size": 4, "mem_limit": "256m"}]``
+    """
+    if not value.strip():
+        return []
+    profiles = []
+    for entry in json.loads(value):
+        entry = dict(entry)
+        size = int(entry.pop("size", settings.WARM_POOL_DEFAULT_SIZE))
+        if set(entry) & set(PER_CLAIM_FIELDS):
+            raise ValueError(f"Warm pool profile for '{entry.get('image')}' may not set name or labels")
+        request = ContainerRunAdvancedRequest(**entry).dict(exclude_defaults=True)
+        profiles.append({"size": size, **request})
+    return profiles
+
+
+class PooledContainer:
+    __slots__ = ("id", "host", "image_id", "created")
+
+    def __init__(self, container_id: str, host: DockerHost, image_id: str):
+        self.id = container_id
+        self.host = host
+        self.image_id = image_id
+        self.created = time.time()
+
+
+class WarmPool:
+    """Stopped containers created ahead of time for ``WARM_POOL_PROFILES``.
+
+    Each profile is an image plus create options. A create request whose payload
+    (apart from its name and owner label) matches a profile claims a pooled
+    container: it is renamed if the request names it, then started, which skips
+    the daemon's create. A background task tops every profile back up, right
+    after a claim and each ``WARM_POOL_REFILL_INTERVAL_SECONDS``, and replaces
+    pooled containers whose image tag has since moved.
+
+    With several workers, each keeps its share of every profile's ``size``.
+    Pooled containers are labelled with their profile and worker index, so a
+    restarted worker adopts the ones it left behind instead of creating new ones.
+    Worker 0 also removes those left by worker indexes that no longer exist
+    (``API_WORKERS`` was lowered) or by unknown profiles. A host that is down at
+    start is adopted from once it turns healthy.
+    """
+
+    def __init__(self):
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.keys: Dict[str, str] = {}
+        for profile in parse_profiles(settings.WARM_POOL_PROFILES):
+            options = {k: v for k, v in profile.items() if k not in ("size", "image", "command")}
+            key = profile_key(profile["image"], profile.get("command"), options)
+            profile_id = hashlib.sha256(key.encode()).hexdigest()[:12]
+            self.keys[key] = profile_id
+            self.profiles[profile_id] = {
+                "image": profile["image"],
+                "command": profile.get("command"),
+                "options": options,
+                "size": profile["size"],
+                "reservation": requested_reservation(options),
+            }
+        self.ready: Dict[str, Deque[PooledContainer]] = {profile_id: deque() for profile_id in self.profiles}
+        self.creating: Dict[str, int] = dict.fromkeys(self.profiles, 0)
+        self.stats = {"hits": 0, "misses": 0, "unmatched": 0, "claim_failures": 0, "created": 0, "create_failures": 0, "adopted": 0, "replaced": 0}
+        self.latency: Dict[str, Deque[float]] = {source: deque(maxlen=settings.WARM_POOL_LATENCY_SAMPLES) for source in LATENCY_SOURCES}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._removals: Set[asyncio.Task] = set()
+        self._adopted: Set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.profiles)
+
+    def target(self, profile_id: str) -> int:
+        return math.ceil(self.profiles[profile_id]["size"] / max(settings.API_WORKERS, 1))
+
+    # Claims
+
+    def match(self, image: str, command: Any, kwargs: Dict[str, Any]) -> Optional[str]:
+        # Labels are fixed at create time, so only requests without labels of their own can use a pooled container.
+        if set(kwargs.get("labels") or {}) - {CONTAINER_OWNER_LABEL}:
+            return None
+        return self.keys.get(profile_key(image, command, kwargs))
+
+    async def claim(self, image: str, command: Any, kwargs: Dict[str, Any]) -> Optional[Tuple[DockerHost, Dict[str, Any], Reservation]]:
+        """Start a pooled container for this request, or None to create one as usual."""
+        if not self.enabled:
+            return None
+        profile_id = self.match(image, command, kwargs)
+        if profile_id is None:
+            self.stats["unmatched"] += 1
+            return None
+        pool = self.ready[profile_id]
+        while pool and not pool[0].host.healthy and fleet.multi_host:
+            self._discard(pool.popleft())
+        if not pool:
+            self.stats["misses"] += 1
+            self._wake.set()
+            return None
+
+        entry = pool.popleft()
+        self._wake.set()
+        client = entry.host.client
+        try:
+            if kwargs.get("name"):
+                await client.rename_container(entry.id, kwargs["name"])
+        except Exception as e:
+            # Untouched, so it stays in the pool; the cold create reports the error (e.g. a name conflict).
+            pool.appendleft(entry)
+            self.stats["claim_failures"] += 1
+            logger.debug(f"Renaming pooled container {entry.id[:12]} failed: {e}")
+            return None
+        try:
+            await client.start_container(entry.id)
+            container = await client.inspect_container(entry.id)
+        except Exception as e:
+            self.stats["claim_failures"] += 1
+            logger.warning(f"Starting pooled container {entry.id[:12]} on host '{entry.host.name}' failed: {e}")
+            self._discard(entry)
+            return None
+        self.stats["hits"] += 1
+        return entry.host, container, self.profiles[profile_id]["reservation"]
+
+    def observe(self, source: str, seconds: float):
+        self.latency[source].append(seconds)
+        container_create_duration.observe(seconds, source=source)
+
+    # Refill
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        # Pooled containers are left in place for the next start to adopt.
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*self._removals, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            self._wake.clear()
+            if len(self._adopted) < len(fleet.hosts):
+                try:
+                    await self.adopt()
+                except Exception as e:
+                    logger.warning(f"Adopting pooled containers failed: {e}")
+            try:
+                await self.refill()
+            except Exception as e:
+                logger.warning(f"Warm pool refill failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.WARM_POOL_REFILL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _labels(self, profile_id: str) -> Dict[str, str]:
+        return {WARM_POOL_LABEL: profile_id, WARM_POOL_WORKER_LABEL: pool_worker()}
+
+    @staticmethod
+    def _orphaned(worker: str) -> bool:
+        return not worker.isdigit() or int(worker) >= max(settings.API_WORKERS, 1)
+
+    async def adopt(self):
+        """Take over this worker's pooled containers left by a previous run, on every healthy host not yet adopted from."""
+        me = pool_worker()
+        # A host that turned healthy before this round may already have been refilled.
+        known = {entry.id for pool in self.ready.values() for entry in pool}
+        for host in fleet.hosts.values():
+            if host.name in self._adopted or (fleet.multi_host and not host.healthy):
+                continue
+            found = await host.client.list_containers(all=True, filters={"label": [WARM_POOL_LABEL], "status": ["created"]})
+            self._adopted.add(host.name)
+            for container in found:
+                labels = container.get("Labels") or {}
+                profile_id, worker = labels.get(WARM_POOL_LABEL), labels.get(WARM_POOL_WORKER_LABEL) or ""
+                if container.get("State") != "created" or container["Id"] in known:
+                    continue
+                entry = PooledContainer(container["Id"], host, container.get("ImageID", ""))
+                if worker != me:
+                    # Another live worker's; worker 0 clears those nobody will adopt.
+                    if me == "0" and self._orphaned(worker):
+                        self._discard(entry)
+                    continue
+                if profile_id not in self.profiles or len(self.ready[profile_id]) >= self.target(profile_id):
+                    self._discard(entry)
+                    continue
+                self.ready[profile_id].append(entry)
+                self.stats["adopted"] += 1
+
+    async def refill(self):
+        await self._replace_outdated()
+        jobs = []
+        for profile_id in self.profiles:
+            missing = self.target(profile_id) - len(self.ready[profile_id]) - self.creating[profile_id]
+            jobs.extend([profile_id] * max(missing, 0))
+        if not jobs:
+            return
+        semaphore = asyncio.Semaphore(settings.WARM_POOL_MAX_CONCURRENT_CREATES)
+
+        async def create(profile_id: str):
+            async with semaphore:
+                await self._create(profile_id)
+
+        await asyncio.gather(*(create(profile_id) for profile_id in jobs))
+
+    async def _create(self, profile_id: str):
+        profile = self.profiles[profile_id]
+        self.creating[profile_id] += 1
+        try:
+            host = await fleet.choose(profile["image"], profile["reservation"])
+            created = await host.client.create_container(
+                profile["image"], profile["command"], labels=self._labels(profile_id), **profile["options"]
+            )
+            container = await host.client.inspect_container(created["Id"])
+        except Exception as e:
+            self.stats["create_failures"] += 1
+            logger.warning(f"Creating a pooled container for '{profile['image']}' failed: {e}")
+            return
+        finally:
+            self.creating[profile_id] -= 1
+        inventory.mark_containers(created["Id"])
+        self.ready[profile_id].append(PooledContainer(created["Id"], host, container.get("Image", "")))
+        self.stats["created"] += 1
+
+    async def _replace_outdated(self):
+        """Drop pooled containers created from an image the profile's tag no longer points to."""
+        current: Dict[Tuple[str, str], Optional[str]] = {}
+        for profile_id, pool in self.ready.items():
+            image = self.profiles[profile_id]["image"]
+            for entry in list(pool):
+                key = (entry.host.name, image)
+                if key not in current:
+                    try:
+                        current[key] = (await entry.host.client.inspect_image(image))["Id"]
+                    except Exception:
+                        current[key] = None
+                if current[key] is not None and entry.image_id and entry.image_id != current[key]:
+                    pool.remove(entry)
+                    self.stats["replaced"] += 1
+                    self._discard(entry)
+
+    def _discard(self, entry: PooledContainer):
+        async def remove():
+            try:
+                await entry.host.client.remove_container(entry.id, force=True)
+                inventory.mark_containers(entry.id)
+            except Exception as e:
+                logger.debug(f"Removing pooled container {entry.id[:12]} failed: {e}")
+
+        task = asyncio.create_task(remove())
+        self._removals.add(task)
+        task.add_done_callback(self._removals.discard)
+
+    # Reporting
+
+    def status(self) -> Dict[str, Any]:
+        matched = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "profiles": [
+                {
+                    "id": profile_id,
+                    "image": profile["image"],
+                    "size": profile["size"],
+                    "worker_target": self.target(profile_id),
+                    "ready": len(self.ready[profile_id]),
+                    "creating": self.creating[profile_id],
+                    "hosts": sorted({entry.host.name for entry in self.ready[profile_id]}),
+                }
+                for profile_id, profile in self.profiles.items()
+            ],
+            "stats": dict(self.stats),
+            "hit_rate": round(self.stats["hits"] / matched, 4) if matched else 0.0,
+            "create_latency": {source: _summary(samples) for source, samples in self.latency.items()},
+        }
+
+
+def _summary(samples: Deque[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 2)
+
+    return {"count": len(ordered), "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99)}
+
+
+warm_pool = WarmPool()